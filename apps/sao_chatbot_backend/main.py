@@ -1,14 +1,49 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from src.config import settings
 from src.config.logging_config import setup_logging
 from src.api.v1.router import api_router 
 
 setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def warm_up(app: FastAPI):
+    """
+    Loads the embedder and search indexes and runs one probe search, then
+    marks the app ready. Runs after startup so liveness checks answer while
+    the model loads.
+    """
+    from src.app.chatbot.chatbot import get_chatbot
+
+    try:
+        chatbot = await asyncio.to_thread(get_chatbot)
+        await chatbot.warm_up()
+        app.state.ready = True
+        logger.info("Warm-up complete, ready to serve.")
+    except Exception as e:
+        logger.error(f"Warm-up failed, /ready stays false: {e}", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = not settings.WARMUP_ON_STARTUP
+    warm_up_task = asyncio.create_task(warm_up(app)) if settings.WARMUP_ON_STARTUP else None
+    yield
+    if warm_up_task and not warm_up_task.done():
+        warm_up_task.cancel()
+
 
 app = FastAPI(
     title="RAG Backend API",
     description="API for Retrieval Augmented Generation and InitialReview Logging",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -23,4 +58,10 @@ app.add_middleware(
 def root():
     return {"status": "running", "message": "RAG Backend is up!"}
 
+@app.get("/ready", tags=["System"])
+def ready():
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
 app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
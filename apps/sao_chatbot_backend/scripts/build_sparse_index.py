@@ -0,0 +1,46 @@
+"""
+Builds the BGE-M3 sparse lexical index for stores ingested before it existed,
+or completes it with the chunks added since without lexical weights (e.g.
+under KEYWORD_SEARCH_BACKEND=bm25). Set KEYWORD_SEARCH_BACKEND=sparse to
+search with it.
+
+    python scripts/build_sparse_index.py
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.app.chatbot.constants import REGULATION_PATH, OTHERS_PATH
+from src.app.utils.embedding import get_embedder
+from src.db.vector_store.sparse_index import SparseLexicalIndex
+from src.db.vector_store.vector_store import VectorStoreTransaction
+
+BATCH_SIZE = 16
+
+
+def build_sparse_index(store_path: str) -> None:
+    embedder = get_embedder()
+    if embedder.lexical_head is None:
+        embedder.enable_lexical()
+
+    with VectorStoreTransaction(store_path) as vs:
+        if not vs.metadata:
+            print(f"[{store_path}] Empty store, nothing to build.")
+            return
+        # An existing index covers a prefix of the store; only the rest is embedded.
+        if vs.sparse is None or vs.sparse.corpus_size > len(vs.metadata):
+            vs.sparse = SparseLexicalIndex.empty()
+        start = vs.sparse.corpus_size
+        if start == len(vs.metadata):
+            print(f"[{store_path}] Sparse index already covers every chunk.")
+            return
+        texts = [m.get("text", "") for m in vs.metadata[start:]]
+        _, lexical_weights = embedder.embed_texts_with_lexical(texts, batch_size=BATCH_SIZE)
+        vs.sparse.add_documents(lexical_weights)
+        print(f"[{store_path}] Built {vs.sparse}")
+
+
+if __name__ == "__main__":
+    for path in (REGULATION_PATH, OTHERS_PATH):
+        build_sparse_index(path)
+    print("\n🎉 Sparse lexical indexes built.")
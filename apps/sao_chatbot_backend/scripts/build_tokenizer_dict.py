@@ -0,0 +1,81 @@
+"""
+Builds the custom Thai segmentation dictionary from the indexed corpus and
+rebuilds both stores' BM25 indexes with it.
+
+Candidates are the quoted defined terms and dotted abbreviations found in
+chunk text, plus LEGAL_TERMS. Words pythainlp already knows are dropped.
+Writes settings.TOKENIZER_DICT_PATH. Hand-added lines in that file are kept.
+
+    python scripts/build_tokenizer_dict.py
+"""
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from pythainlp.corpus import thai_words
+
+from src.app.chatbot.constants import REGULATION_PATH, OTHERS_PATH
+from src.db.vector_store.tokenizer import collect_corpus_terms, get_tokenizer, read_custom_words
+from src.config import settings
+from src.db.vector_store.vector_store import VectorStoreTransaction, load_faiss_index
+
+LEGAL_TERMS = [
+    "สตง.",
+    "หน่วยรับตรวจ",
+    "ผู้ว่าการตรวจเงินแผ่นดิน",
+    "คณะกรรมการตรวจเงินแผ่นดิน",
+    "สำนักงานการตรวจเงินแผ่นดิน",
+    "การตรวจสอบการปฏิบัติตามกฎหมาย",
+    "การตรวจสอบงบการเงิน",
+    "การตรวจสอบการดำเนินงาน",
+    "ผู้ตรวจสอบ",
+    "ผู้รับตรวจ",
+]
+
+
+def collect_terms() -> list:
+    texts = []
+    for path in (REGULATION_PATH, OTHERS_PATH):
+        _, metadata = load_faiss_index(path)
+        texts.extend(m.get("text", "") for m in metadata)
+    print(f"Scanning {len(texts)} chunks for dictionary terms...")
+
+    known = set(thai_words())
+    candidates = set(collect_corpus_terms(texts)) | set(LEGAL_TERMS)
+    return sorted(t for t in candidates if t.lower() not in known)
+
+
+def write_dictionary(path: str, terms: list) -> list:
+    words = sorted(set(read_custom_words(path)) | set(terms))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("# Custom Thai segmentation words, one per line.\n")
+        f.write("\n".join(words) + "\n")
+    os.replace(tmp_path, path)
+    return words
+
+
+def rebuild_bm25(store_path: str) -> None:
+    start = time.perf_counter()
+    with VectorStoreTransaction(store_path) as vs:
+        if not vs.metadata:
+            print(f"[{store_path}] Empty store, nothing to rebuild.")
+            return
+        vs.bm25 = None  # rebuilt with the new dictionary on commit
+    print(f"[{store_path}] BM25 rebuilt in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == "__main__":
+    dict_path = settings.TOKENIZER_DICT_PATH
+    words = write_dictionary(dict_path, collect_terms())
+    print(f"Wrote {len(words)} words to {dict_path}.")
+
+    # First use, so it loads the dictionary just written.
+    print(f"Tokenizer fingerprint: {get_tokenizer().fingerprint}")
+    for path in (REGULATION_PATH, OTHERS_PATH):
+        rebuild_bm25(path)
+    print("\n🎉 Tokenizer dictionary built. Running servers pick it up on their next index reload.")
@@ -0,0 +1,151 @@
+"""
+Exports BGE-M3 to ONNX, quantises it to int8 and checks the result against
+the PyTorch embedder.
+
+Writes model.onnx (fp32, weights in external data files), model_int8.onnx,
+tokenizer.json and the sparse head (sparse_linear.npz) to
+settings.EMBEDDING_ONNX_DIR. Serve it with
+EMBEDDING_BACKEND=onnx.
+
+    python scripts/export_onnx_embedder.py
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.app.chatbot.constants import REGULATION_PATH, OTHERS_PATH
+from src.app.utils.embedding import BGEEmbedder, OnnxBGEEmbedder, QueryEmbeddingCache
+from src.config import settings
+
+MODEL_NAME = "BAAI/bge-m3"
+PARITY_SAMPLE_SIZE = 200
+# Mean cosine between fp32 and int8 vectors below this fails the check.
+MIN_MEAN_COSINE = 0.99
+PARITY_QUERIES = [
+    "การตรวจสอบการปฏิบัติตามกฎหมาย",
+    "หน่วยรับตรวจต้องส่งเอกสารภายในกี่วัน",
+    "ขั้นตอนการรับเรื่องร้องเรียน",
+    "การแจ้งผลการตรวจสอบ",
+    "แนวทางการประเมินความเสี่ยง",
+]
+
+
+def export_onnx(output_dir: str) -> str:
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME).eval()
+
+    # The fast tokenizer writes tokenizer.json, which the runtime loads without transformers.
+    tokenizer.save_pretrained(output_dir)
+    export_sparse_head(output_dir)
+
+    sample = tokenizer(["ตัวอย่าง", "ตัวอย่างข้อความ"], padding=True, return_tensors="pt")
+    model_path = os.path.join(output_dir, "model.onnx")
+    print(f"Exporting {MODEL_NAME} to {model_path}...")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            model_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+    return model_path
+
+
+def export_sparse_head(output_dir: str) -> None:
+    """Saves BGE-M3's sparse_linear weights as numpy so the runtime needs no torch."""
+    import torch
+    from huggingface_hub import hf_hub_download
+
+    state = torch.load(hf_hub_download(MODEL_NAME, "sparse_linear.pt"), map_location="cpu")
+    np.savez(
+        os.path.join(output_dir, "sparse_linear.npz"),
+        weight=state["weight"].numpy().reshape(-1),
+        bias=state["bias"].numpy().reshape(-1),
+    )
+
+
+def quantize(model_path: str, output_dir: str) -> str:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = os.path.join(output_dir, "model_int8.onnx")
+    print(f"Quantising to {quantized_path}...")
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+def sample_chunk_texts(n: int) -> list:
+    texts = []
+    for store_path in (REGULATION_PATH, OTHERS_PATH):
+        meta_path = os.path.join(store_path, "metadata.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                texts.extend(m.get("text", "") for m in json.load(f)[: n // 2])
+    return [t for t in texts if t] or PARITY_QUERIES
+
+
+def check_parity(output_dir: str) -> bool:
+    """
+    Compares ONNX vectors with the PyTorch ones on stored chunks and sample
+    queries, and checks that query -> chunk rankings agree.
+    """
+    chunks = sample_chunk_texts(PARITY_SAMPLE_SIZE)
+    # Separate caches so no backend is served another's vectors.
+    reference = BGEEmbedder(MODEL_NAME, cache=QueryEmbeddingCache())
+    ref_chunks = reference.embed_texts(chunks, batch_size=16, show_progress=False)
+    ref_queries = reference.embed_texts(PARITY_QUERIES, show_progress=False)
+
+    passed = True
+    for quantized in (False, True):
+        candidate = OnnxBGEEmbedder(output_dir, MODEL_NAME, cache=QueryEmbeddingCache(), quantized=quantized)
+        label = "int8" if quantized else "fp32"
+
+        cand_chunks = candidate.embed_texts(chunks, batch_size=16, show_progress=False)
+        cosine = np.sum(ref_chunks * cand_chunks, axis=1)
+
+        ref_top = np.argsort(-(ref_queries @ ref_chunks.T), axis=1)[:, :10]
+        cand_top = np.argsort(-(candidate.embed_texts(PARITY_QUERIES, show_progress=False) @ ref_chunks.T), axis=1)[:, :10]
+        overlap = np.mean([len(set(r) & set(c)) / len(r) for r, c in zip(ref_top, cand_top)])
+
+        timings = {}
+        for name, embedder in (("torch", reference), (label, candidate)):
+            start = time.perf_counter()
+            for q in PARITY_QUERIES:
+                embedder._encode([q], 1, False)
+            timings[name] = (time.perf_counter() - start) / len(PARITY_QUERIES) * 1000
+
+        print(
+            f"[{label}] cosine mean={cosine.mean():.4f} min={cosine.min():.4f} | "
+            f"top-10 overlap={overlap:.2%} | query latency torch={timings['torch']:.1f}ms "
+            f"{label}={timings[label]:.1f}ms"
+        )
+        if cosine.mean() < MIN_MEAN_COSINE:
+            print(f"❌ [{label}] mean cosine below {MIN_MEAN_COSINE}")
+            passed = False
+    return passed
+
+
+if __name__ == "__main__":
+    output_dir = settings.EMBEDDING_ONNX_DIR
+    model_path = export_onnx(output_dir)
+    quantize(model_path, output_dir)
+    if not check_parity(output_dir):
+        sys.exit(1)
+    print(f"\n🎉 ONNX embedder ready in {output_dir}. Set EMBEDDING_BACKEND=onnx to use it.")
@@ -0,0 +1,36 @@
+"""
+Commits the regulation and others stores once so every derived file is
+written and stamped with the new generation: the chunk store, the BM25
+index (retokenised if the dictionary changed) and the compressed codes of
+the configured VECTOR_CODEC_*. Until then each server worker rebuilds them
+in memory on every load and logs a warning naming this script.
+
+Run it after upgrading, after copying or restoring a store, and after
+changing the tokenizer dictionary or a vector codec, while no ingestion is
+running. Running servers reload the stores when the generation changes.
+
+    python scripts/migrate_vector_stores.py
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.app.chatbot.constants import REGULATION_PATH, OTHERS_PATH
+from src.db.vector_store.vector_store import INDEX_FILENAME, VectorStoreTransaction
+
+
+def migrate_store(store_path: str) -> None:
+    if not os.path.exists(os.path.join(store_path, INDEX_FILENAME)):
+        print(f"[{store_path}] No index, nothing to migrate.")
+        return
+    # Committing an unchanged transaction rewrites every derived file.
+    with VectorStoreTransaction(store_path):
+        pass
+
+
+if __name__ == "__main__":
+    for path in (REGULATION_PATH, OTHERS_PATH):
+        migrate_store(path)
+    print("\n🎉 Vector stores migrated.")
@@ -0,0 +1,125 @@
+"""
+Trains the local embedding router from the labelled examples and the LLM
+routing decisions logged by the server (when ROUTER_TRAFFIC_LOG_PATH is set,
+including its rotated backups), and reports how it would have routed them.
+
+Each task (route, legal_route) gets one BGE-M3 centroid per label. Accuracy
+is cross-validated: every query is classified by a model fitted without it.
+The report lists, per confidence threshold, the share of queries answered
+locally and their accuracy, then the confusion matrix at
+settings.LOCAL_ROUTER_THRESHOLD. Hand-labelled examples override logged
+labels for the same query. Running servers pick up the new model on their
+next request.
+
+    python scripts/train_local_router.py
+"""
+import json
+import os
+from collections import Counter, defaultdict
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.app.chatbot.local_router import (
+    CentroidClassifier,
+    read_labelled_queries,
+    save_router_model,
+    traffic_log_paths,
+)
+from src.app.utils.embedding import get_embedder
+from src.config import settings
+
+N_FOLDS = 5
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99)
+SEED = 0
+
+
+def cross_validate(embeddings: np.ndarray, labels: np.ndarray) -> tuple:
+    """Held-out (predicted label, confidence) for every example."""
+    rng = np.random.default_rng(SEED)
+    folds = np.arange(len(labels)) % min(N_FOLDS, len(labels))
+    rng.shuffle(folds)
+
+    predicted = np.empty(len(labels), dtype=object)
+    confidence = np.zeros(len(labels))
+    for fold in np.unique(folds):
+        test = folds == fold
+        train = ~test
+        if len(set(labels[train])) < 2:
+            predicted[test], confidence[test] = None, 0.0
+            continue
+        clf = CentroidClassifier.fit(embeddings[train], labels[train])
+        probs = clf.predict_proba(embeddings[test])
+        best = probs.argmax(axis=1)
+        predicted[test] = [clf.labels[i] for i in best]
+        confidence[test] = probs[np.arange(len(best)), best]
+    return predicted, confidence
+
+
+def report_task(task: str, labels: np.ndarray, predicted: np.ndarray, confidence: np.ndarray) -> dict:
+    print(f"\n[{task}] {len(labels)} queries: {dict(Counter(labels))}")
+    print(f"{'threshold':>9} {'local':>7} {'accuracy':>9}")
+    table = []
+    for threshold in THRESHOLDS:
+        accepted = confidence >= threshold
+        coverage = accepted.mean()
+        accuracy = (predicted[accepted] == labels[accepted]).mean() if accepted.any() else 0.0
+        table.append({"threshold": threshold, "local_rate": float(coverage), "accuracy": float(accuracy)})
+        print(f"{threshold:>9.2f} {coverage:>7.1%} {accuracy:>9.1%}")
+
+    threshold = settings.LOCAL_ROUTER_THRESHOLD
+    accepted = confidence >= threshold
+    confusion = defaultdict(Counter)
+    for pred, label in zip(predicted[accepted], labels[accepted]):
+        confusion[pred][label] += 1
+
+    names = sorted(set(labels))
+    print(f"Confusion at threshold {threshold} (rows: local prediction, columns: label)")
+    print(" " * 14 + "".join(f"{name[:12]:>13}" for name in names))
+    for pred in names:
+        print(f"{pred[:12]:<14}" + "".join(f"{confusion[pred][name]:>13}" for name in names))
+
+    return {
+        "task": task,
+        "examples": dict(Counter(labels)),
+        "thresholds": table,
+        "confusion": {pred: dict(row) for pred, row in confusion.items()},
+    }
+
+
+if __name__ == "__main__":
+    # Examples last, so a hand label overrides the logged LLM label of the same query.
+    labelled = read_labelled_queries(traffic_log_paths() + [settings.ROUTER_EXAMPLES_PATH])
+    queries = sorted({q for by_query in labelled.values() for q in by_query})
+    if not queries:
+        raise SystemExit(
+            f"No labelled queries in {settings.ROUTER_EXAMPLES_PATH} "
+            f"or the traffic log ({settings.ROUTER_TRAFFIC_LOG_PATH or 'disabled'})."
+        )
+
+    embedder = get_embedder()
+    vectors = embedder.embed_texts(queries, show_progress=False)
+    row_of = {q: i for i, q in enumerate(queries)}
+
+    classifiers = {}
+    reports = []
+    for task, by_query in labelled.items():
+        labels = np.array(list(by_query.values()), dtype=object)
+        if len(set(labels)) < 2:
+            print(f"\n[{task}] Needs examples of at least two labels, skipping.")
+            continue
+        embeddings = vectors[[row_of[q] for q in by_query]]
+        predicted, confidence = cross_validate(embeddings, labels)
+        reports.append(report_task(task, labels, predicted, confidence))
+        classifiers[task] = CentroidClassifier.fit(embeddings, labels)
+
+    if not classifiers:
+        raise SystemExit("Nothing to train.")
+    save_router_model(settings.LOCAL_ROUTER_PATH, classifiers, embedder.model_name)
+
+    report_path = os.path.join(os.path.dirname(settings.LOCAL_ROUTER_PATH) or ".", "report.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(reports, f, indent=2, ensure_ascii=False)
+    print(f"\n🎉 Local router saved to {settings.LOCAL_ROUTER_PATH}, report in {report_path}.")
@@ -0,0 +1,130 @@
+"""
+Reports recall and memory of every vector codec on the regulation and
+others stores, to pick VECTOR_CODEC_REGULATIONS / VECTOR_CODEC_OTHERS.
+
+Stored chunk vectors serve as queries. Ground truth is the exact float32
+top-k, excluding the query chunk itself. Nothing is written to the stores;
+after switching a codec, run scripts/migrate_vector_stores.py to write its
+codes.
+
+    python scripts/vector_codec_report.py
+"""
+import json
+import os
+import time
+
+import faiss
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src.app.chatbot.constants import REGULATION_PATH, OTHERS_PATH
+from src.config import settings
+from src.db.vector_store.compressed_index import RescoringIndex
+from src.db.vector_store.vector_store import (
+    INDEX_FILENAME,
+    VECTORS_FILENAME,
+    _reconstruct_vectors,
+    build_index,
+    build_store_code_index,
+    make_search_params,
+)
+
+TOP_K = 10
+N_QUERIES = 200
+RESCORE_FACTORS = (0, 2, 4, 8)
+SEED = 0
+
+
+def load_vectors(store_path: str):
+    vectors_path = os.path.join(store_path, VECTORS_FILENAME)
+    if os.path.exists(vectors_path):
+        return np.load(vectors_path)
+    index_path = os.path.join(store_path, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        return _reconstruct_vectors(faiss.read_index(index_path))
+    return None
+
+
+def index_bytes(index) -> int:
+    if isinstance(index, faiss.IndexBinary):
+        return faiss.serialize_index_binary(index).nbytes
+    return faiss.serialize_index(index).nbytes
+
+
+def evaluate(index, queries: np.ndarray, query_ids: np.ndarray, truth: list) -> tuple:
+    """Returns (recall@TOP_K, mean latency in ms) for one query at a time, as served."""
+    hits = 0
+    start = time.perf_counter()
+    for row, query in enumerate(queries):
+        _, I = index.search(query[None, :], TOP_K + 1, params=make_search_params(index))
+        found = [i for i in I[0] if i != query_ids[row] and i != -1][:TOP_K]
+        hits += len(set(found) & truth[row])
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+    return hits / (len(queries) * TOP_K), latency
+
+
+def report_store(store_path: str) -> list:
+    vectors = load_vectors(store_path)
+    if vectors is None or len(vectors) <= TOP_K:
+        print(f"[{store_path}] Not enough vectors, skipping.")
+        return []
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    rng = np.random.default_rng(SEED)
+    query_ids = rng.choice(len(vectors), size=min(N_QUERIES, len(vectors)), replace=False)
+    queries = vectors[query_ids]
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, G = exact.search(queries, TOP_K + 1)
+    truth = [set([i for i in row if i != qid][:TOP_K]) for row, qid in zip(G, query_ids)]
+
+    print(f"\n[{store_path}] {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries")
+    print(f"{'codec':<8} {'rescore':>7} {'bytes/vec':>9} {'total MB':>9} {'recall@' + str(TOP_K):>10} {'ms/query':>9}")
+
+    rows = []
+    candidates = [("float32", build_index(vectors), 0)]
+    for codec in ("fp16", "int8", "binary"):
+        codes = build_store_code_index(vectors, codec)
+        for factor in RESCORE_FACTORS:
+            if codec == "binary" and factor == 0:
+                continue  # Hamming distances alone do not rank well enough to serve
+            candidates.append((codec, RescoringIndex(codes, vectors, factor) if factor else codes, factor))
+
+    for codec, index, factor in candidates:
+        first_stage = index.first_stage if isinstance(index, RescoringIndex) else index
+        size = index_bytes(first_stage)
+        recall, latency = evaluate(index, queries, query_ids, truth)
+        rows.append({
+            "store": os.path.basename(store_path),
+            "codec": codec,
+            "rescore_factor": factor,
+            "bytes_per_vector": size / len(vectors),
+            "total_mb": size / 2**20,
+            "recall": recall,
+            "ms_per_query": latency,
+        })
+        print(
+            f"{codec:<8} {factor or '-':>7} {size / len(vectors):>9.0f} {size / 2**20:>9.2f} "
+            f"{recall:>10.2%} {latency:>9.2f}"
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    print(
+        f"Index factory {settings.FAISS_INDEX_FACTORY} (flat below {settings.FAISS_ANN_MIN_VECTORS} vectors). "
+        "Rescoring reads shortlisted rows of the memory-mapped float32 vectors.npy, "
+        "which is not counted in the sizes below."
+    )
+    results = []
+    for path in (REGULATION_PATH, OTHERS_PATH):
+        results.extend(report_store(path))
+
+    report_path = os.path.join("storage", "vector_codec_report.json")
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n🎉 Report written to {report_path}.")
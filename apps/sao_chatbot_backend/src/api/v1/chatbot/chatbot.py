@@ -1,9 +1,16 @@
+import asyncio
+import json
+import logging
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from src.api.v1.models.chatbot import ChatRequest
 from src.api.v1.models import APIResponse
-from src.app.chatbot.chatbot import chatbot
+from src.app.chatbot.chatbot import get_chatbot
+from src.app.chatbot.schemas import StreamEvent
 from src.app.auth.authen import auth_manager as auth
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # route http://localhost:8000/api/v1/chatbot/query
@@ -13,6 +20,7 @@ async def run_rag(
     current_user=Depends(auth.get_current_user) 
 ):
     try:
+        chatbot = await asyncio.to_thread(get_chatbot)
         answer_response = await chatbot.answer_question(
             user_id=current_user["id"], 
             session_id=request.session_id,
@@ -30,4 +38,39 @@ async def run_rag(
             success=False,
             message=f"Error processing RAG request: {str(e)}",
             data=None
-        )
\ No newline at end of file
+        )
+
+# route http://localhost:8000/api/v1/chatbot/query/stream
+@router.post("/query/stream")
+async def run_rag_stream(
+    request: ChatRequest,
+    current_user=Depends(auth.get_current_user)
+):
+    """
+    Server-sent events: route, retrieval, token (answer text as generated),
+    references, and a final done event carrying the complete answer and
+    references as /query returns them. Failures are sent as an error event.
+    """
+    async def events():
+        try:
+            chatbot = await asyncio.to_thread(get_chatbot)
+            async for event in chatbot.stream_answer(
+                user_id=current_user["id"],
+                session_id=request.session_id,
+                query=request.query
+            ):
+                yield _format_sse(event)
+        except Exception as e:
+            logger.error(f"Streaming RAG request failed: {e}", exc_info=True)
+            yield _format_sse(StreamEvent.error(f"Error processing RAG request: {str(e)}"))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream into one response.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _format_sse(event: StreamEvent) -> str:
+    return f"event: {event.event}\ndata: {json.dumps(event.data, ensure_ascii=False)}\n\n"
@@ -1,8 +1,15 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Request
 from src.api.v1.chatbot.chatbot import router as rag_router
 from src.api.v1.chatbot.sessions import router as session_router
 
-chatbot_router = APIRouter()
+
+async def require_ready(request: Request) -> None:
+    """503 until warm-up has built the chatbot, so no request waits on the model load."""
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Chatbot is warming up, retry shortly.")
+
+
+chatbot_router = APIRouter(dependencies=[Depends(require_ready)])
 
 chatbot_router.include_router(rag_router)
 chatbot_router.include_router(session_router)
\ No newline at end of file
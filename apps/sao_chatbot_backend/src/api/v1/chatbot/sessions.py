@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from src.api.v1.models.chatbot import UpdateSessionRequest
 from src.api.v1.models import APIResponse
-from src.app.chatbot.chatbot import chatbot
+from src.app.chatbot.chatbot import get_chatbot
 from src.app.auth.authen import auth_manager as auth
 
 router = APIRouter()
@@ -12,7 +12,7 @@ def get_all_sessions(current_user=Depends(auth.get_current_user)):
     try:
         user_id = current_user["id"]
 
-        sessions = chatbot.get_user_sessions(user_id)
+        sessions = get_chatbot().get_user_sessions(user_id)
 
         return APIResponse(
             success=True,
@@ -33,7 +33,7 @@ def get_chat_history(session_id: str, current_user=Depends(auth.get_current_user
     try:
         user_id = current_user["id"]
 
-        messages = chatbot.get_session_history(user_id, session_id)
+        messages = get_chatbot().get_session_history(user_id, session_id)
 
         return APIResponse(
             success=True,
@@ -57,7 +57,7 @@ def delete_session(session_id: str, current_user=Depends(auth.get_current_user))
     try:
         user_id = current_user["id"]
 
-        result = chatbot.delete_session_history(user_id, session_id)
+        result = get_chatbot().delete_session_history(user_id, session_id)
 
         if result.get("status") == "error":
             return APIResponse(
@@ -90,7 +90,7 @@ def update_session(
     try:
         user_id = current_user["id"]
 
-        result = chatbot.update_session(
+        result = get_chatbot().update_session(
             user_id=user_id,
             session_id=session_id,
             title=payload.title,
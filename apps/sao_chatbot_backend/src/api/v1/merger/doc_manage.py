@@ -5,7 +5,7 @@ from datetime import datetime, date
 from io import BytesIO
 from urllib.parse import quote
 
-from src.app.document.documentManage import manager
+from src.app.document.documentManage import get_document_manager
 
 router = APIRouter()
 
@@ -23,18 +23,18 @@ def parse_date(value: Optional[str]) -> Optional[date]:
 # list 
 @router.get("/doc")
 def list_documents():
-    return manager.list_documents()
+    return get_document_manager().list_documents()
 
 # get forms
 @router.get("/doc/{doc_id}/related")
 def get_related_document(doc_id: str):
-    return manager.get_related_doc(doc_id)
+    return get_document_manager().get_related_doc(doc_id)
 
 # original pdf 
 @router.get("/doc/{doc_id}/original")
 def get_original_pdf(doc_id: str):
     try:
-        file_name, pdf_bytes = manager.get_original_pdf(doc_id)
+        file_name, pdf_bytes = get_document_manager().get_original_pdf(doc_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -76,7 +76,7 @@ def upload_new_pdf(
 
     main_pdf_bytes = main_file.file.read()
 
-    result = manager.create_document(
+    result = get_document_manager().create_document(
         doc_type=doc_type,
         title=title,
         announce_date=announce_date,
@@ -92,7 +92,7 @@ def upload_new_pdf(
     )
 
     background_tasks.add_task(
-        manager.handle_ocr,
+        get_document_manager().handle_ocr,
         doc_id=result["id"],
         pdf_bytes=main_pdf_bytes,
     )
@@ -103,7 +103,7 @@ def upload_new_pdf(
 @router.get("/doc/{doc_id}/status")
 def get_status(doc_id: str):
     try:
-        return manager.get_status(doc_id)
+        return get_document_manager().get_status(doc_id)
     except ValueError as e:
         raise HTTPException(404, str(e))
 
@@ -127,7 +127,7 @@ def edit_doc(
         raise HTTPException(400, "Invalid text file")
 
     try:
-        manager.edit_document(
+        get_document_manager().edit_document(
             doc_id=doc_id,
             title=title,
             type=type,
@@ -147,7 +147,7 @@ def edit_doc(
 @router.get("/doc/{doc_id}/text")
 def get_text(doc_id: str):
     try:
-        text = manager.get_text(doc_id)
+        text = get_document_manager().get_text(doc_id)
     except ValueError as e:
         raise HTTPException(404, str(e))
 
@@ -160,7 +160,7 @@ def get_text(doc_id: str):
 @router.get("/doc/{doc_id}/meta")
 def get_metadata(doc_id: str):
     try:
-        return manager.get_metadata(doc_id)
+        return get_document_manager().get_metadata(doc_id)
     except ValueError as e:
         raise HTTPException(404, str(e))
 
@@ -168,7 +168,7 @@ def get_metadata(doc_id: str):
 @router.delete("/doc/{doc_id}")
 def delete_document(doc_id: str):
     try:
-        manager.delete_document(doc_id)
+        get_document_manager().delete_document(doc_id)
     except ValueError as e:
         raise HTTPException(404, str(e))
 
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from src.app.document.documentSchemas import MergeRequest
-from src.app.document.documentManage import manager
+from src.app.document.documentManage import get_document_manager
 
 router = APIRouter()
 
@@ -8,7 +8,7 @@ router = APIRouter()
 @router.put("/merge")
 def merge_documents(payload: MergeRequest):
     try:
-        result = manager.merge_documents(
+        result = get_document_manager().merge_documents(
             base_doc_id=payload.base_doc_id,
             amend_doc_id=payload.amend_doc_id,
             merge_mode=payload.merge_mode,
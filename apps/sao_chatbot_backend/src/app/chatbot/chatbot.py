@@ -1,9 +1,13 @@
+import asyncio
 import logging
-from typing import Any
+import threading
+from typing import Any, AsyncIterator
 from src.app.chatbot.retriever.retriever import Retriever
-from src.app.chatbot.router import get_top_level_route
-from src.app.chatbot.schemas import RAGResponse
+from src.app.chatbot.local_router import get_local_router
+from src.app.chatbot.router import analyze_query, get_top_level_route
+from src.app.chatbot.schemas import QueryAnalysis, RAGResponse, StreamEvent
 from src.app.llm.llm_manager import get_llm
+from src.config import settings
 from src.db.repositories.chat_repository import ChatRepository
 from src.db.repositories.document_repository import DocumentRepository
 from langchain_core.messages import HumanMessage, AIMessage
@@ -12,6 +16,8 @@ from src.app.chatbot.constants import (
     ROUTE_GENERAL,
     ROUTE_FILE_REQUEST,
     ROUTE_LEGAL_QUERY,
+    STREAM_EVENT_ROUTE,
+    STREAM_EVENT_DONE,
 )
 from src.app.chatbot.handlers import (
     GeneralHandler,
@@ -35,6 +41,10 @@ class Chatbot:
             ROUTE_LEGAL_QUERY:    LegalRagHandler(retriever=self._retriever),
         }
 
+    async def warm_up(self) -> None:
+        await self._retriever.warm_up()
+        await asyncio.to_thread(get_local_router)
+
     async def answer_question(
         self, user_id: str, session_id: str, query: str
     ) -> RAGResponse:
@@ -42,15 +52,45 @@ class Chatbot:
         logger.info(f"{log_prefix} query: {query[:80]}")
 
         history = self._load_history(user_id, session_id)
-        route = await get_top_level_route(query, history, self._llm)
+        route, analysis = await self._route(query, history)
         logger.info(f"{log_prefix} route: {route}")
 
-        result = await self._handlers[route].handle(query, history, self._llm)
+        result = await self._handlers[route].handle(query, history, self._llm, analysis=analysis)
 
         self._save_message(user_id, session_id, query, result)
 
         return result
 
+    async def stream_answer(
+        self, user_id: str, session_id: str, query: str
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Like answer_question, as events: the route, handler progress, answer
+        tokens as the LLM produces them, and last the complete answer. The
+        exchange is saved before that final event, so it is only persisted
+        when the stream runs to completion.
+        """
+        log_prefix = f"[{user_id}|{session_id}]"
+        logger.info(f"{log_prefix} query (stream): {query[:80]}")
+
+        history = self._load_history(user_id, session_id)
+        route, analysis = await self._route(query, history)
+        logger.info(f"{log_prefix} route: {route}")
+        yield StreamEvent(event=STREAM_EVENT_ROUTE, data={"route": route})
+
+        async for event in self._handlers[route].stream(query, history, self._llm, analysis=analysis):
+            if event.event == STREAM_EVENT_DONE:
+                result = RAGResponse(**event.data)
+                await asyncio.to_thread(self._save_message, user_id, session_id, query, result)
+            yield event
+
+    async def _route(self, query: str, history: list) -> tuple[str, QueryAnalysis | None]:
+        """Top-level route, with the single-call query analysis when it is enabled."""
+        if settings.QUERY_ANALYSIS_SINGLE_CALL:
+            analysis = await analyze_query(query, history, self._llm)
+            return analysis.route, analysis
+        return await get_top_level_route(query, history, self._llm), None
+
     def get_session_history(
         self, user_id: str, session_id: str
     ) -> list[dict]:
@@ -164,4 +204,15 @@ class Chatbot:
             logger.error(f"_save_message failed: {e}", exc_info=True)
 
 
-chatbot = Chatbot()
\ No newline at end of file
+_chatbot: Chatbot | None = None
+_chatbot_lock = threading.Lock()
+
+
+def get_chatbot() -> Chatbot:
+    """Process-wide Chatbot; the embedder and search indexes load on first call."""
+    global _chatbot
+    if _chatbot is None:
+        with _chatbot_lock:
+            if _chatbot is None:
+                _chatbot = Chatbot()
+    return _chatbot
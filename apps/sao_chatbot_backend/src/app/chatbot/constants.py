@@ -19,6 +19,16 @@ LEGAL_ROUTE_GUIDELINE: Final = "GUIDELINE"
 LEGAL_ROUTE_STANDARD: Final = "STANDARD"
 LEGAL_ROUTE_GENERAL: Final = "GENERAL"
 
+#Answer streaming (server-sent events)
+STREAM_EVENT_ROUTE: Final = "route"
+STREAM_EVENT_RETRIEVAL: Final = "retrieval"
+STREAM_EVENT_TOKEN: Final = "token"
+STREAM_EVENT_REFERENCES: Final = "references"
+STREAM_EVENT_ERROR: Final = "error"
+STREAM_EVENT_DONE: Final = "done"
+# Line separating a streamed legal answer from the citations it used.
+REFERENCES_MARKER: Final = "[REFERENCES]"
+
 #Constant value
 FUZZY_MATCH_THRESHOLD: Final = 65
 DEFAULT_RETRIEVAL_K: Final = 3
@@ -1,9 +1,9 @@
 import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 
-from src.app.chatbot.schemas import RAGResponse
+from src.app.chatbot.schemas import QueryAnalysis, RAGResponse, StreamEvent
 from src.app.chatbot.constants import LLM_TIMEOUT_SECONDS
 
 logger = logging.getLogger(__name__)
@@ -12,8 +12,25 @@ class BaseHandler(ABC):
     _error_message = "ขออภัย ระบบขัดข้องชั่วคราว กรุณาลองใหม่อีกครั้งในภายหลัง"
 
     @abstractmethod
-    async def handle(self, query: str, history: list, llm: Any) -> RAGResponse:
-        """Every handler must implement this."""
+    async def handle(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> RAGResponse:
+        """
+        Every handler must implement this. `analysis` is the single-call query
+        analysis when the chatbot ran one; handlers use what they need from it.
+        """
+
+    async def stream(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Streams the answer as events, ending with StreamEvent.done. By default
+        the complete answer is sent as one token event, for handlers whose
+        output cannot be shown before it is parsed.
+        """
+        result = await self.handle(query, history, llm, analysis=analysis)
+        yield StreamEvent.token(result.answer)
+        yield StreamEvent.done(result)
 
     async def _invoke(self, chain, inputs: dict) -> Any:
         return await asyncio.wait_for(
@@ -21,6 +38,23 @@ class BaseHandler(ABC):
             timeout=LLM_TIMEOUT_SECONDS,
         )
 
+    async def _stream(self, chain, inputs: dict) -> AsyncIterator[Any]:
+        """chain.astream under the same overall deadline as _invoke; raises asyncio.TimeoutError."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LLM_TIMEOUT_SECONDS
+        chunks = chain.astream(inputs)
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(
+                        chunks.__anext__(), timeout=max(deadline - loop.time(), 0)
+                    )
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            await chunks.aclose()
+
     def _error_response(self, message: str | None = None) -> RAGResponse:
         return RAGResponse(answer=message or self._error_message, ref={})
 
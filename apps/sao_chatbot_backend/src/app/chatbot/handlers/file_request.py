@@ -1,10 +1,10 @@
 import asyncio
 import logging
-from typing import Any
+from typing import Any, Optional
 from langchain_core.output_parsers import JsonOutputParser
 from src.app.chatbot.handlers.base import BaseHandler
 from src.app.chatbot.prompts.file_request import build_prompt
-from src.app.chatbot.schemas import RAGResponse, FileResponseSchema
+from src.app.chatbot.schemas import QueryAnalysis, RAGResponse, FileResponseSchema
 from src.app.chatbot.constants import HISTORY_WINDOW
 from src.db.repositories.document_repository import DocumentRepository
 
@@ -19,7 +19,9 @@ class FileRequestHandler(BaseHandler):
         self._prompt = build_prompt()
         self._parser = JsonOutputParser(pydantic_object=FileResponseSchema)
 
-    async def handle(self, query: str, history: list, llm: Any) -> RAGResponse:
+    async def handle(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> RAGResponse:
         available_documents = await self._fetch_documents()
         if available_documents is None:
             return self._error_response("ขออภัยครับ ไม่สามารถเชื่อมต่อฐานข้อมูลได้ในขณะนี้")
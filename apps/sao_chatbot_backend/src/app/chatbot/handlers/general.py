@@ -1,9 +1,9 @@
 import asyncio
 import logging
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 from langchain_core.output_parsers import StrOutputParser
 from src.app.chatbot.handlers.base import BaseHandler
-from src.app.chatbot.schemas import RAGResponse
+from src.app.chatbot.schemas import QueryAnalysis, RAGResponse, StreamEvent
 from src.app.chatbot.prompts.general import build_prompt
 
 logger = logging.getLogger(__name__)
@@ -12,16 +12,10 @@ class GeneralHandler(BaseHandler):
     def __init__(self):
         self._prompt = build_prompt()   
 
-    async def handle(self, query: str, history: list, llm: Any) -> RAGResponse:
-        chain = (
-            {
-                "history": lambda x: history,
-                "input": lambda x: query,
-            }
-            | self._prompt
-            | llm
-            | StrOutputParser()
-        )
+    async def handle(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> RAGResponse:
+        chain = self._chain(query, history, llm)
         try:
             answer = await self._invoke(chain, {})
             return RAGResponse(answer=answer, ref={})
@@ -30,4 +24,36 @@ class GeneralHandler(BaseHandler):
             return self._error_response()
         except Exception as e:
             logger.error(f"General failed: {e}", exc_info=True)
-            return self._error_response()
\ No newline at end of file
+            return self._error_response()
+
+    async def stream(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> AsyncIterator[StreamEvent]:
+        chain = self._chain(query, history, llm)
+        parts = []
+        try:
+            async for chunk in self._stream(chain, {}):
+                if chunk:
+                    parts.append(chunk)
+                    yield StreamEvent.token(chunk)
+            response = RAGResponse(answer="".join(parts), ref={})
+        except asyncio.TimeoutError:
+            logger.error("General stream timed out")
+            response = self._error_response()
+            yield StreamEvent.error(response.answer)
+        except Exception as e:
+            logger.error(f"General stream failed: {e}", exc_info=True)
+            response = self._error_response()
+            yield StreamEvent.error(response.answer)
+        yield StreamEvent.done(response)
+
+    def _chain(self, query: str, history: list, llm: Any):
+        return (
+            {
+                "history": lambda x: history,
+                "input": lambda x: query,
+            }
+            | self._prompt
+            | llm
+            | StrOutputParser()
+        )
@@ -1,24 +1,27 @@
 import asyncio
 import logging
-from typing import Any
+from typing import Any, AsyncIterator, Optional
 
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 
 from src.app.chatbot.router import get_legal_sub_route
 from src.app.chatbot.utils.references import map_references_to_document_ids
 from src.app.chatbot.utils.formatters import format_regulation_context
+from src.app.chatbot.utils.streaming import AnswerStreamParser
 from src.app.chatbot.handlers.base import BaseHandler
-from src.app.chatbot.prompts.legal_query import build_prompt
-from src.app.chatbot.schemas import RAGResponse, LegalResponseSchema
+from src.app.chatbot.prompts.legal_query import build_prompt, build_stream_prompt
+from src.app.chatbot.schemas import QueryAnalysis, RAGResponse, LegalResponseSchema, StreamEvent
 from src.app.chatbot.constants import (
     DEFAULT_RETRIEVAL_K,
     HISTORY_WINDOW,
+    STREAM_EVENT_RETRIEVAL,
     LEGAL_ROUTE_ORDER,
     LEGAL_ROUTE_GUIDELINE,
     LEGAL_ROUTE_STANDARD,
     LEGAL_ROUTE_REGULATION,
 )
 from src.app.chatbot.retriever import Retriever
+from src.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -29,11 +32,13 @@ class LegalRagHandler(BaseHandler):
     def __init__(self, retriever: Retriever):
         self._retriever = retriever
         self._prompt = build_prompt()
+        self._stream_prompt = build_stream_prompt()
         self._parser = JsonOutputParser(pydantic_object=LegalResponseSchema)
 
-    async def handle(self, query: str, history: list, llm: Any) -> RAGResponse:
-        route = await get_legal_sub_route(query, history, llm)
-        retrieved_docs = await self._retrieve(query, history, route)
+    async def handle(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> RAGResponse:
+        _, retrieved_docs = await self._route_and_retrieve(query, history, llm, analysis)
         history_str = self._format_history(history, window=HISTORY_WINDOW)
         context_str = format_regulation_context(retrieved_docs)
 
@@ -59,8 +64,70 @@ class LegalRagHandler(BaseHandler):
             logger.error(f"LegalRagHandler failed: {e}", exc_info=True)
             return self._error_response()
 
+    async def stream(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis] = None
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Streams the answer text as the LLM writes it, using the plain-text
+        prompt, then the references resolved from the citations after it.
+        """
+        route, retrieved_docs = await self._route_and_retrieve(query, history, llm, analysis)
+        yield StreamEvent(
+            event=STREAM_EVENT_RETRIEVAL,
+            data={"legal_route": route, "documents": len(retrieved_docs)},
+        )
+
+        history_str = self._format_history(history, window=HISTORY_WINDOW)
+        context_str = format_regulation_context(retrieved_docs)
+        chain = (
+            {
+                "context": lambda x: context_str,
+                "history": lambda x: history_str,
+                "query":   lambda x: query,
+            }
+            | self._stream_prompt
+            | llm
+            | StrOutputParser()
+        )
+
+        parser = AnswerStreamParser()
+        try:
+            async for chunk in self._stream(chain, {}):
+                text = parser.feed(chunk)
+                if text:
+                    yield StreamEvent.token(text)
+            text = parser.close()
+            if text:
+                yield StreamEvent.token(text)
+            result = {"used_law_names": parser.references}
+            if parser.answer:
+                result["answer_text"] = parser.answer
+            response = self._build_response(result, retrieved_docs)
+            yield StreamEvent.references(response.ref)
+        except asyncio.TimeoutError:
+            logger.error("LegalRagHandler stream timed out")
+            response = self._error_response()
+            yield StreamEvent.error(response.answer)
+        except Exception as e:
+            logger.error(f"LegalRagHandler stream failed: {e}", exc_info=True)
+            response = self._error_response()
+            yield StreamEvent.error(response.answer)
+        yield StreamEvent.done(response)
+
+    async def _route_and_retrieve(
+        self, query: str, history: list, llm: Any, analysis: Optional[QueryAnalysis]
+    ) -> tuple[str, list]:
+        """The legal sub-route and its retrieved documents."""
+        if analysis is not None:
+            route = analysis.legal_route
+            return route, await self._retrieve(query, history, route, analysis)
+        if settings.SPECULATIVE_RETRIEVAL:
+            return await self._speculative_retrieve(query, history, llm)
+        route = await get_legal_sub_route(query, history, llm)
+        return route, await self._retrieve(query, history, route)
+
     async def _retrieve(
-        self, query: str, history: list, route: str
+        self, query: str, history: list, route: str, analysis: Optional[QueryAnalysis] = None
     ) -> list:
         """Calls the correct retriever method based on the legal sub-route."""
         k = DEFAULT_RETRIEVAL_K
@@ -74,11 +141,29 @@ class LegalRagHandler(BaseHandler):
         print(retrieve_fn)
 
         try:
-            return await retrieve_fn(user_query=query, k=k, history=history)
+            return await retrieve_fn(user_query=query, k=k, history=history, analysis=analysis)
         except Exception as e:
             logger.error(f"Retrieval failed for route={route}: {e}", exc_info=True)
             return [] 
 
+    async def _speculative_retrieve(self, query: str, history: list, llm: Any) -> tuple[str, list]:
+        """
+        Classifies the sub-route while the retriever rewrites and embeds the
+        query and runs every route's candidate searches, then finishes
+        retrieval for the classified route and cancels the unused searches.
+        """
+        route_task = asyncio.create_task(get_legal_sub_route(query, history, llm))
+        try:
+            prepared = await self._retriever.prepare(user_query=query, history=history)
+            await self._retriever.speculate(prepared, DEFAULT_RETRIEVAL_K)
+        except Exception as e:
+            logger.error(f"Speculative retrieval failed, retrieving after routing: {e}", exc_info=True)
+            route = await route_task
+            return route, await self._retrieve(query, history, route)
+
+        route = await route_task
+        return route, await self._retriever.retrieve_prepared(prepared, route, DEFAULT_RETRIEVAL_K)
+
     def _build_response(self, result: dict, retrieved_docs: list) -> RAGResponse:
         answer = result.get("answer_text", "ขออภัย ไม่พบข้อมูลที่เกี่ยวข้อง")
         refs_list = result.get("used_law_names", [])
@@ -0,0 +1,403 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.chatbot.constants import (
+    TOP_LEVEL_ROUTES,
+    LEGAL_ROUTE_REGULATION,
+    LEGAL_ROUTE_ORDER,
+    LEGAL_ROUTE_GUIDELINE,
+    LEGAL_ROUTE_STANDARD,
+    LEGAL_ROUTE_GENERAL,
+)
+from src.app.utils.executor import run_blocking
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Classification tasks, named after the example and traffic log fields.
+TASK_ROUTE = "route"
+TASK_LEGAL_ROUTE = "legal_route"
+
+TASK_LABELS = {
+    TASK_ROUTE: frozenset(TOP_LEVEL_ROUTES),
+    TASK_LEGAL_ROUTE: frozenset([
+        LEGAL_ROUTE_REGULATION,
+        LEGAL_ROUTE_ORDER,
+        LEGAL_ROUTE_GUIDELINE,
+        LEGAL_ROUTE_STANDARD,
+        LEGAL_ROUTE_GENERAL,
+    ]),
+}
+
+# Softmax temperature over cosine similarities. BGE-M3 similarities between
+# short queries sit in a narrow band, so a low temperature is needed for
+# confidences to spread out.
+DEFAULT_TEMPERATURE = 0.05
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class CentroidClassifier:
+    """
+    Nearest-centroid classifier over normalised query embeddings. Confidence
+    is the softmax over cosine similarities to each label's centroid.
+    """
+
+    def __init__(self, labels: Sequence[str], centroids: np.ndarray, temperature: float = DEFAULT_TEMPERATURE):
+        self.labels = list(labels)
+        self.centroids = _normalize(centroids)
+        self.temperature = temperature
+
+    @property
+    def dimension(self) -> int:
+        return self.centroids.shape[1]
+
+    @classmethod
+    def fit(
+        cls, embeddings: np.ndarray, labels: Sequence[str], temperature: float = DEFAULT_TEMPERATURE
+    ) -> "CentroidClassifier":
+        embeddings = _normalize(embeddings)
+        names = sorted(set(labels))
+        label_array = np.asarray(labels)
+        centroids = np.stack([embeddings[label_array == name].mean(axis=0) for name in names])
+        return cls(names, centroids, temperature)
+
+    def predict_proba(self, embeddings: np.ndarray) -> np.ndarray:
+        logits = _normalize(embeddings) @ self.centroids.T / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, embedding: np.ndarray) -> Tuple[str, float]:
+        probs = self.predict_proba(embedding)[0]
+        best = int(np.argmax(probs))
+        return self.labels[best], float(probs[best])
+
+
+def save_router_model(path: str, classifiers: Dict[str, CentroidClassifier], model_name: str) -> None:
+    """Writes the classifiers as one .npz, atomically so a running server never reads half a file."""
+    arrays = {}
+    meta = {"model_name": model_name, "tasks": {}}
+    for task, clf in classifiers.items():
+        arrays[f"{task}_centroids"] = clf.centroids
+        meta["tasks"][task] = {"labels": clf.labels, "temperature": clf.temperature}
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_router_model(path: str) -> Tuple[Dict[str, CentroidClassifier], str]:
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        classifiers = {
+            task: CentroidClassifier(info["labels"], data[f"{task}_centroids"], info["temperature"])
+            for task, info in meta["tasks"].items()
+        }
+    return classifiers, meta.get("model_name", "")
+
+
+def read_labelled_queries(paths: Iterable[str], include_history: bool = False) -> Dict[str, Dict[str, str]]:
+    """
+    Reads route labels from JSONL files of {"query", "route" and/or
+    "legal_route"} records: hand-labelled examples and the traffic log.
+    Returns {task: {query: label}}; later records override earlier ones.
+    Traffic that was routed with conversation history is skipped unless
+    include_history is set, since its label may depend on that history.
+    """
+    labelled: Dict[str, Dict[str, str]] = {task: {} for task in TASK_LABELS}
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed line {line_no} of {path}")
+                    continue
+                query = str(record.get("query") or "").strip()
+                if not query or (record.get("has_history") and not include_history):
+                    continue
+                for task, allowed in TASK_LABELS.items():
+                    label = str(record.get(task) or "").strip().upper()
+                    if label in allowed:
+                        labelled[task][query] = label
+    return labelled
+
+
+def traffic_log_paths() -> List[str]:
+    """The traffic log and its rotated backups, oldest first."""
+    path = settings.ROUTER_TRAFFIC_LOG_PATH
+    if not path:
+        return []
+    backups = [f"{path}.{i}" for i in range(settings.ROUTER_TRAFFIC_LOG_BACKUPS, 0, -1)]
+    return backups + [path]
+
+
+_traffic_logger: Optional[logging.Logger] = None
+_traffic_lock = threading.Lock()
+
+
+def _get_traffic_logger() -> Optional[logging.Logger]:
+    """
+    Logger appending to settings.ROUTER_TRAFFIC_LOG_PATH, rotated at
+    ROUTER_TRAFFIC_LOG_MAX_BYTES. Records are written by a listener thread,
+    never on the event loop. None when the log is disabled or unwritable.
+    """
+    global _traffic_logger
+    path = settings.ROUTER_TRAFFIC_LOG_PATH
+    if not path:
+        return None
+    if _traffic_logger is None:
+        with _traffic_lock:
+            if _traffic_logger is None:
+                try:
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                    handler = RotatingFileHandler(
+                        path,
+                        maxBytes=settings.ROUTER_TRAFFIC_LOG_MAX_BYTES,
+                        backupCount=settings.ROUTER_TRAFFIC_LOG_BACKUPS,
+                        encoding="utf-8",
+                        delay=True,
+                    )
+                except OSError as e:
+                    logger.warning(f"Could not open router traffic log '{path}': {e}")
+                    return None
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                records: queue.SimpleQueue = queue.SimpleQueue()
+                listener = QueueListener(records, handler)
+                listener.start()
+                atexit.register(listener.stop)
+
+                traffic = logging.getLogger(f"{__name__}.traffic")
+                traffic.setLevel(logging.INFO)
+                traffic.propagate = False
+                traffic.addHandler(QueueHandler(records))
+                _traffic_logger = traffic
+    return _traffic_logger
+
+
+def log_route_decision(task: str, query: str, label: str, has_history: bool) -> None:
+    """Queues an LLM routing decision for the traffic log, when enabled, as training data."""
+    traffic = _get_traffic_logger()
+    if traffic is None:
+        return
+    record = {"ts": round(time.time(), 3), "query": query, task: label, "has_history": has_history}
+    traffic.info(json.dumps(record, ensure_ascii=False))
+
+
+@dataclass(frozen=True)
+class LocalRoute:
+    label: str
+    confidence: float
+    accepted: bool
+
+
+class RouterStats:
+    """
+    Per-task counts of routes answered locally and by the LLM, and confusion
+    matrices of local predictions (rows) against the LLM's decision
+    (columns): "accepted" from audited local routes, "deferred" from the
+    low-confidence ones that fell back to the LLM.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local: Dict[str, Counter] = defaultdict(Counter)
+        self._llm: Dict[str, Counter] = defaultdict(Counter)
+        self._confusion: Dict[Tuple[str, str], Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+
+    def record_local(self, task: str, label: str) -> None:
+        with self._lock:
+            self._local[task][label] += 1
+
+    def record_llm(self, task: str, local: Optional[LocalRoute], label: str, served: bool) -> None:
+        """served: the LLM's label was used, rather than only compared in an audit."""
+        with self._lock:
+            if served:
+                self._llm[task][label] += 1
+            if local is not None:
+                kind = "accepted" if local.accepted else "deferred"
+                self._confusion[(task, kind)][local.label][label] += 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            stats = {}
+            for task in TASK_LABELS:
+                local_total = sum(self._local[task].values())
+                total = local_total + sum(self._llm[task].values())
+                confusion = {
+                    kind: {pred: dict(row) for pred, row in self._confusion[(task, kind)].items()}
+                    for kind in ("accepted", "deferred")
+                }
+                stats[task] = {
+                    "local": dict(self._local[task]),
+                    "llm": dict(self._llm[task]),
+                    "local_rate": local_total / total if total else 0.0,
+                    "confusion": confusion,
+                    # Share of audited local answers the LLM agreed with, per predicted route.
+                    "audited_precision": {
+                        pred: row.get(pred, 0) / sum(row.values())
+                        for pred, row in confusion["accepted"].items()
+                    },
+                }
+            return stats
+
+
+class LocalRouter:
+    """
+    Answers routing decisions from the query embedding when the classifier
+    is at least `threshold` confident; otherwise the caller asks the LLM and
+    reports its decision back through record_llm.
+
+    The embedding comes from the shared embedder, so retrieval reuses it
+    from the query embedding cache instead of encoding the query again.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        classifiers: Dict[str, CentroidClassifier],
+        threshold: float,
+        audit_rate: float = 0.0,
+    ):
+        self.embedder = embedder
+        self.classifiers = classifiers
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.stats = RouterStats()
+
+    async def classify(self, task: str, query: str) -> Optional[LocalRoute]:
+        clf = self.classifiers.get(task)
+        if clf is None:
+            return None
+        try:
+            embedding = await run_blocking(None, self.embedder.embed_query, query)
+            label, confidence = clf.predict(embedding)
+        except Exception as e:
+            logger.warning(f"Local {task} classification failed, using the LLM router: {e}")
+            return None
+
+        local = LocalRoute(label=label, confidence=confidence, accepted=confidence >= self.threshold)
+        logger.debug(f"Local {task}: {label} ({confidence:.2f}, {'accepted' if local.accepted else 'deferred'})")
+        return local
+
+    def should_audit(self) -> bool:
+        """Whether to also ask the LLM about a served local route, for the confusion stats."""
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def record_local(self, task: str, local: LocalRoute) -> None:
+        self.stats.record_local(task, local.label)
+
+    def record_llm(self, task: str, local: Optional[LocalRoute], label: str, served: bool = True) -> None:
+        self.stats.record_llm(task, local, label, served)
+        if local is not None and local.label != label:
+            logger.debug(f"Local {task} {local.label} ({local.confidence:.2f}) disagrees with LLM: {label}")
+
+
+def _load_local_router() -> Optional[LocalRouter]:
+    path = settings.LOCAL_ROUTER_PATH
+    if not path or not os.path.exists(path):
+        return None
+    from src.app.utils.embedding import get_embedder
+
+    try:
+        classifiers, model_name = load_router_model(path)
+    except Exception as e:
+        logger.error(f"Could not load local router '{path}', using the LLM router: {e}")
+        return None
+
+    embedder = get_embedder()
+    dimension = embedder.embedding_dimension
+    mismatched = [task for task, clf in classifiers.items() if clf.dimension != dimension]
+    if mismatched:
+        logger.error(
+            f"Local router '{path}' was trained on {model_name} embeddings of another size; "
+            f"retrain it with scripts/train_local_router.py. Using the LLM router."
+        )
+        return None
+
+    logger.info(
+        f"Local router loaded from {path} ({', '.join(classifiers)}), "
+        f"threshold {settings.LOCAL_ROUTER_THRESHOLD}."
+    )
+    return LocalRouter(
+        embedder,
+        classifiers,
+        threshold=settings.LOCAL_ROUTER_THRESHOLD,
+        audit_rate=settings.LOCAL_ROUTER_AUDIT_RATE,
+    )
+
+
+def _model_stamp(path: Optional[str]):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except (OSError, TypeError):
+        return None
+
+
+_local_router: Optional[LocalRouter] = None
+_local_router_stamp = None
+_local_router_loaded = False
+_local_router_lock = threading.Lock()
+
+
+def _needs_load(stamp) -> bool:
+    return not _local_router_loaded or stamp != _local_router_stamp
+
+
+def get_local_router() -> Optional[LocalRouter]:
+    """
+    Process-wide local router, or None when disabled or not trained yet.
+    Reloaded when scripts/train_local_router.py rewrites the model file.
+    Blocking: a (re)load may load the embedder. On the event loop use
+    ensure_local_router() or current_local_router().
+    """
+    global _local_router, _local_router_stamp, _local_router_loaded
+    if not settings.LOCAL_ROUTER_ENABLED:
+        return None
+    stamp = _model_stamp(settings.LOCAL_ROUTER_PATH)
+    if _needs_load(stamp):
+        with _local_router_lock:
+            if _needs_load(stamp):
+                _local_router = _load_local_router()
+                _local_router_stamp = stamp
+                _local_router_loaded = True
+    return _local_router
+
+
+async def ensure_local_router() -> Optional[LocalRouter]:
+    """get_local_router() for the event loop: a (re)load runs in a worker thread."""
+    if not settings.LOCAL_ROUTER_ENABLED:
+        return None
+    if _needs_load(_model_stamp(settings.LOCAL_ROUTER_PATH)):
+        return await asyncio.to_thread(get_local_router)
+    return _local_router
+
+
+def current_local_router() -> Optional[LocalRouter]:
+    """The router as last loaded, without checking the model file; never blocks."""
+    return _local_router if settings.LOCAL_ROUTER_ENABLED else None
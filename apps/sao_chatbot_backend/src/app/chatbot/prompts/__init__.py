@@ -3,6 +3,7 @@ from .file_request import build_prompt as build_file_request_prompt
 from .legal_query import build_prompt as build_legal_rag_prompt
 from .routing import build_prompt as build_routing_prompt
 from .legal_routing import build_prompt as build_legal_routing_prompt
+from .query_analysis import build_prompt as build_query_analysis_prompt
 
 __all__ = [
     "build_chitchat_prompt",
@@ -10,4 +11,5 @@ __all__ = [
     "build_legal_rag_prompt",
     "build_routing_prompt",
     "build_legal_routing_prompt",
+    "build_query_analysis_prompt",
 ]
\ No newline at end of file
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Set
+
+from .query_context import QueryContext
+from .search import FusedHit, hybrid_search_other, hybrid_search_regulation
+from .snapshot import RetrievalSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateSets:
+    """
+    First-stage hybrid search results for one query, memoised by (store,
+    fetch size, doc-type filter) so every route that needs the same set shares
+    one search.
+
+    Sets can be started speculatively (claim=False) before the route is known;
+    cancel_unclaimed() then cancels the ones no route asked for.
+    """
+
+    def __init__(self, snap: RetrievalSnapshot, ctx: QueryContext, executor):
+        self._snap = snap
+        self._ctx = ctx
+        self._executor = executor
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._claimed: Set[Hashable] = set()
+
+    def _task(self, key: Hashable, make_coro, claim: bool) -> asyncio.Task:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_coro())
+            self._tasks[key] = task
+        if claim:
+            self._claimed.add(key)
+        return task
+
+    def regulation(self, n: int, claim: bool = True) -> "asyncio.Task[List[FusedHit]]":
+        snap = self._snap
+        return self._task(
+            ("regulation", n),
+            lambda: hybrid_search_regulation(
+                snap.reg_index, snap.reg_keyword, snap.reg_validity, self._ctx, n, self._executor
+            ),
+            claim,
+        )
+
+    def other(self, n: int, doc_type: Optional[str] = None, claim: bool = True) -> "asyncio.Task[List[FusedHit]]":
+        snap = self._snap
+        return self._task(
+            ("other", n, doc_type),
+            lambda: hybrid_search_other(
+                snap.other_index,
+                snap.other_keyword,
+                snap.other_validity,
+                self._ctx,
+                n,
+                self._executor,
+                snap.doc_type_mask(doc_type) if doc_type else None,
+            ),
+            claim,
+        )
+
+    def cancel_unclaimed(self) -> int:
+        """Cancels speculative searches no route claimed; returns how many were still running."""
+        cancelled = 0
+        for key, task in self._tasks.items():
+            if key in self._claimed:
+                continue
+            if not task.done():
+                task.cancel()
+                cancelled += 1
+            elif not task.cancelled() and task.exception() is not None:
+                logger.debug(f"Unused speculative search {key} failed: {task.exception()}")
+        return cancelled
+
+
+@dataclass
+class PreparedQuery:
+    """
+    The route-independent part of a retrieval: the snapshot, the effective
+    (rewritten) query and its keywords, the ANN search effort (None uses
+    settings.FAISS_EF_SEARCH / FAISS_NPROBE), and, once built, the
+    QueryContext and its candidate sets.
+    """
+    snap: RetrievalSnapshot
+    query: str
+    keywords: List[str]
+    search_date: Optional[str]
+    ef_search: Optional[int] = None
+    nprobe: Optional[int] = None
+    ctx: Optional[QueryContext] = None
+    candidates: Optional[CandidateSets] = None
@@ -0,0 +1,204 @@
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.app.chatbot.utils.formatters import simplify_thai_text, thai_to_arabic, normalize_regulation_id
+
+logger = logging.getLogger(__name__)
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+
+_EDITION_RE = re.compile(r"\(ฉบับที่.*?\)|พ\.ศ\..*$")
+_CLAUSE_RE = re.compile(r"ข้อ\s*(\d+)")
+_DIGITS_RE = re.compile(r"\d+")
+_SUB_CLAUSE_RE = re.compile(r"\((\d+)\)")
+_LEADING_SUB_CLAUSE_RE = re.compile(r"^\s*\(([๐-๙0-9]+)\)")
+
+ClauseKey = Tuple[str, Optional[str]]
+
+
+def core_law_name(law_name: str) -> str:
+    """Law name without edition/year suffixes, simplified for matching."""
+    return simplify_thai_text(_EDITION_RE.sub("", law_name or "").strip())
+
+
+def parse_clause_key(raw: str) -> Optional[ClauseKey]:
+    """
+    Parses a clause reference such as "ข้อ ๒๖ (๑)" into ("26", "1").
+    Returns None when no clause number can be found.
+    """
+    text = thai_to_arabic(normalize_regulation_id(raw))
+    base = _CLAUSE_RE.search(text) or _DIGITS_RE.search(text)
+    if not base:
+        return None
+    sub = _SUB_CLAUSE_RE.search(text[base.end():])
+    return base.group(1) if base.re is _CLAUSE_RE else base.group(0), sub.group(1) if sub else None
+
+
+def chunk_clause_key(reg_doc: Dict) -> Optional[ClauseKey]:
+    """
+    Clause key of a regulation chunk: the clause number from its id, plus the
+    sub-clause number when the chunk text starts with "(n)".
+    """
+    key = parse_clause_key(reg_doc.get("id", ""))
+    if not key:
+        return None
+    sub = _LEADING_SUB_CLAUSE_RE.search(reg_doc.get("text", ""))
+    return key[0], thai_to_arabic(sub.group(1)) if sub else None
+
+
+def build_title_index(metadata: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Builds a posting list per document title: simplified law_name -> sorted
+    chunk positions, so related-document lookups can search only the chunks
+    of the titles they are allowed to return.
+    """
+    postings: Dict[str, List[int]] = defaultdict(list)
+    for pos, doc in enumerate(metadata):
+        postings[simplify_thai_text(doc.get("law_name", ""))].append(pos)
+    return {title: np.asarray(ids, dtype=np.int64) for title, ids in postings.items()}
+
+
+def resolve_title_candidates(title_index: Dict[str, np.ndarray], titles: List[str]) -> np.ndarray:
+    """
+    Returns the sorted chunk positions of every indexed title that matches one
+    of titles (substring match in either direction on simplified text).
+    """
+    normalized = [simplify_thai_text(t) for t in titles]
+    postings = [
+        ids
+        for title, ids in title_index.items()
+        if title and any(nt in title or title in nt for nt in normalized)
+    ]
+    if not postings:
+        return _EMPTY_IDS
+    return np.unique(np.concatenate(postings))
+
+
+class ClauseGraph:
+    """
+    Bidirectional, integer-keyed links between regulation chunks and
+    other-document chunks, compiled once from master_map and source_map.
+
+    - related_other_ids(reg_pos): other-document chunks a regulation clause
+      points to (master_map), sorted for restricted search.
+    - parent_regulation_ids(other_pos): regulation chunks an other-document
+      cites (source_map), in citation order.
+    """
+
+    def __init__(self, reg_to_other: Dict[int, np.ndarray], other_to_reg: Dict[int, np.ndarray]):
+        self.reg_to_other = reg_to_other
+        self.other_to_reg = other_to_reg
+
+    @classmethod
+    def empty(cls) -> "ClauseGraph":
+        return cls({}, {})
+
+    @classmethod
+    def compile(
+        cls,
+        master_map: Dict,
+        source_map: Dict,
+        reg_metadata: List[Dict],
+        other_metadata: List[Dict],
+    ) -> "ClauseGraph":
+        graph = cls(
+            cls._compile_related(master_map, reg_metadata, build_title_index(other_metadata)),
+            cls._compile_parents(source_map, reg_metadata, other_metadata),
+        )
+        logger.info(f"Compiled clause graph: {graph}")
+        return graph
+
+    @staticmethod
+    def _compile_related(
+        master_map: Dict, reg_metadata: List[Dict], other_title_index: Dict[str, np.ndarray]
+    ) -> Dict[int, np.ndarray]:
+        laws = []
+        for law_name, clauses in (master_map or {}).items():
+            by_clause: Dict[ClauseKey, List[str]] = defaultdict(list)
+            for raw_key, titles in clauses.items():
+                key = parse_clause_key(raw_key)
+                if key:
+                    by_clause[key].extend(titles)
+                    # A whole-clause chunk is related to every sub-clause's titles.
+                    if key[1] is not None:
+                        by_clause[(key[0], None)].extend(titles)
+            laws.append((simplify_thai_text(law_name), by_clause))
+
+        law_of_core: Dict[str, Optional[int]] = {}
+        resolved: Dict[Tuple[int, ClauseKey], np.ndarray] = {}
+        reg_to_other: Dict[int, np.ndarray] = {}
+
+        for pos, doc in enumerate(reg_metadata):
+            core = core_law_name(doc.get("law_name", ""))
+            if core not in law_of_core:
+                law_of_core[core] = next(
+                    (i for i, (name, _) in enumerate(laws) if core and (core in name or name in core)),
+                    None,
+                )
+            law_idx = law_of_core[core]
+            key = chunk_clause_key(doc)
+            if law_idx is None or key is None:
+                continue
+
+            if (law_idx, key) not in resolved:
+                titles = laws[law_idx][1].get(key, [])
+                resolved[(law_idx, key)] = (
+                    resolve_title_candidates(other_title_index, list(set(titles))) if titles else _EMPTY_IDS
+                )
+            if len(resolved[(law_idx, key)]):
+                reg_to_other[pos] = resolved[(law_idx, key)]
+
+        return reg_to_other
+
+    @staticmethod
+    def _compile_parents(
+        source_map: Dict, reg_metadata: List[Dict], other_metadata: List[Dict]
+    ) -> Dict[int, np.ndarray]:
+        if not source_map:
+            return {}
+
+        reg_by_clause: Dict[str, List[int]] = defaultdict(list)
+        for pos, doc in enumerate(reg_metadata):
+            key = parse_clause_key(doc.get("id", ""))
+            if key:
+                reg_by_clause[key[0]].append(pos)
+
+        def _matches(entry: str) -> List[int]:
+            reg_name, _, section = (part.strip() for part in entry.partition(":"))
+            if not section:
+                return [p for p, doc in enumerate(reg_metadata) if reg_name in doc.get("law_name", "")]
+            key = parse_clause_key(section)
+            if not key:
+                return []
+            base, sub = key
+            sub_markers = (f"({sub})", f"({sub})".translate(str.maketrans("0123456789", "๐๑๒๓๔๕๖๗๘๙"))) if sub else ()
+            return [
+                p for p in reg_by_clause.get(base, [])
+                if reg_name in reg_metadata[p].get("law_name", "")
+                and (not sub_markers or any(m in reg_metadata[p].get("text", "") for m in sub_markers))
+            ]
+
+        parents_of_title: Dict[str, np.ndarray] = {}
+        for title, entries in source_map.items():
+            positions = [p for entry in entries for p in _matches(entry)]
+            if positions:
+                parents_of_title[title.strip()] = np.asarray(list(dict.fromkeys(positions)), dtype=np.int64)
+
+        return {
+            pos: parents_of_title[title]
+            for pos, doc in enumerate(other_metadata)
+            if (title := doc.get("law_name", "").strip()) in parents_of_title
+        }
+
+    def related_other_ids(self, reg_pos: Optional[int]) -> np.ndarray:
+        return self.reg_to_other.get(reg_pos, _EMPTY_IDS)
+
+    def parent_regulation_ids(self, other_pos: Optional[int]) -> np.ndarray:
+        return self.other_to_reg.get(other_pos, _EMPTY_IDS)
+
+    def __repr__(self) -> str:
+        return f"ClauseGraph(reg->other={len(self.reg_to_other)}, other->reg={len(self.other_to_reg)})"
@@ -1,11 +1,17 @@
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
 
 from src.app.chatbot.constants import DATE_FORMAT, DATE_MAX, DATE_MIN
+from src.app.utils.cache import LRUCache
+from src.db.vector_store.chunk_store import ChunkStore
 
 logger = logging.getLogger(__name__)
 
+_NEVER_VALID = np.iinfo(np.int32).max
+
 
 def _parse_date(val, is_expiry: bool = False) -> datetime:
     """
@@ -51,6 +57,11 @@ def _is_valid_on_date(doc: Dict, target_dt: datetime) -> bool:
     return eff_dt <= target_dt <= exp_dt
 
 
+def candidate_key(doc: Dict) -> str:
+    """Identity of a chunk for deduplication: law_name|id."""
+    return f"{doc.get('law_name', '')}|{doc.get('id') or doc.get('document_id', '')}"
+
+
 def filter_by_date(
     candidates: List[Dict],
     k: int,
@@ -60,12 +71,20 @@ def filter_by_date(
     Filters candidates to documents valid on search_date (defaults to today in พ.ศ.),
     deduplicates by (law_name, id), and returns up to k results.
     """
-    target_dt = _get_target_date(search_date)
+    return filter_by_target_date(candidates, k, _get_target_date(search_date))
+
+
+def filter_by_target_date(
+    candidates: List[Dict],
+    k: int,
+    target_dt: datetime,
+) -> List[Dict]:
+    """Same as filter_by_date, for callers that already parsed the target date."""
     filtered: List[Dict] = []
     seen_keys: set = set()
 
     for doc in candidates:
-        unique_key = f"{doc.get('law_name', '')}|{doc.get('id') or doc.get('document_id', '')}"
+        unique_key = candidate_key(doc)
 
         if unique_key in seen_keys:
             continue
@@ -81,4 +100,114 @@ def filter_by_date(
         if len(filtered) >= k:
             break
 
-    return filtered
\ No newline at end of file
+    return filtered
+
+
+def dedupe_hits(hits: List, metadata: List[Dict], k: int) -> List:
+    """
+    dedupe_candidates for fused (idx, score) hits: keys are read from the
+    store's metadata without copying it. Hits outside metadata are dropped.
+    """
+    deduped = []
+    seen_keys: set = set()
+
+    for hit in hits:
+        if hit.idx >= len(metadata):
+            continue
+        unique_key = candidate_key(metadata[hit.idx])
+        if unique_key in seen_keys:
+            continue
+        deduped.append(hit)
+        seen_keys.add(unique_key)
+        if len(deduped) >= k:
+            break
+
+    return deduped
+
+
+def dedupe_candidates(candidates: List[Dict], k: int) -> List[Dict]:
+    """
+    Deduplicates by (law_name, id) and returns up to k results. For candidates
+    whose validity was already enforced during search.
+    """
+    deduped: List[Dict] = []
+    seen_keys: set = set()
+
+    for doc in candidates:
+        unique_key = candidate_key(doc)
+        if unique_key in seen_keys:
+            continue
+        deduped.append(doc)
+        seen_keys.add(unique_key)
+        if len(deduped) >= k:
+            break
+
+    return deduped
+
+
+def _date_ordinal(val, is_expiry: bool) -> int:
+    """Day ordinal of a date value; unparseable dates make the document never valid."""
+    try:
+        return _parse_date(val, is_expiry=is_expiry).toordinal()
+    except Exception as e:
+        logger.error(f"Unparseable date '{val}', excluding affected documents: {e}")
+        return 0 if is_expiry else _NEVER_VALID
+
+
+def _date_column_ordinals(chunks: ChunkStore, name: str, is_expiry: bool) -> np.ndarray:
+    """Day ordinals of a dictionary-encoded date column, parsing each distinct value once."""
+    missing = _date_ordinal(None, is_expiry=is_expiry)
+    if name not in chunks.codes:
+        return np.full(len(chunks), missing, dtype=np.int32)
+
+    codes, categories = chunks.categorical(name)
+    # Code -1 (field absent) indexes the trailing "missing" entry.
+    lookup = np.array(
+        [_date_ordinal(val, is_expiry=is_expiry) for val in categories] + [missing], dtype=np.int32
+    )
+    return lookup[codes]
+
+
+class ValidityIndex:
+    """
+    Effective/expire dates of a store's chunks as integer day ordinals, aligned
+    with the store's positions. Validity masks are computed with numpy once per
+    target date and cached, so search can restrict candidates to documents in
+    force without parsing dates per request.
+    """
+
+    def __init__(self, effective: np.ndarray, expire: np.ndarray, cache_size: int = 64):
+        self.effective = effective
+        self.expire = expire
+        self._masks = LRUCache(max_size=cache_size)
+
+    @classmethod
+    def from_metadata(cls, metadata: Sequence[Dict]) -> "ValidityIndex":
+        if isinstance(metadata, ChunkStore):
+            return cls(
+                _date_column_ordinals(metadata, "effective_date", is_expiry=False),
+                _date_column_ordinals(metadata, "expire_date", is_expiry=True),
+            )
+
+        effective = np.empty(len(metadata), dtype=np.int32)
+        expire = np.empty(len(metadata), dtype=np.int32)
+        for pos, doc in enumerate(metadata):
+            effective[pos] = _date_ordinal(doc.get("effective_date"), is_expiry=False)
+            expire[pos] = _date_ordinal(doc.get("expire_date"), is_expiry=True)
+
+        return cls(effective, expire)
+
+    def mask(self, target_dt: datetime) -> Optional[np.ndarray]:
+        """
+        Boolean mask of positions in force on target_dt, or None when every
+        position is (no restriction needed).
+        """
+        ordinal = target_dt.toordinal()
+        return self._masks.get_or_compute(ordinal, lambda: self._compute_mask(ordinal))
+
+    def _compute_mask(self, ordinal: int) -> Optional[np.ndarray]:
+        mask = (self.effective <= ordinal) & (ordinal <= self.expire)
+        return None if mask.all() else mask
+
+    def __len__(self) -> int:
+        return len(self.effective)
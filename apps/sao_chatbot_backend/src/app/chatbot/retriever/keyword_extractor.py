@@ -0,0 +1,90 @@
+import logging
+import re
+from typing import Iterable, List, Optional, Sequence
+
+from pythainlp.corpus import thai_stopwords
+from pythainlp.util import thai_digit_to_arabic_digit
+
+from src.app.utils.tokenizer import tokenize_query
+from src.db.vector_store.bm25_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+MAX_KEYWORDS = 8
+
+# Clause references, normalised to how chunk ids are written ("ข้อ 26").
+_CLAUSE = re.compile(r"(ข้อ|มาตรา|วรรค|หมวด|ส่วนที่)\s*([0-9]+(?:/[0-9]+)?)")
+
+# Document-type and institution terms that decide which documents match but
+# occur in so many chunks that their idf alone would rank them last.
+LEGAL_PHRASES = (
+    "ระเบียบ",
+    "คำสั่ง",
+    "หลักเกณฑ์",
+    "แนวทาง",
+    "มาตรฐาน",
+    "ประกาศ",
+    "พระราชบัญญัติ",
+    "พ.ร.บ.",
+    "สตง.",
+    "หน่วยรับตรวจ",
+    "ผู้ว่าการตรวจเงินแผ่นดิน",
+    "คณะกรรมการตรวจเงินแผ่นดิน",
+)
+
+_stopwords: Optional[frozenset] = None
+
+
+def _get_stopwords() -> frozenset:
+    global _stopwords
+    if _stopwords is None:
+        _stopwords = frozenset(thai_stopwords())
+    return _stopwords
+
+
+def _is_candidate(token: str) -> bool:
+    token = token.strip()
+    return len(token) > 1 and any(ch.isalpha() for ch in token) and token not in _get_stopwords()
+
+
+def _term_weight(token: str, indexes: Sequence[BM25Index]) -> Optional[float]:
+    """Highest idf of the token over the loaded BM25 indexes; None if no store contains it."""
+    weights = [idx.idf[idx.term_to_id[token]] for idx in indexes if token in idx.term_to_id]
+    return max(weights) if weights else None
+
+
+def extract_local_keywords(query: str, keyword_indexes: Iterable = (), max_keywords: int = MAX_KEYWORDS) -> List[str]:
+    """
+    Keywords for the BM25 leg without an LLM call: clause references first,
+    then legal phrases named in the query, then the remaining content words
+    ranked by idf over the indexed vocabulary. Words no store contains are
+    dropped, since they cannot match. Without BM25 indexes (e.g. the sparse
+    keyword backend) content words are kept in query order.
+    """
+    if not query or not query.strip():
+        return []
+    text = thai_digit_to_arabic_digit(query).strip().lower()
+    indexes = [idx for idx in keyword_indexes if isinstance(idx, BM25Index) and idx.corpus_size]
+
+    clauses = _CLAUSE.findall(text)
+    keywords = [f"{kind} {number}" for kind, number in clauses]
+    keywords.extend(phrase for phrase in LEGAL_PHRASES if phrase in text)
+    covered = set(keywords) | {kind for kind, _ in clauses}
+
+    scored = []
+    for position, token in enumerate(tokenize_query(text)):
+        token = token.strip()
+        if not _is_candidate(token) or token in covered:
+            continue
+        if indexes:
+            weight = _term_weight(token, indexes)
+            if weight is None:
+                continue
+            scored.append((-weight, position, token))
+        else:
+            scored.append((0.0, position, token))
+
+    for _, _, token in sorted(scored):
+        if token not in keywords:
+            keywords.append(token)
+    return keywords[:max_keywords]
@@ -0,0 +1,66 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.app.utils.tokenizer import tokenize_query
+from .filters import _get_target_date
+
+logger = logging.getLogger(__name__)
+
+
+def tokenize_keywords(keyword_list: List[str]) -> List[str]:
+    """Tokenises LLM keywords into BM25 query terms, memoising each phrase."""
+    tokens = []
+    for phrase in keyword_list:
+        tokens.extend(tokenize_query(phrase.lower()))
+    return tokens
+
+
+@dataclass(frozen=True)
+class QueryContext:
+    """
+    Request-scoped view of a query: everything search derives from the user's
+    question is computed once here and shared by every search and lookup.
+    """
+    query: str
+    keywords: List[str]
+    embedding: Optional[np.ndarray]
+    tokens: List[str]
+    search_date: Optional[str]
+    target_date: datetime
+    ef_search: Optional[int] = None
+    nprobe: Optional[int] = None
+    # BGE-M3 lexical weights of the query, for the sparse keyword index.
+    lexical: Optional[Dict[int, float]] = None
+
+    @classmethod
+    def build(
+        cls,
+        embedder,
+        query: str,
+        keywords: List[str],
+        search_date: Optional[str] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ) -> "QueryContext":
+        try:
+            embedding, lexical = embedder.embed_query_with_lexical(query)
+            embedding = np.atleast_2d(embedding).astype("float32")
+        except Exception as e:
+            logger.error(f"Query embedding failed, vector search disabled for this request: {e}")
+            embedding, lexical = None, None
+
+        return cls(
+            query=query,
+            keywords=keywords,
+            embedding=embedding,
+            tokens=tokenize_keywords(keywords) if keywords else [],
+            search_date=search_date,
+            target_date=_get_target_date(search_date),
+            ef_search=ef_search,
+            nprobe=nprobe,
+            lexical=lexical,
+        )
@@ -2,10 +2,9 @@ import re
 import logging
 from typing import List, Dict
 
-from pythainlp import word_tokenize
-
 from src.app.chatbot.prompts.query_rewrite import build_prompt as build_rewrite_prompt
 from src.app.chatbot.prompts.keyword_extract import build_prompt as build_keyword_prompt
+from src.app.utils.tokenizer import tokenize_query
 
 logger = logging.getLogger(__name__)
 
@@ -64,8 +63,8 @@ async def extract_keywords(llm, query_text: str) -> List[str]:
             re.sub(r"^(Keywords|คำสำคัญ):\s*", "", k, flags=re.IGNORECASE).strip()
             for k in keywords
         ]
-        return keywords or word_tokenize(query_text, engine="newmm")
+        return keywords or list(tokenize_query(query_text))
     
     except Exception as e:
         logger.error(f"Keyword extraction failed for '{query_text}': {e}")
-        return word_tokenize(query_text, engine="newmm")
+        return list(tokenize_query(query_text))
@@ -1,26 +1,45 @@
 import asyncio
+import copy
+import functools
 import logging
+import threading
+import time
 from threading import Lock
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
+from src.app.chatbot.schemas import QueryAnalysis
 from src.app.llm.llm_manager import get_llm
-from src.app.utils.embedding import global_embedder
-
-from .filters import filter_by_date
+from src.app.utils.cache import LRUCache
+from src.app.utils.embedding import get_embedder, normalize_query_text
+from src.app.utils.executor import get_retrieval_executor, run_blocking
+from src.app.utils.tokenizer import query_token_cache
+from src.config import settings
+
+from .candidates import CandidateSets, PreparedQuery
+from .filters import _get_target_date, candidate_key, dedupe_hits
+from .keyword_extractor import extract_local_keywords
+from .query_context import QueryContext
 from .query_rewriter import extract_keywords, rewrite_query_with_history
-from .search import hybrid_search_other, hybrid_search_regulation
-from .store_loader import load_master_map, load_store
+from .search import FusedHit, materialize_hits
+from .snapshot import RetrievalSnapshot, current_generation
 from .document_mapper import fetch_exact_parent_regulations, fetch_related_other_documents
 from src.app.chatbot.constants import (
-    REGULATION_PATH,
-    OTHERS_PATH,
-    MASTER_MAP_PATH,
-    SOURCE_MAP_PATH,
     DEFAULT_RETRIEVE_K,
     RELATED_DOCS_K,
     FETCH_MULTIPLIER,
+    LEGAL_ROUTE_ORDER,
+    LEGAL_ROUTE_GUIDELINE,
+    LEGAL_ROUTE_STANDARD,
+    LEGAL_ROUTE_REGULATION,
 )
 
+# Legal sub-routes served from the others store, by the doc_type they search.
+_OTHER_ROUTE_DOC_TYPES = {
+    LEGAL_ROUTE_ORDER: "คำสั่ง",
+    LEGAL_ROUTE_GUIDELINE: "แนวทาง",
+    LEGAL_ROUTE_STANDARD: "หลักเกณฑ์",
+}
+
 _DOC_TYPE_BOOSTS = {
     "ระเบียบ": 1.30,
     "คำสั่ง": 1.10,
@@ -31,76 +50,284 @@ logger = logging.getLogger(__name__)
 
 class Retriever:
     def __init__(self):
-        self.embedder = global_embedder
+        self.embedder = get_embedder()
         self.llm = get_llm().get_model()
+        self.executor = get_retrieval_executor()
+        # Held while a background reload is building the next snapshot.
         self.search_lock = Lock()
 
-        self.master_map: Dict = {}
-        self.source_map: Dict = {}
+        self.result_cache = LRUCache(max_size=settings.RETRIEVAL_CACHE_SIZE)
+        # Speculative candidate searches still running, across requests.
+        self._speculative_in_flight = 0
+
+        self.snapshot = RetrievalSnapshot.load()
+        self._last_generation_check = time.monotonic()
+        logger.info(f"Loaded {self.snapshot}")
+
+    def _current_snapshot(self) -> RetrievalSnapshot:
+        """
+        Returns the live snapshot. At most every RETRIEVER_RELOAD_INTERVAL
+        seconds, compares generations and, if the indexes changed, starts
+        building the next snapshot in the background; this request keeps
+        using the current one.
+        """
+        now = time.monotonic()
+        if now - self._last_generation_check < settings.RETRIEVER_RELOAD_INTERVAL:
+            return self.snapshot
+        self._last_generation_check = now
 
-        self.reg_index = None
-        self.reg_metadata: List[Dict] = []
-        self.reg_bm25 = None
+        try:
+            changed = current_generation() != self.snapshot.generation
+        except Exception as e:
+            logger.error(f"Generation check failed: {e}")
+            changed = False
 
-        self.other_index = None
-        self.other_metadata: List[Dict] = []
-        self.other_bm25 = None
+        if changed and self.search_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload_in_background, name="retriever-reload", daemon=True).start()
+        return self.snapshot
 
-        self._reload_resources()
+    def _reload_in_background(self) -> None:
+        try:
+            self.reload()
+        finally:
+            self.search_lock.release()
 
-    def _reload_resources(self) -> None:
+    def reload(self) -> None:
+        """Builds a snapshot of the current indexes and swaps it in atomically."""
         logger.info("Reloading retriever resources...")
-        self.master_map = load_master_map(MASTER_MAP_PATH)
-        self.source_map = load_master_map(SOURCE_MAP_PATH)
-        self.reg_index, self.reg_metadata, self.reg_bm25 = load_store(REGULATION_PATH)
-        self.other_index, self.other_metadata, self.other_bm25 = load_store(OTHERS_PATH)
+        try:
+            snapshot = RetrievalSnapshot.load()
+        except Exception as e:
+            logger.error(f"Retriever reload failed, keeping generation {self.snapshot.generation}: {e}")
+            return
+        self.snapshot = snapshot
+        # Keys carry the generation, so old entries could never hit again.
+        self.result_cache.clear()
+        logger.info(f"Swapped in {snapshot}")
+
+    async def warm_up(self, probe: str = "ระเบียบ") -> None:
+        """
+        Runs one embedding and one hybrid search per store without calling the
+        LLM, so model weights, mapped index pages and keyword postings are
+        resident before the first real request.
+        """
+        snap = self._current_snapshot()
+        ctx = await run_blocking(self.executor, QueryContext.build, self.embedder, probe, [probe])
+        candidates = CandidateSets(snap, ctx, self.executor)
+        await asyncio.gather(
+            candidates.regulation(DEFAULT_RETRIEVE_K),
+            candidates.other(DEFAULT_RETRIEVE_K),
+        )
 
     async def _effective_query(self, query: str, history: list) -> str:
         return await rewrite_query_with_history(self.llm, query, history)
 
-    async def _keywords(self, query: str) -> List[str]:
-        return await extract_keywords(self.llm, query)
-
-    async def _hybrid_regulation(self, query: str, keywords: List[str], k: int) -> List[Dict]:
-        return await hybrid_search_regulation(
-            self.embedder,
-            self.reg_index,
-            self.reg_bm25,
-            self.reg_metadata,
-            query,
-            keywords,
+    async def _keywords(
+        self, snap: RetrievalSnapshot, query: str, analysis: Optional[QueryAnalysis] = None
+    ) -> List[str]:
+        """
+        BM25 terms for the query: extracted locally from the snapshot's corpus
+        statistics, or by the LLM when KEYWORD_EXTRACTOR is "llm" (or local
+        extraction finds nothing and KEYWORD_LLM_FALLBACK is set). LLM keywords
+        already returned by the query analysis are used without another call.
+        """
+        llm_keywords = analysis.keywords if analysis is not None else None
+        if settings.KEYWORD_EXTRACTOR.lower() == "llm":
+            return llm_keywords or await extract_keywords(self.llm, query)
+        keywords = extract_local_keywords(query, (snap.reg_keyword, snap.other_keyword))
+        if not keywords and settings.KEYWORD_LLM_FALLBACK:
+            return llm_keywords or await extract_keywords(self.llm, query)
+        return keywords
+
+    def _result_key(self, route: str, prepared: PreparedQuery, k: int) -> Tuple:
+        return (
+            route,
+            normalize_query_text(prepared.query),
+            tuple(normalize_query_text(kw) for kw in prepared.keywords),
+            _get_target_date(prepared.search_date).toordinal(),
             k,
+            prepared.ef_search,
+            prepared.nprobe,
+            prepared.snap.generation,
         )
 
-    async def _hybrid_other(self, query: str, keywords: List[str], k: int) -> List[Dict]:
-        return await hybrid_search_other(
-            self.embedder,
-            self.other_index,
-            self.other_bm25,
-            self.other_metadata,
-            query,
-            keywords,
-            k,
+    async def prepare(
+        self,
+        user_query: str,
+        history: list = [],
+        search_date: Optional[str] = None,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ) -> PreparedQuery:
+        """
+        The stages every route shares: rewrites the query and extracts
+        keywords (or takes both from `analysis`) against the live snapshot.
+        ef_search / nprobe set the HNSW / IVF search effort of this request.
+        """
+        snap = self._current_snapshot()
+        if analysis is not None:
+            effective_query = analysis.standalone_query or user_query
+        else:
+            effective_query = await self._effective_query(user_query, history)
+        keywords = await self._keywords(snap, effective_query, analysis)
+        return PreparedQuery(snap, effective_query, keywords, search_date, ef_search, nprobe)
+
+    async def _build_context(self, prepared: PreparedQuery) -> PreparedQuery:
+        """Embeds and tokenises the prepared query once, for all of its searches."""
+        if prepared.ctx is None:
+            prepared.ctx = await run_blocking(
+                self.executor,
+                QueryContext.build,
+                self.embedder,
+                prepared.query,
+                prepared.keywords,
+                prepared.search_date,
+                prepared.ef_search,
+                prepared.nprobe,
+            )
+            prepared.candidates = CandidateSets(prepared.snap, prepared.ctx, self.executor)
+        return prepared
+
+    async def speculate(self, prepared: PreparedQuery, k: int = DEFAULT_RETRIEVE_K) -> None:
+        """
+        Builds the query context and starts the candidate searches of the
+        legal routes, the most widely shared first, so they run while the
+        route is still being classified. retrieve_prepared() then awaits the
+        ones its route needs and cancels the rest.
+
+        Nothing starts when a route's results for the query are already
+        cached. At most SPECULATIVE_MAX_SEARCHES start per query and
+        SPECULATIVE_MAX_IN_FLIGHT across requests: a cancelled search only
+        drops its queued jobs, so unused ones must not crowd the pool.
+        """
+        budget = min(
+            settings.SPECULATIVE_MAX_SEARCHES,
+            settings.SPECULATIVE_MAX_IN_FLIGHT - self._speculative_in_flight,
         )
+        if budget <= 0 or self._has_cached_route(prepared, k):
+            return
+
+        await self._build_context(prepared)
+        candidates = prepared.candidates
+        n = k * FETCH_MULTIPLIER
+        searches = [
+            lambda: candidates.regulation(n, claim=False),
+            lambda: candidates.other(n, claim=False),
+        ] + [
+            functools.partial(candidates.other, n, doc_type, claim=False)
+            for doc_type in _OTHER_ROUTE_DOC_TYPES.values()
+        ]
+        for start in searches[:budget]:
+            self._speculative_in_flight += 1
+            start().add_done_callback(self._speculation_done)
+
+    def _speculation_done(self, _task: asyncio.Task) -> None:
+        self._speculative_in_flight -= 1
+
+    def _has_cached_route(self, prepared: PreparedQuery, k: int) -> bool:
+        """Whether any legal route's results for the prepared query are in the result cache."""
+        routes = ["regulation", "general"] + [f"other:{t}" for t in _OTHER_ROUTE_DOC_TYPES.values()]
+        return any(self._result_key(route, prepared, k) in self.result_cache for route in routes)
+
+    def _route_search(self, legal_route: str) -> Tuple[str, Callable[[PreparedQuery, int], Awaitable[List[Dict]]]]:
+        """Result-cache route name and search function for a legal sub-route."""
+        if legal_route in _OTHER_ROUTE_DOC_TYPES:
+            doc_type = _OTHER_ROUTE_DOC_TYPES[legal_route]
+            return f"other:{doc_type}", functools.partial(self._search_other_by_type, doc_type)
+        if legal_route == LEGAL_ROUTE_REGULATION:
+            return "regulation", self._search_regulation
+        return "general", self._search_general
+
+    async def retrieve_prepared(self, prepared: PreparedQuery, legal_route: str, k: int = DEFAULT_RETRIEVE_K) -> List[Dict]:
+        """Finishes a prepared (possibly speculated) query for the classified legal sub-route."""
+        route, search_fn = self._route_search(legal_route)
+        try:
+            return await self._run(prepared, route, search_fn, k)
+        except Exception as e:
+            logger.error(f"Retrieval ({route}) failed: {e}")
+            return []
+        finally:
+            if prepared.candidates is not None:
+                cancelled = prepared.candidates.cancel_unclaimed()
+                if cancelled:
+                    logger.debug(f"Cancelled {cancelled} speculative searches not needed by {route}")
+
+    async def _run(
+        self,
+        prepared: PreparedQuery,
+        route: str,
+        search_fn: Callable[[PreparedQuery, int], Awaitable[List[Dict]]],
+        k: int,
+    ) -> List[Dict]:
+        """
+        Serves the results from the result cache or runs search_fn on a
+        QueryContext that embeds and tokenises the query exactly once. Keys
+        include the snapshot generation, so a committed index change never
+        serves stale results.
+        """
+        key = self._result_key(route, prepared, k)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        await self._build_context(prepared)
+        results = await search_fn(prepared, k)
+        if results:
+            self.result_cache.put(key, copy.deepcopy(results))
+        return results
+
+    async def _retrieve(
+        self,
+        route: str,
+        search_fn: Callable[[PreparedQuery, int], Awaitable[List[Dict]]],
+        user_query: str,
+        k: int,
+        history: list,
+        search_date: Optional[str],
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict]:
+        try:
+            prepared = await self.prepare(user_query, history, search_date, analysis, ef_search, nprobe)
+            return await self._run(prepared, route, search_fn, k)
+        except Exception as e:
+            logger.error(f"Retrieval ({route}) failed: {e}")
+            return []
 
-    def _related_other(self, reg, query, keywords, seen, search_date, k=DEFAULT_RETRIEVE_K):
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Hit-rate metrics of the retrieval result, query embedding and query token caches."""
+        stats = {
+            "results": self.result_cache.stats(),
+            "query_embeddings": self.embedder.cache.stats(),
+            "query_tokens": query_token_cache.stats(),
+        }
+        if self.embedder.batcher is not None:
+            stats["query_embedding_batches"] = self.embedder.batcher.stats()
+        return stats
+
+    def _related_other(self, snap: RetrievalSnapshot, reg_pos: int, ctx: QueryContext, seen, k=DEFAULT_RETRIEVE_K):
         return fetch_related_other_documents(
-            self.master_map,
-            self.embedder,
-            self.other_index,
-            self.other_bm25,
-            self.other_metadata,
-            reg,
-            query,
-            keywords,
+            snap.clause_graph,
+            snap.other_index,
+            snap.other_keyword,
+            snap.other_metadata,
+            snap.other_validity,
+            reg_pos,
+            ctx,
             seen,
-            search_date,
             k,
+            self.executor,
         )
 
-    def _parent_regulations(self, cand: Dict, search_date: Optional[str], k=DEFAULT_RETRIEVE_K) -> List[Dict]:
-        return fetch_exact_parent_regulations(
-            self.source_map, self.reg_metadata, cand, search_date, k
+    async def _parent_regulations(
+        self, snap: RetrievalSnapshot, other_pos: int, ctx: QueryContext, k=DEFAULT_RETRIEVE_K
+    ) -> List[Dict]:
+        return await run_blocking(
+            self.executor,
+            fetch_exact_parent_regulations,
+            snap.clause_graph, snap.reg_metadata, snap.reg_validity, other_pos, ctx, k,
         )
 
     async def retrieve_regulation(
@@ -109,28 +336,13 @@ class Retriever:
         k: int = DEFAULT_RETRIEVE_K,
         history: list = [],
         search_date: Optional[str] = None,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
     ) -> List[Dict]:
-        try:
-            effective_query = await self._effective_query(user_query, history)
-            keywords = await self._keywords(effective_query)
-            reg_results = await self._hybrid_regulation(effective_query, keywords, k)
-            reg_results = filter_by_date(reg_results, k, search_date)
-
-            seen_in_related: set = set()
-            for reg in reg_results:
-                try:
-                    reg["related_documents"] = await self._related_other(
-                        reg, effective_query, keywords, seen_in_related, search_date, k= RELATED_DOCS_K
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to fetch related documents for reg '{reg.get('id')}': {e}")
-                    reg["related_documents"] = []
-
-            return reg_results
-
-        except Exception as e:
-            logger.error(f"retrieve_regulation failed: {e}")
-            return []
+        return await self._retrieve(
+            "regulation", self._search_regulation, user_query, k, history, search_date, analysis, ef_search, nprobe
+        )
 
     async def retrieve_general(
         self,
@@ -138,55 +350,55 @@ class Retriever:
         k: int = DEFAULT_RETRIEVE_K,
         history: list = [],
         search_date: Optional[str] = None,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
     ) -> List[Dict]:
-        try:
-            effective_query = await self._effective_query(user_query, history)
-            keywords = await self._keywords(effective_query)
-
-            reg_candidates, other_candidates = await asyncio.gather(
-                self._hybrid_regulation(effective_query, keywords, k * FETCH_MULTIPLIER),
-                self._hybrid_other(effective_query, keywords, k * FETCH_MULTIPLIER),
-            )
-
-            reg_candidates = filter_by_date(reg_candidates or [], k * FETCH_MULTIPLIER, search_date)
-            other_candidates = filter_by_date(other_candidates or [], k * FETCH_MULTIPLIER, search_date)
-
-            seen_in_related: set = set()
-            for reg in reg_candidates:
-                reg["related_documents"] = await self._related_other(
-                    reg, effective_query, keywords, seen_in_related, search_date, RELATED_DOCS_K
-                )
-
-            final_other_candidates = []
-            for cand in other_candidates:
-                unique_key = f"{cand.get('law_name')}|{cand.get('id')}"
-                if unique_key not in seen_in_related:
-                    cand["related_documents"] = self._parent_regulations(cand, search_date, RELATED_DOCS_K)
-                    final_other_candidates.append(cand)
-
-            all_candidates = reg_candidates + final_other_candidates
-            self._apply_doc_type_boosts(all_candidates)
-            all_candidates.sort(key=lambda x: x.get("hybrid_score", 0), reverse=True)
-            return all_candidates[:k]
-
-        except Exception as e:
-            logger.error(f"retrieve_general failed: {e}")
-            return []
+        return await self._retrieve(
+            "general", self._search_general, user_query, k, history, search_date, analysis, ef_search, nprobe
+        )
 
     async def retrieve_order(
-        self, user_query: str, k: int = DEFAULT_RETRIEVE_K, history: list = [], search_date: Optional[str] = None
+        self,
+        user_query: str,
+        k: int = DEFAULT_RETRIEVE_K,
+        history: list = [],
+        search_date: Optional[str] = None,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
     ) -> List[Dict]:
-        return await self._retrieve_other_by_type(user_query, "คำสั่ง", k, search_date, history)
+        return await self._retrieve_other_by_type(
+            user_query, "คำสั่ง", k, search_date, history, analysis, ef_search, nprobe
+        )
 
     async def retrieve_guideline(
-        self, user_query: str, k: int = DEFAULT_RETRIEVE_K, history: list = [], search_date: Optional[str] = None
+        self,
+        user_query: str,
+        k: int = DEFAULT_RETRIEVE_K,
+        history: list = [],
+        search_date: Optional[str] = None,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
     ) -> List[Dict]:
-        return await self._retrieve_other_by_type(user_query, "แนวทาง", k, search_date, history)
+        return await self._retrieve_other_by_type(
+            user_query, "แนวทาง", k, search_date, history, analysis, ef_search, nprobe
+        )
 
     async def retrieve_standard(
-        self, user_query: str, k: int = DEFAULT_RETRIEVE_K, history: list = [], search_date: Optional[str] = None
+        self,
+        user_query: str,
+        k: int = DEFAULT_RETRIEVE_K,
+        history: list = [],
+        search_date: Optional[str] = None,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
     ) -> List[Dict]:
-        return await self._retrieve_other_by_type(user_query, "หลักเกณฑ์", k, search_date, history)
+        return await self._retrieve_other_by_type(
+            user_query, "หลักเกณฑ์", k, search_date, history, analysis, ef_search, nprobe
+        )
 
     async def _retrieve_other_by_type(
         self,
@@ -195,39 +407,96 @@ class Retriever:
         k: int,
         search_date: Optional[str],
         history: list,
+        analysis: Optional[QueryAnalysis] = None,
+        ef_search: Optional[int] = None,
+        nprobe: Optional[int] = None,
     ) -> List[Dict]:
-        try:
-            effective_query = await self._effective_query(user_query, history)
-            keywords = await self._keywords(effective_query)
-
-            candidates = await self._hybrid_other(effective_query, keywords, k * FETCH_MULTIPLIER)
+        return await self._retrieve(
+            f"other:{target_doc_type}",
+            functools.partial(self._search_other_by_type, target_doc_type),
+            user_query, k, history, search_date, analysis, ef_search, nprobe,
+        )
 
-            seen_chunks: set = set()
-            filtered = []
-            for cand in candidates:
-                if target_doc_type not in cand.get("doc_type", ""):
-                    continue
-                unique_key = f"{cand.get('law_name')}|{cand.get('id')}"
-                if unique_key not in seen_chunks:
-                    filtered.append(cand)
-                    seen_chunks.add(unique_key)
+    async def _search_regulation(self, prepared: PreparedQuery, k: int) -> List[Dict]:
+        snap, ctx = prepared.snap, prepared.ctx
+        # Fetch beyond k: chunk ids repeat within a law, so dedupe can drop fused hits.
+        reg_hits = dedupe_hits(
+            await prepared.candidates.regulation(k * FETCH_MULTIPLIER), snap.reg_metadata, k
+        )
+        reg_results = materialize_hits(reg_hits, snap.reg_metadata)
 
-            return filter_by_date(filtered, k=k, search_date=search_date)
+        seen_in_related: set = set()
+        for reg in reg_results:
+            try:
+                related_hits = await self._related_other(
+                    snap, reg["chunk_idx"], ctx, seen_in_related, k= RELATED_DOCS_K
+                )
+                reg["related_documents"] = materialize_hits(related_hits, snap.other_metadata)
+            except Exception as e:
+                logger.error(f"Failed to fetch related documents for reg '{reg.get('id')}': {e}")
+                reg["related_documents"] = []
+
+        return reg_results
+
+    async def _search_general(self, prepared: PreparedQuery, k: int) -> List[Dict]:
+        snap, ctx = prepared.snap, prepared.ctx
+        reg_hits, other_hits = await asyncio.gather(
+            prepared.candidates.regulation(k * FETCH_MULTIPLIER),
+            prepared.candidates.other(k * FETCH_MULTIPLIER),
+        )
 
-        except Exception as e:
-            logger.error(f"_retrieve_other_by_type ('{target_doc_type}') failed: {e}")
-            return []
+        reg_hits = dedupe_hits(reg_hits, snap.reg_metadata, k * FETCH_MULTIPLIER)
+        other_hits = dedupe_hits(other_hits, snap.other_metadata, k * FETCH_MULTIPLIER)
+
+        # Related lookups run for every regulation candidate: the documents
+        # they surface are dropped from the other-document candidates.
+        seen_in_related: set = set()
+        related_lists = await asyncio.gather(*(
+            self._related_other(snap, hit.idx, ctx, seen_in_related, RELATED_DOCS_K)
+            for hit in reg_hits
+        ))
+
+        # (hit, is_other_document, related hits)
+        ranked = [
+            (self._boosted(hit, snap.reg_metadata[hit.idx]), False, related)
+            for hit, related in zip(reg_hits, related_lists)
+        ] + [
+            (self._boosted(hit, snap.other_metadata[hit.idx]), True, None)
+            for hit in other_hits
+            if candidate_key(snap.other_metadata[hit.idx]) not in seen_in_related
+        ]
+        ranked.sort(key=lambda entry: entry[0].score, reverse=True)
+        ranked = ranked[:k]
+
+        parent_lists = await asyncio.gather(*(
+            self._parent_regulations(snap, hit.idx, ctx, RELATED_DOCS_K)
+            for hit, is_other, _ in ranked
+            if is_other
+        ))
+        parent_lists = iter(parent_lists)
+
+        results = []
+        for hit, is_other, related in ranked:
+            if is_other:
+                doc = materialize_hits([hit], snap.other_metadata)[0]
+                doc["related_documents"] = next(parent_lists)
+            else:
+                doc = materialize_hits([hit], snap.reg_metadata)[0]
+                doc["related_documents"] = materialize_hits(related, snap.other_metadata)
+            results.append(doc)
+        return results
+
+    async def _search_other_by_type(self, target_doc_type: str, prepared: PreparedQuery, k: int) -> List[Dict]:
+        snap = prepared.snap
+        hits = await prepared.candidates.other(k * FETCH_MULTIPLIER, target_doc_type)
+        return materialize_hits(dedupe_hits(hits, snap.other_metadata, k=k), snap.other_metadata)
 
     @staticmethod
-    def _apply_doc_type_boosts(candidates: List[Dict]) -> None:
-        """Mutates hybrid_score in-place based on document type."""
-        for cand in candidates:
-            law_name = cand.get("law_name") or ""
-            doc_type = cand.get("doc_type") or ""
-            combined = law_name + doc_type
-            score = cand.get("hybrid_score", 0)
-
-            for keyword, boost in _DOC_TYPE_BOOSTS.items():
-                if keyword in combined:
-                    cand["hybrid_score"] = score * boost
-                    break
+    def _boosted(hit: FusedHit, doc: Dict) -> FusedHit:
+        """Returns hit with its score boosted based on the document type."""
+        combined = (doc.get("law_name") or "") + (doc.get("doc_type") or "")
+
+        for keyword, boost in _DOC_TYPE_BOOSTS.items():
+            if keyword in combined:
+                return hit._replace(score=hit.score * boost)
+        return hit
@@ -1,132 +1,218 @@
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Executor
+from typing import Any, Dict, List, NamedTuple, Optional
 
+import faiss
 import numpy as np
-from pythainlp import word_tokenize
 
 from src.app.chatbot.constants import RRF_C
+from src.app.utils.executor import run_blocking
+from src.db.vector_store.sparse_index import SparseLexicalIndex
+from src.db.vector_store.vector_store import make_search_params
+from .filters import ValidityIndex
+from .query_context import QueryContext
 
 logger = logging.getLogger(__name__)
 
+class FusedHit(NamedTuple):
+    """A fused search result: chunk position in its store and RRF score."""
+    idx: int
+    score: float
+
+
 def run_rrf_fusion(
-    vector_results: List[Dict],
-    keyword_results: List[Dict],
-    metadata_list: List[Dict],
+    vector_ids: np.ndarray,
+    keyword_ids: np.ndarray,
     k: int,
     v_weight: float = 0.5,
-) -> List[Dict]:
+) -> List[FusedHit]:
     """
-    Combines vector and keyword result lists using Reciprocal Rank Fusion (RRF).
-    Returns up to k merged, scored documents from metadata_list.
+    Combines ranked vector and keyword id arrays using Reciprocal Rank Fusion
+    (RRF) and returns the k best hits, highest score first. Ties keep the order
+    in which ids first appeared (vector results before keyword results).
     """
-    rrf_scores: Dict[int, float] = {}
+    ids = np.concatenate([vector_ids, keyword_ids]).astype(np.int64, copy=False)
+    if not len(ids) or k <= 0:
+        return []
+
+    weights = np.concatenate([
+        v_weight / (np.arange(len(vector_ids)) + RRF_C),
+        (1 - v_weight) / (np.arange(len(keyword_ids)) + RRF_C),
+    ])
+    unique_ids, first_seen, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    scores = np.bincount(inverse, weights=weights, minlength=len(unique_ids))
 
-    for item in vector_results:
-        idx = item["idx"]
-        rrf_scores[idx] = rrf_scores.get(idx, 0) + v_weight / (item["rank"] + RRF_C)
+    if len(unique_ids) > k:
+        # Keep every id tied with the k-th score so ties resolve by first appearance.
+        kth_score = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        top = np.flatnonzero(scores >= kth_score)
+    else:
+        top = np.arange(len(unique_ids))
+    top = top[np.lexsort((first_seen[top], -scores[top]))][:k]
 
-    for item in keyword_results:
-        idx = item["idx"]
-        rrf_scores[idx] = rrf_scores.get(idx, 0) + (1 - v_weight) / (item["rank"] + RRF_C)
+    return [FusedHit(int(unique_ids[t]), float(scores[t])) for t in top]
 
-    sorted_indices = sorted(rrf_scores.items(), key=lambda x: x[1], reverse=True)
 
+def materialize_hits(hits: List[FusedHit], metadata_list: List[Dict]) -> List[Dict]:
+    """
+    Copies the metadata of the given hits into result dicts tagged with
+    hybrid_score and chunk_idx. Call only for the final survivors.
+    """
     matches = []
-    for idx, score in sorted_indices:
-        if idx < len(metadata_list):
-            doc = metadata_list[idx].copy()
-            doc["hybrid_score"] = score
+    for hit in hits:
+        if hit.idx < len(metadata_list):
+            doc = metadata_list[hit.idx].copy()
+            doc["hybrid_score"] = hit.score
+            doc["chunk_idx"] = hit.idx
             matches.append(doc)
-
     return matches
 
-def _embed_and_search(embedder, index, query_text: str, k: int) -> List[Dict]:
-    vec = embedder.embed_query(query_text)
-    query_array = np.atleast_2d(vec).astype("float32")
-    _, I = index.search(query_array, k * 5)
-    return [{"idx": int(idx), "rank": i} for i, idx in enumerate(I[0]) if idx != -1]
-
-
-def _tokenize_keywords(keyword_list: List[str]) -> List[str]:
-    tokens = []
-    for phrase in keyword_list:
-        tokens.extend(word_tokenize(phrase.lower(), engine="newmm"))
-    return tokens
-
-
-def _bm25_search(bm25, keyword_list: List[str], k: int) -> List[Dict]:
-    tokens = _tokenize_keywords(keyword_list)
-    if not tokens:
-        return []
-    scores = bm25.get_scores(tokens)
-    top_idx = np.argsort(scores)[::-1][: k * 5]
-    return [{"idx": int(i), "rank": r} for r, i in enumerate(top_idx) if scores[i] > 0]
-
-def vector_search_regulation(embedder, reg_index, query_text: str, k: int) -> List[Dict]:
+def restrict_candidates(
+    ctx: QueryContext,
+    validity: Optional[ValidityIndex],
+    candidate_ids: Optional[np.ndarray] = None,
+) -> Optional[np.ndarray]:
+    """
+    Positions a search may return: candidate_ids (positions, order preserved,
+    or a boolean mask) narrowed to chunks in force on ctx.target_date, or the
+    store's validity mask when no candidates are given. None means unrestricted.
+    """
+    valid = validity.mask(ctx.target_date) if validity is not None else None
+    if valid is None:
+        return candidate_ids
+    if candidate_ids is None:
+        return valid
+    if candidate_ids.dtype == bool:
+        return candidate_ids & valid
+    in_range = candidate_ids[candidate_ids < len(valid)]
+    return in_range[valid[in_range]]
+
+
+def _id_selector(allowed: np.ndarray):
+    if allowed.dtype == bool:
+        return faiss.IDSelectorBitmap(np.packbits(allowed, bitorder="little"))
+    return faiss.IDSelectorBatch(np.ascontiguousarray(allowed, dtype="int64"))
+
+
+_NO_IDS = np.empty(0, dtype=np.int64)
+
+
+def _vector_search(index, ctx: QueryContext, k: int, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+    if ctx.embedding is None:
+        return _NO_IDS
+    fetch_k = k * 5
+    sel = None
+    if allowed is not None:
+        n_allowed = int(np.count_nonzero(allowed)) if allowed.dtype == bool else len(allowed)
+        if not n_allowed:
+            return _NO_IDS
+        fetch_k = min(fetch_k, n_allowed)
+        sel = _id_selector(allowed)
+    params = make_search_params(index, ctx.ef_search, ctx.nprobe, sel=sel)
+    _, I = index.search(ctx.embedding, fetch_k, params=params)
+    return I[0][I[0] != -1]
+
+
+def _keyword_search(keyword_index, ctx: QueryContext, k: int, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Keyword leg: the BGE-M3 sparse lexical index scored with the query's own
+    lexical weights, or BM25 over the tokenised LLM keywords.
+    """
+    if isinstance(keyword_index, SparseLexicalIndex):
+        if not ctx.lexical:
+            return _NO_IDS
+        top_idx, scores = keyword_index.top_k(ctx.lexical, k * 5, candidates=allowed)
+    else:
+        if not ctx.tokens:
+            return _NO_IDS
+        top_idx, scores = keyword_index.top_k(ctx.tokens, k * 5, candidates=allowed)
+    return top_idx[scores > 0]
+
+def vector_search_regulation(reg_index, ctx: QueryContext, k: int, allowed: Optional[np.ndarray] = None) -> np.ndarray:
     if not reg_index:
         logger.warning("Regulation FAISS index not loaded.")
-        return []
+        return _NO_IDS
     try:
-        return _embed_and_search(embedder, reg_index, query_text, k)
+        return _vector_search(reg_index, ctx, k, allowed)
     except Exception as e:
         logger.error(f"Vector search failed for regulations: {e}")
-        return []
+        return _NO_IDS
 
 
-def keyword_search_regulation(reg_bm25, keyword_list: List[str], k: int) -> List[Dict]:
-    if not reg_bm25 or not keyword_list:
-        return []
+def keyword_search_regulation(reg_keyword, ctx: QueryContext, k: int, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+    if not reg_keyword:
+        return _NO_IDS
     try:
-        return _bm25_search(reg_bm25, keyword_list, k)
+        return _keyword_search(reg_keyword, ctx, k, allowed)
     except Exception as e:
-        logger.error(f"BM25 search failed for regulations: {e}")
-        return []
+        logger.error(f"Keyword search failed for regulations: {e}")
+        return _NO_IDS
 
 
 async def hybrid_search_regulation(
-    embedder,
     reg_index,
-    reg_bm25,
-    reg_metadata: List[Dict],
-    query: str,
-    keywords: List[str],
+    reg_keyword,
+    reg_validity: Optional[ValidityIndex],
+    ctx: QueryContext,
     k: int = 5,
-) -> List[Dict]:
-    """Runs vector + keyword search on regulations and fuses results via RRF."""
-    vec_res = vector_search_regulation(embedder, reg_index, query, k)
-    key_res = keyword_search_regulation(reg_bm25, keywords, k)
-    return run_rrf_fusion(vec_res, key_res, reg_metadata, k)
-
-def vector_search_other(embedder, other_index, query_text: str, k: int) -> List[Dict]:
+    executor: Optional[Executor] = None,
+) -> List[FusedHit]:
+    """
+    Runs vector + keyword search on regulations concurrently in the retrieval
+    executor, restricted to chunks in force on ctx.target_date, and fuses
+    results via RRF into the k best hits.
+    """
+    allowed = restrict_candidates(ctx, reg_validity)
+    vec_res, key_res = await asyncio.gather(
+        run_blocking(executor, vector_search_regulation, reg_index, ctx, k, allowed),
+        run_blocking(executor, keyword_search_regulation, reg_keyword, ctx, k, allowed),
+    )
+    return run_rrf_fusion(vec_res, key_res, k)
+
+def vector_search_other(
+    other_index, ctx: QueryContext, k: int, allowed: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Vector search over other documents, optionally restricted to allowed positions."""
     if not other_index:
         logger.warning("Other-documents FAISS index not loaded.")
-        return []
+        return _NO_IDS
     try:
-        return _embed_and_search(embedder, other_index, query_text, k)
+        return _vector_search(other_index, ctx, k, allowed)
     except Exception as e:
         logger.error(f"Vector search failed for other documents: {e}")
-        return []
+        return _NO_IDS
 
 
-def keyword_search_other(other_bm25, keyword_list: List[str], k: int) -> List[Dict]:
-    if not other_bm25 or not keyword_list:
-        return []
+def keyword_search_other(
+    other_keyword, ctx: QueryContext, k: int, allowed: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Keyword search over other documents, optionally restricted to allowed positions."""
+    if not other_keyword:
+        return _NO_IDS
     try:
-        return _bm25_search(other_bm25, keyword_list, k)
+        return _keyword_search(other_keyword, ctx, k, allowed)
     except Exception as e:
-        logger.error(f"BM25 search failed for other documents: {e}")
-        return []
+        logger.error(f"Keyword search failed for other documents: {e}")
+        return _NO_IDS
 
 
 async def hybrid_search_other(
-    embedder,
     other_index,
-    other_bm25,
-    other_metadata: List[Dict],
-    query: str,
-    keywords: List[str],
+    other_keyword,
+    other_validity: Optional[ValidityIndex],
+    ctx: QueryContext,
     k: int = 5,
-) -> List[Dict]:
-    vec_res = vector_search_other(embedder, other_index, query, k)
-    key_res = keyword_search_other(other_bm25, keywords, k)
-    return run_rrf_fusion(vec_res, key_res, other_metadata, k)
+    executor: Optional[Executor] = None,
+    candidate_ids: Optional[np.ndarray] = None,
+) -> List[FusedHit]:
+    """
+    Hybrid search over other documents, optionally restricted to candidate_ids
+    (positions or a boolean mask) on top of the validity restriction.
+    """
+    allowed = restrict_candidates(ctx, other_validity, candidate_ids)
+    vec_res, key_res = await asyncio.gather(
+        run_blocking(executor, vector_search_other, other_index, ctx, k, allowed),
+        run_blocking(executor, keyword_search_other, other_keyword, ctx, k, allowed),
+    )
+    return run_rrf_fusion(vec_res, key_res, k)
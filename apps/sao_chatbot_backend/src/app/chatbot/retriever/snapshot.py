@@ -0,0 +1,91 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.utils.cache import LRUCache
+from src.db.vector_store.chunk_store import file_stamp
+from src.db.vector_store.vector_store import read_generation
+from src.app.chatbot.constants import (
+    REGULATION_PATH,
+    OTHERS_PATH,
+    MASTER_MAP_PATH,
+    SOURCE_MAP_PATH,
+)
+from .clause_graph import ClauseGraph
+from .filters import ValidityIndex
+from .store_loader import KeywordIndex, load_clause_graph, load_store
+
+logger = logging.getLogger(__name__)
+
+
+def current_generation() -> Tuple:
+    """
+    Cheap, hashable fingerprint of everything a snapshot is built from: each
+    store's generation marker plus the stamps of the mapping files.
+    """
+    map_stamps = (file_stamp(MASTER_MAP_PATH), file_stamp(SOURCE_MAP_PATH))
+    return (
+        read_generation(REGULATION_PATH),
+        read_generation(OTHERS_PATH),
+        *(tuple(stamp) if stamp else None for stamp in map_stamps),
+    )
+
+
+@dataclass(frozen=True)
+class RetrievalSnapshot:
+    """
+    Immutable set of search resources for one index generation. A request
+    reads the retriever's snapshot once and uses it throughout, so a reload
+    can swap in a new snapshot while in-flight requests finish on the old one.
+    """
+    generation: Tuple
+    reg_index: Any
+    reg_metadata: Sequence[Dict]
+    reg_keyword: Optional[KeywordIndex]
+    reg_validity: ValidityIndex
+    other_index: Any
+    other_metadata: Sequence[Dict]
+    other_keyword: Optional[KeywordIndex]
+    other_validity: ValidityIndex
+    clause_graph: ClauseGraph
+    _doc_type_masks: LRUCache = field(default_factory=lambda: LRUCache(max_size=16), repr=False)
+
+    @classmethod
+    def load(cls) -> "RetrievalSnapshot":
+        # Read the generation first: a commit landing mid-load then shows up
+        # as a newer generation on the next check.
+        generation = current_generation()
+        reg_index, reg_metadata, reg_keyword = load_store(REGULATION_PATH)
+        other_index, other_metadata, other_keyword = load_store(OTHERS_PATH)
+
+        return cls(
+            generation=generation,
+            reg_index=reg_index,
+            reg_metadata=reg_metadata,
+            reg_keyword=reg_keyword,
+            reg_validity=ValidityIndex.from_metadata(reg_metadata),
+            other_index=other_index,
+            other_metadata=other_metadata,
+            other_keyword=other_keyword,
+            other_validity=ValidityIndex.from_metadata(other_metadata),
+            clause_graph=load_clause_graph(MASTER_MAP_PATH, SOURCE_MAP_PATH, reg_metadata, other_metadata),
+        )
+
+    def doc_type_mask(self, doc_type: str) -> np.ndarray:
+        """Boolean mask of other-document chunks whose doc_type contains doc_type."""
+        return self._doc_type_masks.get_or_compute(
+            doc_type,
+            lambda: np.fromiter(
+                (doc_type in (doc.get("doc_type") or "") for doc in self.other_metadata),
+                dtype=bool,
+                count=len(self.other_metadata),
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"RetrievalSnapshot(regulations={len(self.reg_metadata)}, "
+            f"others={len(self.other_metadata)}, {self.clause_graph})"
+        )
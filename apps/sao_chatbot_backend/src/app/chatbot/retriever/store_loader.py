@@ -1,12 +1,13 @@
 import json
 import logging
 import os
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from pythainlp import word_tokenize
-from rank_bm25 import BM25Okapi
-
-from src.db.vector_store.vector_store import load_faiss_index
+from src.config import settings
+from src.db.vector_store.bm25_index import BM25Index
+from src.db.vector_store.sparse_index import SparseLexicalIndex
+from src.db.vector_store.vector_store import load_search_store
+from .clause_graph import ClauseGraph
 
 logger = logging.getLogger(__name__)
 
@@ -19,36 +20,48 @@ def load_master_map(path: str) -> Dict:
     return {}
 
 
-def _build_bm25_corpus(metadata: List[Dict]) -> List[List[str]]:
-    """Tokenises each document's text field to build a BM25 corpus."""
-    corpus = []
-    for i, doc in enumerate(metadata):
-        try:
-            text = str(doc.get("text", "")).lower()
-            tokens = word_tokenize(text, engine="newmm") if text.strip() else ["empty"]
-        except Exception as e:
-            logger.error(f"Failed to tokenise document at index {i}: {e}")
-            tokens = ["error"]
-        corpus.append(tokens)
-    return corpus
+KeywordIndex = Union[BM25Index, SparseLexicalIndex]
 
 
-def load_store(path: str) -> Tuple[Optional[Any], List[Dict], Optional[BM25Okapi]]:
+def load_store(path: str) -> Tuple[Optional[Any], List[Dict], Optional[KeywordIndex]]:
     """
-    Loads a FAISS index and its metadata from disk, then builds a BM25 index.
-    Returns (faiss_index, metadata, bm25) — any component may be None on failure.
+    Loads a FAISS index, its memory-mapped chunk metadata (a ChunkStore, read
+    like a list of dicts) and the keyword index for settings.KEYWORD_SEARCH_BACKEND
+    (BM25 or BGE-M3 sparse lexical) from disk.
+    Returns (faiss_index, metadata, keyword_index) — any component may be None on failure.
     """
     try:
-        index, metadata = load_faiss_index(path)
+        index, metadata, keyword_index = load_search_store(path, settings.KEYWORD_SEARCH_BACKEND.lower())
 
         if not metadata:
             logger.warning(f"No metadata found at '{path}'.")
             return index, [], None
 
-        corpus = _build_bm25_corpus(metadata)
-        bm25 = BM25Okapi(corpus) if corpus else None
-        return index, metadata, bm25
+        return index, metadata, keyword_index
 
     except Exception as e:
         logger.critical(f"Could not load search resources at '{path}': {e}")
         return None, [], None
+
+
+
+def load_clause_graph(
+    master_map_path: str,
+    source_map_path: str,
+    reg_metadata: List[Dict],
+    other_metadata: List[Dict],
+) -> ClauseGraph:
+    """
+    Loads master_map and source_map and compiles them against the loaded
+    stores' chunk positions. Returns an empty graph on failure.
+    """
+    try:
+        return ClauseGraph.compile(
+            load_master_map(master_map_path),
+            load_master_map(source_map_path),
+            reg_metadata,
+            other_metadata,
+        )
+    except Exception as e:
+        logger.error(f"Could not compile clause graph: {e}")
+        return ClauseGraph.empty()
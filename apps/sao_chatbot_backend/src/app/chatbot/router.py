@@ -1,9 +1,19 @@
 import asyncio
 import logging
-from typing import Any
-from langchain_core.output_parsers import StrOutputParser
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from src.app.chatbot.prompts.routing import build_prompt
 from src.app.chatbot.prompts.legal_routing import build_prompt as build_legal_routing_prompt
+from src.app.chatbot.prompts.query_analysis import build_prompt as build_query_analysis_prompt
+from src.app.chatbot.schemas import QueryAnalysis
+from src.app.chatbot.local_router import (
+    TASK_ROUTE,
+    TASK_LEGAL_ROUTE,
+    LocalRoute,
+    current_local_router,
+    ensure_local_router,
+    log_route_decision,
+)
 
 from src.app.chatbot.constants import (
     ROUTE_GENERAL,
@@ -27,6 +37,24 @@ async def get_top_level_route(
     history: list,
     llm: Any,
 ) -> str:
+    """
+    Answered by the local embedding router when it is confident and there
+    is no history, otherwise by the LLM prompt.
+    """
+    local = await _local_route(TASK_ROUTE, query, history)
+    if local is not None and local.accepted:
+        _serve_local(TASK_ROUTE, local, query, history, lambda: _llm_top_level_route(query, history, llm))
+        return local.label
+
+    route = await _llm_top_level_route(query, history, llm)
+    if route is None:
+        return ROUTE_LEGAL_QUERY
+    _record_llm_route(TASK_ROUTE, query, history, local, route)
+    return route
+
+
+async def _llm_top_level_route(query: str, history: list, llm: Any) -> Optional[str]:
+    """The LLM's route, or None when the call fails."""
     history_str = _format_history(history)
 
     chain = _routing_prompt | llm | StrOutputParser()
@@ -42,11 +70,11 @@ async def get_top_level_route(
 
     except asyncio.TimeoutError:
         logger.error("get_top_level_route timed out — defaulting to LEGAL_RAG")
-        return ROUTE_LEGAL_QUERY
+        return None
 
     except Exception as e:
         logger.error(f"get_top_level_route failed — defaulting to LEGAL_RAG: {e}", exc_info=True)
-        return ROUTE_LEGAL_QUERY
+        return None
 
 
 def _parse_route(decision: str) -> str:
@@ -83,10 +111,26 @@ async def get_legal_sub_route(
     """
     Classifies a legal query into:
     REGULATION, ORDER, GUIDELINE, STANDARD, or GENERAL.
+    Answered by the local embedding router when it is confident and there
+    is no history.
 
     Public so the evaluator can call it directly without going
     through the full handler pipeline.
     """
+    local = await _local_route(TASK_LEGAL_ROUTE, query, history)
+    if local is not None and local.accepted:
+        _serve_local(TASK_LEGAL_ROUTE, local, query, history, lambda: _llm_legal_sub_route(query, history, llm))
+        return local.label
+
+    route = await _llm_legal_sub_route(query, history, llm)
+    if route is None:
+        return LEGAL_ROUTE_GENERAL
+    _record_llm_route(TASK_LEGAL_ROUTE, query, history, local, route)
+    return route
+
+
+async def _llm_legal_sub_route(query: str, history: list, llm: Any) -> Optional[str]:
+    """The LLM's legal sub-route, or None when the call fails."""
     history_str = _format_history(history)
     chain = _legal_routing_prompt | llm | StrOutputParser()
 
@@ -101,11 +145,11 @@ async def get_legal_sub_route(
 
     except asyncio.TimeoutError:
         logger.error("get_legal_sub_route timed out — defaulting to GENERAL")
-        return "GENERAL"
+        return None
 
     except Exception as e:
         logger.error(f"get_legal_sub_route failed — defaulting to GENERAL: {e}", exc_info=True)
-        return "GENERAL"
+        return None
 
 
 def _parse_legal_route(decision: str) -> str:
@@ -113,4 +157,188 @@ def _parse_legal_route(decision: str) -> str:
     if LEGAL_ROUTE_ORDER in decision:      return LEGAL_ROUTE_ORDER
     if LEGAL_ROUTE_GUIDELINE in decision:  return LEGAL_ROUTE_GUIDELINE
     if LEGAL_ROUTE_REGULATION in decision: return LEGAL_ROUTE_REGULATION
-    return LEGAL_ROUTE_GENERAL
\ No newline at end of file
+    return LEGAL_ROUTE_GENERAL
+
+
+_query_analysis_prompt = build_query_analysis_prompt()
+_query_analysis_parser = JsonOutputParser(pydantic_object=QueryAnalysis)
+
+async def analyze_query(
+    query: str,
+    history: list,
+    llm: Any,
+) -> QueryAnalysis:
+    """
+    One LLM call returning the top-level route, legal sub-route, standalone
+    query and keywords, in place of get_top_level_route, get_legal_sub_route,
+    rewrite_query_with_history and extract_keywords.
+
+    Skipped for a query without history when the local router is confident
+    of everything the handler needs: the route for GENERAL and FILE_REQUEST,
+    and also the legal sub-route for a LEGAL_QUERY (nothing to rewrite; the
+    retriever then extracts its own keywords).
+
+    Falls back like those calls do: LEGAL_QUERY / GENERAL and the original
+    query. Keywords are empty on failure, so the retriever extracts its own.
+    """
+    analysis, local = await _local_analysis(query, history)
+    if analysis is not None:
+        for task, route in local.items():
+            _serve_local(task, route, query, history, None)
+        router = current_local_router()
+        if router is not None and router.should_audit():
+            _audit_in_background(lambda: _record_analysis(query, history, local, llm, served=False))
+        logger.debug(f"Local query analysis: {analysis}")
+        return analysis
+
+    analysis = await _record_analysis(query, history, local, llm, served=True)
+    if analysis is not None:
+        return analysis
+    return QueryAnalysis(
+        route=ROUTE_LEGAL_QUERY, legal_route=LEGAL_ROUTE_GENERAL, standalone_query=query, keywords=[]
+    )
+
+
+async def _local_analysis(query: str, history: list) -> Tuple[Optional[QueryAnalysis], Dict[str, LocalRoute]]:
+    """The analysis if the local router can answer it alone, and the local routes it classified."""
+    local: Dict[str, LocalRoute] = {}
+    route = await _local_route(TASK_ROUTE, query, history)
+    if route is None:
+        return None, local
+    local[TASK_ROUTE] = route
+    if not route.accepted:
+        return None, local
+    if route.label != ROUTE_LEGAL_QUERY:
+        return QueryAnalysis(
+            route=route.label, legal_route=LEGAL_ROUTE_GENERAL, standalone_query=query, keywords=[]
+        ), local
+
+    legal_route = await _local_route(TASK_LEGAL_ROUTE, query, history)
+    if legal_route is None:
+        return None, local
+    local[TASK_LEGAL_ROUTE] = legal_route
+    if not legal_route.accepted:
+        return None, local
+    return QueryAnalysis(
+        route=ROUTE_LEGAL_QUERY, legal_route=legal_route.label, standalone_query=query, keywords=[]
+    ), local
+
+
+async def _record_analysis(
+    query: str, history: list, local: Dict[str, LocalRoute], llm: Any, served: bool
+) -> Optional[QueryAnalysis]:
+    """Runs the LLM analysis and records its routes; None when the call fails."""
+    analysis = await _llm_analysis(query, history, llm)
+    if analysis is not None:
+        _record_llm_route(TASK_ROUTE, query, history, local.get(TASK_ROUTE), analysis.route, served)
+        if analysis.route == ROUTE_LEGAL_QUERY:
+            _record_llm_route(
+                TASK_LEGAL_ROUTE, query, history, local.get(TASK_LEGAL_ROUTE), analysis.legal_route, served
+            )
+    return analysis
+
+
+async def _llm_analysis(query: str, history: list, llm: Any) -> Optional[QueryAnalysis]:
+    history_str = _format_history(history)
+    chain = _query_analysis_prompt | llm | _query_analysis_parser
+
+    try:
+        result = await asyncio.wait_for(
+            chain.ainvoke({
+                "history": history_str,
+                "query": query,
+                "format_instructions": _query_analysis_parser.get_format_instructions(),
+            }),
+            timeout=LLM_TIMEOUT_SECONDS,
+        )
+        analysis = _parse_query_analysis(result, query, has_history=bool(history))
+        logger.debug(f"Query analysis: {analysis}")
+        return analysis
+
+    except asyncio.TimeoutError:
+        logger.error("analyze_query timed out — defaulting to LEGAL_RAG")
+    except Exception as e:
+        logger.error(f"analyze_query failed — defaulting to LEGAL_RAG: {e}", exc_info=True)
+    return None
+
+
+def _parse_query_analysis(result: Any, query: str, has_history: bool) -> QueryAnalysis:
+    """Normalises the parsed JSON through the same route parsers as the separate calls."""
+    if not isinstance(result, dict):
+        raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+
+    route = _parse_route(str(result.get("route", "")).strip().upper())
+    legal_route = (
+        _parse_legal_route(str(result.get("legal_route", "")).strip().upper())
+        if route == ROUTE_LEGAL_QUERY
+        else LEGAL_ROUTE_GENERAL
+    )
+    # Without history there is nothing to resolve; keeping the user's wording
+    # keeps cache keys and embeddings stable across paraphrases by the model.
+    standalone = str(result.get("standalone_query") or "").replace('"', "").strip()
+    keywords = result.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    return QueryAnalysis(
+        route=route,
+        legal_route=legal_route,
+        standalone_query=standalone if has_history and standalone else query,
+        keywords=[str(k).strip() for k in keywords if str(k).strip()],
+    )
+
+
+async def _local_route(task: str, query: str, history: list) -> Optional[LocalRoute]:
+    """
+    None when there is history: a follow-up such as "what about the second
+    one?" is routed by what came before, which the embedding of the query
+    alone cannot see, so the LLM decides.
+    """
+    if history:
+        return None
+    router = await ensure_local_router()
+    if router is None:
+        return None
+    return await router.classify(task, query)
+
+
+def _serve_local(
+    task: str,
+    local: LocalRoute,
+    query: str,
+    history: list,
+    llm_route: Optional[Callable[[], Awaitable[Optional[str]]]],
+) -> None:
+    """Counts a served local route and, for a sample of them, asks llm_route in the background to audit it."""
+    router = current_local_router()
+    if router is None:
+        return
+    router.record_local(task, local)
+    if llm_route is None or not router.should_audit():
+        return
+
+    async def audit() -> None:
+        label = await llm_route()
+        if label is not None:
+            _record_llm_route(task, query, history, local, label, served=False)
+
+    _audit_in_background(audit)
+
+
+def _record_llm_route(
+    task: str, query: str, history: list, local: Optional[LocalRoute], label: str, served: bool = True
+) -> None:
+    """Feeds an LLM routing decision to the local router's stats and the traffic log."""
+    router = current_local_router()
+    if router is not None:
+        router.record_llm(task, local, label, served=served)
+    log_route_decision(task, query, label, has_history=bool(history))
+
+
+# Referenced until done, so background audits are not garbage-collected mid-call.
+_audit_tasks: set = set()
+
+
+def _audit_in_background(make_coro: Callable[[], Awaitable[Any]]) -> None:
+    task = asyncio.ensure_future(make_coro())
+    _audit_tasks.add(task)
+    task.add_done_callback(_audit_tasks.discard)
@@ -1,5 +1,11 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
+from src.app.chatbot.constants import (
+    STREAM_EVENT_TOKEN,
+    STREAM_EVENT_REFERENCES,
+    STREAM_EVENT_ERROR,
+    STREAM_EVENT_DONE,
+)
 
 class RAGResponse(BaseModel):
     answer: str
@@ -11,4 +17,33 @@ class LegalResponseSchema(BaseModel):
 
 class FileResponseSchema(BaseModel):
     answer_text: str = Field(description="A polite, formal Thai response (e.g., 'ขออนุญาตนำส่งเอกสาร').")
-    target_files: List[str] = Field(description="List of exact filenames found. Empty list if none.")
\ No newline at end of file
+    target_files: List[str] = Field(description="List of exact filenames found. Empty list if none.")
+
+
+class QueryAnalysis(BaseModel):
+    route: str = Field(description="Exactly one of: GENERAL, FILE_REQUEST, LEGAL_QUERY.")
+    legal_route: str = Field(description="Exactly one of: REGULATION, ORDER, GUIDELINE, STANDARD, GENERAL.")
+    standalone_query: str = Field(description="The query rewritten as a standalone Thai search query.")
+    keywords: List[str] = Field(description="Thai search keywords for BM25, exactly as written in the query.")
+
+class StreamEvent(BaseModel):
+    """One server-sent event of a streamed answer; `event` is a STREAM_EVENT_* constant."""
+    event: str
+    data: Dict[str, Any] = {}
+
+    @classmethod
+    def token(cls, text: str) -> "StreamEvent":
+        return cls(event=STREAM_EVENT_TOKEN, data={"text": text})
+
+    @classmethod
+    def references(cls, ref: Dict[str, Optional[str]]) -> "StreamEvent":
+        return cls(event=STREAM_EVENT_REFERENCES, data={"ref": ref})
+
+    @classmethod
+    def error(cls, message: str) -> "StreamEvent":
+        return cls(event=STREAM_EVENT_ERROR, data={"message": message})
+
+    @classmethod
+    def done(cls, response: RAGResponse) -> "StreamEvent":
+        """Final event: the complete answer as persisted, which replaces the streamed text."""
+        return cls(event=STREAM_EVENT_DONE, data=response.model_dump())
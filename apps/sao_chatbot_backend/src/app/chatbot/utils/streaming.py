@@ -0,0 +1,62 @@
+from src.app.chatbot.constants import REFERENCES_MARKER
+
+
+class AnswerStreamParser:
+    """
+    Splits a streamed "answer, REFERENCES_MARKER, one citation per line"
+    response as it arrives. feed() returns the answer text that is safe to
+    show: up to the marker, holding back a tail that could be its start.
+    """
+
+    def __init__(self, marker: str = REFERENCES_MARKER):
+        self.marker = marker
+        self._answer = []
+        self._pending = ""
+        self._references = ""
+        self._in_references = False
+
+    def feed(self, chunk: str) -> str:
+        if self._in_references:
+            self._references += chunk
+            return ""
+
+        text = self._pending + chunk
+        pos = text.find(self.marker)
+        if pos >= 0:
+            self._in_references = True
+            self._pending = ""
+            self._references = text[pos + len(self.marker):]
+            return self._emit(text[:pos])
+
+        keep = self._partial_marker_length(text)
+        self._pending = text[len(text) - keep:] if keep else ""
+        return self._emit(text[:len(text) - keep])
+
+    def close(self) -> str:
+        """Flushes the held-back tail once the stream ends without a marker."""
+        tail, self._pending = self._pending, ""
+        return self._emit(tail)
+
+    @property
+    def answer(self) -> str:
+        return "".join(self._answer).strip()
+
+    @property
+    def references(self) -> list[str]:
+        refs = []
+        for line in self._references.splitlines():
+            line = line.strip().lstrip("-•*").strip()
+            if line and line not in refs:
+                refs.append(line)
+        return refs
+
+    def _partial_marker_length(self, text: str) -> int:
+        """Length of the longest suffix of text that is a prefix of the marker."""
+        for size in range(min(len(self.marker) - 1, len(text)), 0, -1):
+            if self.marker.startswith(text[-size:]):
+                return size
+        return 0
+
+    def _emit(self, text: str) -> str:
+        self._answer.append(text)
+        return text
@@ -1,3 +1,4 @@
+import threading
 from typing import Optional, List
 from datetime import date ,timedelta
 from src.app.document.documentSchemas import DocumentMeta, MergeRequest
@@ -259,4 +260,16 @@ class DocumentManager:
 
         return {"id": new_doc_id}
 
-manager = DocumentManager()
+_manager: Optional[DocumentManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_document_manager() -> DocumentManager:
+    """Process-wide DocumentManager, created on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = DocumentManager()
+    return _manager
+
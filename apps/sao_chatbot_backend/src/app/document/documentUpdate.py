@@ -1,7 +1,7 @@
 from datetime import date
 from typing import Dict, List
 from src.app.utils.chunking import chunk_by_clause, chunk_by_size
-from src.app.utils.embedding import global_embedder
+from src.app.utils.embedding import get_embedder
 from src.app.utils.preprocess_dataset import (
     delete_document_pipeline,
     index_single_json_file,
@@ -12,9 +12,11 @@ from src.app.document.documentSchemas import DocumentMeta
 
 
 class DocumentUpdater:
-    def __init__(self):
-        self.embedder = global_embedder
-        
+    @property
+    def embedder(self):
+        # Resolved on first indexing call; listing or reading documents never loads the model.
+        return get_embedder()
+
     def build_version_to_source_map(self, sources: list) -> Dict[int, str]:
         return {s["order"]: s["source_id"] for s in sources}
 
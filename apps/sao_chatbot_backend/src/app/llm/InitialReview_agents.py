@@ -1,9 +1,6 @@
 import json
 import re
-from src.app.llm.typhoon import TyphoonLLM
-
-client_wrapper = TyphoonLLM() 
-client = client_wrapper.get_model()
+from src.app.llm.llm_manager import get_llm
 
 class InitialReviewAgents:
     
@@ -11,7 +8,7 @@ class InitialReviewAgents:
         try:
             full_prompt = f"{system_prompt}\n\nเอกสารที่ต้องตรวจสอบ:\n{user_text}"
             
-            response = client.invoke(full_prompt)
+            response = get_llm("typhoon").get_model().invoke(full_prompt)
             
             content = response.content
             if not content:
@@ -0,0 +1,105 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls of fn.
+
+    Callers block in __call__ while one worker thread collects items for at
+    most max_wait_ms (or until max_batch_size are queued), calls
+    fn(unique_items) once and resolves each caller's future with its row of
+    the result. Duplicate items in a batch are computed once.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Hashable]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "micro-batcher",
+    ):
+        self._fn = fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item: Hashable) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Hashable) -> Any:
+        return self.submit(item).result()
+
+    def _ensure_worker(self) -> None:
+        # Started on first use, so a forked worker process gets its own thread.
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._process(batch)
+            except Exception as e:
+                # The worker must survive: callers block on their futures without a timeout.
+                logger.error(f"{self.name}: batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch: list) -> None:
+        # Marks the futures running, so callers can no longer cancel them
+        # under us; the ones already cancelled are left out.
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        items = list(dict.fromkeys(item for item, _ in batch))
+        results = self._fn(items)
+        if len(results) != len(items):
+            raise ValueError(f"fn returned {len(results)} rows for {len(items)} items")
+
+        row_of: Dict[Hashable, int] = {item: i for i, item in enumerate(items)}
+        for item, future in batch:
+            future.set_result(results[row_of[item]])
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            }
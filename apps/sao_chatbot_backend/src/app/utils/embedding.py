@@ -2,13 +2,148 @@
 BGE-M3 Embedding Model Wrapper
 
 This module provides a wrapper for the BGE-M3 embedding model from HuggingFace.
-Uses sentence-transformers library for efficient embedding generation.
+Two backends share one interface: the PyTorch sentence-transformers model, and
+an exported ONNX graph (optionally int8-quantised) run with ONNX Runtime for
+CPU-only servers; settings.EMBEDDING_BACKEND selects one. Either can also
+return BGE-M3's lexical (sparse) weights from the same forward pass.
+Query embeddings are memoised in a process-wide LRU so repeated questions
+skip the model forward pass.
 """
 
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import time
+import unicodedata
 import numpy as np
-from typing import List
-import torch
-from sentence_transformers import SentenceTransformer
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from src.app.utils.batcher import MicroBatcher
+from src.app.utils.cache import LRUCache
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query_text(text: str) -> str:
+    """Canonical form used as the cache key: NFC, collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class QueryEmbeddingCache(LRUCache):
+    """
+    Bounded LRU of query vectors keyed by (model id, normalised query text).
+
+    When persist_path is set, entries are loaded from an .npz file on start
+    and written back every save_interval seconds while changed, and at
+    interpreter exit, so the cache survives restarts and crashes. Each
+    process writes its own temp file, so workers sharing the path never
+    corrupt it; the last save wins.
+    """
+
+    def __init__(self, max_size: int = 2048, persist_path: Optional[str] = None, save_interval: float = 0.0):
+        super().__init__(max_size)
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+        self._dirty = False
+        self._saver: Optional[threading.Thread] = None
+        self._saver_lock = threading.Lock()
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        super().put(key, value)
+        if self.persist_path:
+            self._dirty = True
+            self._ensure_saver()
+
+    def _ensure_saver(self) -> None:
+        # Started on first change, so a forked worker process gets its own thread.
+        if self.save_interval <= 0 or (self._saver is not None and self._saver.is_alive()):
+            return
+        with self._saver_lock:
+            if self._saver is None or not self._saver.is_alive():
+                self._saver = threading.Thread(
+                    target=self._save_periodically, name="embedding-cache-saver", daemon=True
+                )
+                self._saver.start()
+
+    def _save_periodically(self) -> None:
+        while True:
+            time.sleep(self.save_interval)
+            if self._dirty:
+                self.save()
+
+    @staticmethod
+    def make_key(model_name: str, query: str) -> Tuple[str, str]:
+        return model_name, normalize_query_text(query)
+
+    def load(self) -> None:
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with np.load(self.persist_path) as data:
+                for model_name, text, vector in zip(data["models"], data["texts"], data["vectors"]):
+                    super().put((str(model_name), str(text)), vector[np.newaxis, :].astype(np.float32))
+            logger.info(f"Loaded {len(self)} cached query embeddings from {self.persist_path}")
+        except Exception as e:
+            logger.warning(f"Could not load query embedding cache '{self.persist_path}': {e}")
+
+    def save(self) -> None:
+        self._dirty = False
+        entries = self.items()
+        if not self.persist_path or not entries:
+            return
+        tmp_path = None
+        try:
+            directory = os.path.dirname(self.persist_path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=os.path.basename(self.persist_path) + ".", suffix=".tmp.npz"
+            )
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    models=np.array([key[0] for key, _ in entries]),
+                    texts=np.array([key[1] for key, _ in entries]),
+                    vectors=np.concatenate([vec for _, vec in entries]),
+                )
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logger.warning(f"Could not persist query embedding cache '{self.persist_path}': {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=settings.EMBEDDING_CACHE_SIZE,
+    persist_path=settings.EMBEDDING_CACHE_PATH,
+    save_interval=settings.EMBEDDING_CACHE_SAVE_INTERVAL,
+)
+
+
+class LexicalHead:
+    """
+    BGE-M3's sparse head: relu(hidden_state @ weight + bias) per token, keeping
+    the highest weight of each token id and skipping special tokens. Matches
+    the lexical_weights output of FlagEmbedding's BGEM3FlagModel.
+    """
+
+    def __init__(self, weight: np.ndarray, bias: float, skip_ids: List[int]):
+        self.weight = np.asarray(weight, dtype=np.float32).reshape(-1)
+        self.bias = float(bias)
+        self.skip_ids = {int(i) for i in skip_ids}
+
+    def __call__(self, input_ids: np.ndarray, hidden: np.ndarray) -> Dict[int, float]:
+        token_weights = np.maximum(np.asarray(hidden, dtype=np.float32) @ self.weight + self.bias, 0)
+        lexical: Dict[int, float] = {}
+        for token_id, weight in zip(np.asarray(input_ids).tolist(), token_weights.tolist()):
+            if weight > lexical.get(token_id, 0.0) and token_id not in self.skip_ids:
+                lexical[token_id] = weight
+        return lexical
 
 
 class BGEEmbedder:
@@ -22,16 +157,26 @@ class BGEEmbedder:
         model_name: HuggingFace model identifier
         embedding_dimension: Output embedding dimension (1024 for BGE-M3)
         device: Device to run model on (cuda/cpu)
+        batcher: Coalesces concurrent embed_query calls, see enable_batching()
+        lexical_head: BGE-M3 sparse head, see enable_lexical()
     """
 
-    def __init__(self, model_name: str = "BAAI/bge-m3"):
+    batcher: Optional[MicroBatcher] = None
+    lexical_head: Optional[LexicalHead] = None
+
+    def __init__(self, model_name: str = "BAAI/bge-m3", cache: Optional[QueryEmbeddingCache] = None):
         """
         Initialize BGE-M3 model from HuggingFace.
 
         Args:
             model_name: HuggingFace model identifier (default: BAAI/bge-m3)
+            cache: Query embedding cache (default: the shared process-wide cache)
         """
+        import torch
+        from sentence_transformers import SentenceTransformer
+
         self.model_name = model_name
+        self.cache = cache if cache is not None else query_embedding_cache
         self._embedding_dimension = 1024
 
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -60,21 +205,30 @@ class BGEEmbedder:
         n_texts = len(texts)
         print(f"Embedding {n_texts} texts with batch_size={batch_size}...")
 
-        # Encode texts using BGE-M3
-        embeddings = self.model.encode(
-            texts,
-            batch_size=batch_size,
-            show_progress_bar=show_progress,
-            convert_to_numpy=True,
-            normalize_embeddings=True  
-        )
-
         # Ensure float32 for FAISS
-        embeddings = embeddings.astype(np.float32)
+        embeddings = self._encode(texts, batch_size, show_progress).astype(np.float32)
 
         print(f"✓ Generated embeddings: shape {embeddings.shape}")
         return embeddings
 
+    def embed_texts_with_lexical(
+        self, texts: List[str], batch_size: int = 32, show_progress: bool = True
+    ) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        """
+        Like embed_texts, but also returns each text's lexical weights
+        (token id -> weight) from the same forward pass.
+        Requires enable_lexical().
+        """
+        if self.lexical_head is None:
+            raise RuntimeError("Lexical weights are disabled; call enable_lexical() first.")
+        print(f"Embedding {len(texts)} texts with lexical weights, batch_size={batch_size}...")
+
+        embeddings, lexical = self._encode_with_lexical(texts, batch_size, show_progress)
+        embeddings = embeddings.astype(np.float32)
+
+        print(f"✓ Generated embeddings: shape {embeddings.shape}")
+        return embeddings, lexical
+
     def embed_query(self, query: str) -> np.ndarray:
         """
         Embed single query for retrieval.
@@ -85,22 +239,94 @@ class BGEEmbedder:
         Returns:
             Numpy array of shape (1, embedding_dim) as float32
         """
+        return self.embed_query_with_lexical(query)[0]
+
+    def embed_query_with_lexical(self, query: str) -> Tuple[np.ndarray, Optional[Dict[int, float]]]:
+        """
+        Embed single query, also returning its lexical weights from the same
+        forward pass (None unless enable_lexical() was called).
+        """
+        cache_key = self.cache.make_key(self.model_name, query)
+        cached = self.cache.get(cache_key)
+        lexical = self.lexical_cache.get(cache_key) if self.lexical_head is not None else None
+        if cached is not None and (self.lexical_head is None or lexical is not None):
+            return cached.copy(), lexical
+
         print(f"Embedding query: '{query[:50]}...'")
 
-        # Encode query using BGE-M3
-        embedding = self.model.encode(
-            [query],
-            batch_size=1,
-            show_progress_bar=False,
+        row, lexical = self.batcher(query) if self.batcher is not None else self._encode_queries([query])[0]
+        # Ensure float32 and correct shape for FAISS
+        embedding = np.asarray(row, dtype=np.float32)[np.newaxis, :]
+        self.cache.put(cache_key, embedding.copy())
+        if lexical is not None:
+            self.lexical_cache.put(cache_key, lexical)
+
+        print(f"✓ Generated query embedding: shape {embedding.shape}")
+        return embedding, lexical
+
+    def _encode_queries(self, texts: List[str]) -> List[Tuple[np.ndarray, Optional[Dict[int, float]]]]:
+        if self.lexical_head is None:
+            return [(row, None) for row in self._encode(texts, len(texts), False)]
+        dense, lexical = self._encode_with_lexical(texts, len(texts), False)
+        return list(zip(dense, lexical))
+
+    def _encode(self, texts: List[str], batch_size: int, show_progress: bool) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress,
             convert_to_numpy=True,
             normalize_embeddings=True  # BGE models benefit from normalization
         )
 
-        # Ensure float32 and correct shape for FAISS
-        embedding = embedding.astype(np.float32)
+    def _encode_with_lexical(
+        self, texts: List[str], batch_size: int, show_progress: bool
+    ) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        outputs = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            show_progress_bar=show_progress,
+            output_value=None,  # token states, ids and mask alongside the sentence embedding
+            convert_to_numpy=False,
+        )
+        dense = np.stack([out["sentence_embedding"].float().cpu().numpy() for out in outputs])
+        dense /= np.maximum(np.linalg.norm(dense, axis=1, keepdims=True), 1e-12)
+        lexical = []
+        for out in outputs:
+            mask = out["attention_mask"].bool().cpu().numpy()
+            lexical.append(self.lexical_head(
+                out["input_ids"].cpu().numpy()[mask],
+                out["token_embeddings"].float().cpu().numpy()[mask],
+            ))
+        return dense, lexical
 
-        print(f"✓ Generated query embedding: shape {embedding.shape}")
-        return embedding
+    def _load_lexical_head(self) -> LexicalHead:
+        import torch
+        from huggingface_hub import hf_hub_download
+
+        state = torch.load(hf_hub_download(self.model_name, "sparse_linear.pt"), map_location="cpu")
+        return LexicalHead(state["weight"].numpy(), state["bias"].item(), self.model.tokenizer.all_special_ids)
+
+    def enable_lexical(self) -> None:
+        """
+        Loads BGE-M3's sparse head, so queries (and embed_texts_with_lexical)
+        also yield lexical weights for the sparse keyword index.
+        """
+        self.lexical_head = self._load_lexical_head()
+        self.lexical_cache = LRUCache(max_size=self.cache.max_size)
+
+    def enable_batching(self, max_batch_size: int, max_wait_ms: float) -> None:
+        """
+        Routes cache-missing embed_query calls through a MicroBatcher, so
+        concurrent queries share one batched forward pass instead of running
+        one batch_size=1 pass each.
+        """
+        self.batcher = MicroBatcher(
+            self._encode_queries,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name="query-embedding-batcher",
+        )
 
     @property
     def embedding_dimension(self) -> int:
@@ -112,4 +338,145 @@ class BGEEmbedder:
         """
         return self._embedding_dimension
     
-global_embedder = BGEEmbedder()
\ No newline at end of file
+class OnnxBGEEmbedder(BGEEmbedder):
+    """
+    BGE-M3 dense embeddings from an exported ONNX graph on ONNX Runtime.
+
+    model_dir holds the graph (model_int8.onnx from dynamic int8 quantisation,
+    or model.onnx) and the tokenizer.json written next to it by
+    scripts/export_onnx_embedder.py. Output matches the PyTorch backend: the
+    CLS token of the last hidden state, L2-normalised.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_name: str = "BAAI/bge-m3",
+        cache: Optional[QueryEmbeddingCache] = None,
+        quantized: bool = True,
+        num_threads: int = 0,
+        max_length: int = 8192,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        graph_path = os.path.join(model_dir, "model_int8.onnx" if quantized else "model.onnx")
+        # Distinct cache namespace: int8 vectors differ slightly from fp32 ones.
+        self.model_name = f"{model_name}:onnx{'-int8' if quantized else ''}"
+        self.cache = cache if cache is not None else query_embedding_cache
+        self._embedding_dimension = 1024
+        self.device = "cpu"
+
+        print(f"Loading ONNX embedder: {graph_path}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(graph_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        pad_id = self.tokenizer.token_to_id("<pad>")
+        self.tokenizer.enable_padding(pad_id=1 if pad_id is None else pad_id, pad_token="<pad>")
+
+        print(f"Model loaded successfully")
+        print(f"Embedding dimension: {self._embedding_dimension}")
+
+    def _run(self, texts: List[str], with_lexical: bool = False) -> Tuple[np.ndarray, Optional[List[Dict[int, float]]]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+        last_hidden_state = self.session.run(None, feeds)[0]
+        cls = last_hidden_state[:, 0].astype(np.float32)
+        dense = cls / np.maximum(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12)
+        if not with_lexical:
+            return dense, None
+
+        masks = feeds["attention_mask"] > 0
+        lexical = [
+            self.lexical_head(feeds["input_ids"][i][masks[i]], last_hidden_state[i][masks[i]])
+            for i in range(len(texts))
+        ]
+        return dense, lexical
+
+    def _run_batches(
+        self, texts: List[str], batch_size: int, show_progress: bool, with_lexical: bool
+    ) -> Tuple[np.ndarray, Optional[List[Dict[int, float]]]]:
+        # Batch texts of similar length together to keep padding short.
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        embeddings = np.empty((len(texts), self._embedding_dimension), dtype=np.float32)
+        lexical: Optional[List[Dict[int, float]]] = [{} for _ in texts] if with_lexical else None
+        n_batches = (len(texts) + batch_size - 1) // batch_size
+        for b, start in enumerate(range(0, len(texts), batch_size), 1):
+            batch = order[start:start + batch_size]
+            embeddings[batch], batch_lexical = self._run([texts[i] for i in batch], with_lexical)
+            if with_lexical:
+                for i, weights in zip(batch, batch_lexical):
+                    lexical[i] = weights
+            if show_progress:
+                print(f"  batch {b}/{n_batches}")
+        return embeddings, lexical
+
+    def _encode(self, texts: List[str], batch_size: int, show_progress: bool) -> np.ndarray:
+        return self._run_batches(texts, batch_size, show_progress, with_lexical=False)[0]
+
+    def _encode_with_lexical(
+        self, texts: List[str], batch_size: int, show_progress: bool
+    ) -> Tuple[np.ndarray, List[Dict[int, float]]]:
+        return self._run_batches(texts, batch_size, show_progress, with_lexical=True)
+
+    def _load_lexical_head(self) -> LexicalHead:
+        # Written next to the graph by scripts/export_onnx_embedder.py.
+        with np.load(os.path.join(self.model_dir, "sparse_linear.npz")) as data:
+            weight, bias = data["weight"], data["bias"]
+        skip_ids = [self.tokenizer.token_to_id(t) for t in ("<s>", "<pad>", "</s>", "<unk>")]
+        return LexicalHead(weight, bias.reshape(-1)[0], [i for i in skip_ids if i is not None])
+
+
+def create_embedder() -> BGEEmbedder:
+    """
+    Builds the embedder for settings.EMBEDDING_BACKEND ("torch" or "onnx"),
+    with query micro-batching unless EMBEDDING_BATCH_MAX_SIZE is 1, and the
+    lexical head when KEYWORD_SEARCH_BACKEND is "sparse".
+    """
+    backend = settings.EMBEDDING_BACKEND.lower()
+    if backend == "torch":
+        embedder = BGEEmbedder()
+    elif backend == "onnx":
+        embedder = OnnxBGEEmbedder(
+            settings.EMBEDDING_ONNX_DIR,
+            quantized=settings.EMBEDDING_ONNX_QUANTIZED,
+            num_threads=settings.EMBEDDING_ONNX_THREADS,
+        )
+    else:
+        raise ValueError(f"Unsupported embedding backend: {settings.EMBEDDING_BACKEND}")
+
+    if settings.KEYWORD_SEARCH_BACKEND.lower() == "sparse":
+        embedder.enable_lexical()
+    if settings.EMBEDDING_BATCH_MAX_SIZE > 1:
+        embedder.enable_batching(settings.EMBEDDING_BATCH_MAX_SIZE, settings.EMBEDDING_BATCH_MAX_WAIT_MS)
+    return embedder
+
+
+_embedder: Optional[BGEEmbedder] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> BGEEmbedder:
+    """
+    Process-wide embedder, loaded on first use so importing this module (e.g.
+    from scripts) does not download or load the model.
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = create_embedder()
+    return _embedder
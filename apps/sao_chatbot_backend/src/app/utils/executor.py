@@ -0,0 +1,37 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.config import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """
+    Shared, bounded pool for CPU-bound retrieval stages (embedding, FAISS,
+    tokenisation, BM25). Threads rather than processes: torch and FAISS release
+    the GIL, and the loaded indexes cannot be pickled into worker processes.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.RETRIEVAL_WORKERS,
+                    thread_name_prefix="retrieval",
+                )
+    return _executor
+
+
+async def run_blocking(
+    executor: Optional[ThreadPoolExecutor], fn: Callable[..., Any], *args, **kwargs
+) -> Any:
+    """Runs fn off the event loop; executor=None uses the shared retrieval pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor or get_retrieval_executor(), functools.partial(fn, *args, **kwargs)
+    )
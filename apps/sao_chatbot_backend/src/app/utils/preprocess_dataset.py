@@ -3,7 +3,7 @@ import json
 from pathlib import Path
 from typing import Optional, List
 import numpy as np
-from src.app.utils.embedding import BGEEmbedder, global_embedder
+from src.app.utils.embedding import BGEEmbedder, get_embedder
 from src.db.vector_store.vector_store import VectorStoreTransaction 
 
 BASE_STORAGE = "storage"
@@ -30,10 +30,15 @@ def _embed_and_save(chunk_batch: List[dict], embedder: BGEEmbedder, target_path:
     try:
         texts = [c.get('text', '') for c in chunk_batch]
         
-        new_embeddings = embedder.embed_texts(texts, batch_size=16)
+        lexical_weights = None
+        if embedder.lexical_head is not None:
+            # Same forward pass also feeds the sparse keyword index.
+            new_embeddings, lexical_weights = embedder.embed_texts_with_lexical(texts, batch_size=16)
+        else:
+            new_embeddings = embedder.embed_texts(texts, batch_size=16)
         
         with VectorStoreTransaction(target_path) as vs:              
-            vs.add(new_embeddings, chunk_batch)
+            vs.add(new_embeddings, chunk_batch, lexical_weights=lexical_weights)
             print(f"Indexed {len(chunk_batch)} chunks to {target_path}")
             
     except Exception as e:
@@ -45,7 +50,7 @@ def run_indexing_pipeline(metadata_folder: str, is_regulation_folder: bool = Fal
     Bulk function: Accepts the flag to pass down to the indexer.
     """
     print(f"\nStarting Bulk Indexing for Folder: {metadata_folder} (Regulation={is_regulation_folder})")
-    embedder = global_embedder
+    embedder = get_embedder()
     
     json_files = list(Path(metadata_folder).glob("**/*.json"))
     
@@ -0,0 +1,17 @@
+from typing import Tuple
+
+from src.app.utils.cache import LRUCache
+from src.config import settings
+from src.db.vector_store.tokenizer import get_tokenizer
+
+# Short query phrases repeat a lot; keyed by the tokenizer fingerprint so a
+# reloaded dictionary never serves tokens segmented with the old one.
+query_token_cache = LRUCache(max_size=settings.TOKENIZER_CACHE_SIZE)
+
+
+def tokenize_query(text: str) -> Tuple[str, ...]:
+    """Memoised tokenize for short, frequently repeated query phrases."""
+    tokenizer = get_tokenizer()
+    return query_token_cache.get_or_compute(
+        (tokenizer.fingerprint, text), lambda: tuple(tokenizer.tokenize(text))
+    )
@@ -18,5 +18,82 @@ class Settings:
     QWEN_MODEL = os.getenv("QWEN_MODEL", "qwen3.5-plus")
 
     GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+    # Seconds between saves of a changed persistent cache (also saved at exit); 0 saves only at exit.
+    EMBEDDING_CACHE_SAVE_INTERVAL = float(os.getenv("EMBEDDING_CACHE_SAVE_INTERVAL", "300"))
+    # "torch" (sentence-transformers) or "onnx" (ONNX Runtime, see scripts/export_onnx_embedder.py).
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "storage/models/bge-m3-onnx")
+    EMBEDDING_ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() == "true"
+    EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+    # Concurrent query embeddings are collected for up to MAX_WAIT_MS into one batch; 1 disables.
+    EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "16"))
+    EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+    # Keyword leg of hybrid search: "bm25" (pythainlp tokens) or "sparse" (BGE-M3
+    # lexical weights, built at ingestion or with scripts/build_sparse_index.py).
+    KEYWORD_SEARCH_BACKEND = os.getenv("KEYWORD_SEARCH_BACKEND", "bm25")
+    # Route, legal sub-route, standalone rewrite and keywords from one structured
+    # LLM call (router.analyze_query) instead of four sequential ones.
+    QUERY_ANALYSIS_SINGLE_CALL = os.getenv("QUERY_ANALYSIS_SINGLE_CALL", "true").lower() == "true"
+    # Without the single call: run the shared retrieval stages and every legal
+    # route's candidate searches while the sub-route is classified.
+    SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+    # Candidate searches started speculatively per query (regulations, then
+    # all others, then each doc type), and in flight across requests, so
+    # unused ones never crowd the retrieval pool.
+    SPECULATIVE_MAX_SEARCHES = int(os.getenv("SPECULATIVE_MAX_SEARCHES", "2"))
+    SPECULATIVE_MAX_IN_FLIGHT = int(os.getenv("SPECULATIVE_MAX_IN_FLIGHT", "4"))
+    # Nearest-centroid route classifier over the query embedding, trained with
+    # scripts/train_local_router.py; routes it is at least THRESHOLD confident
+    # of skip the LLM router. AUDIT_RATE of those are still sent to the LLM in
+    # the background for the confusion stats.
+    LOCAL_ROUTER_ENABLED = os.getenv("LOCAL_ROUTER_ENABLED", "true").lower() == "true"
+    LOCAL_ROUTER_PATH = os.getenv("LOCAL_ROUTER_PATH", "storage/router/local_router.npz")
+    LOCAL_ROUTER_THRESHOLD = float(os.getenv("LOCAL_ROUTER_THRESHOLD", "0.9"))
+    LOCAL_ROUTER_AUDIT_RATE = float(os.getenv("LOCAL_ROUTER_AUDIT_RATE", "0.05"))
+    # Labelled routing examples. Setting ROUTER_TRAFFIC_LOG_PATH (opt-in; it
+    # stores user questions in plaintext) logs LLM routing decisions as
+    # further training data, rotated at MAX_BYTES keeping BACKUPS old files.
+    ROUTER_EXAMPLES_PATH = os.getenv("ROUTER_EXAMPLES_PATH", "storage/router/examples.jsonl")
+    ROUTER_TRAFFIC_LOG_PATH = os.getenv("ROUTER_TRAFFIC_LOG_PATH", "")
+    ROUTER_TRAFFIC_LOG_MAX_BYTES = int(os.getenv("ROUTER_TRAFFIC_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    ROUTER_TRAFFIC_LOG_BACKUPS = int(os.getenv("ROUTER_TRAFFIC_LOG_BACKUPS", "3"))
+    # BM25 query terms: "local" (corpus idf, legal phrases, clause numbers) or
+    # "llm" (one extra LLM call); the fallback calls the LLM when local finds none.
+    KEYWORD_EXTRACTOR = os.getenv("KEYWORD_EXTRACTOR", "local")
+    KEYWORD_LLM_FALLBACK = os.getenv("KEYWORD_LLM_FALLBACK", "false").lower() == "true"
+    # Extra words for Thai segmentation (scripts/build_tokenizer_dict.py); BM25
+    # indexes built with a different dictionary are rebuilt on load.
+    TOKENIZER_DICT_PATH = os.getenv("TOKENIZER_DICT_PATH", "storage/tokenizer_words.txt")
+    TOKENIZER_CACHE_SIZE = int(os.getenv("TOKENIZER_CACHE_SIZE", "4096"))
+    # Processes for corpus tokenisation when building BM25; 0 uses one per CPU, 1 disables.
+    TOKENIZER_WORKERS = int(os.getenv("TOKENIZER_WORKERS", "0"))
+
+    FAISS_INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "HNSW32,Flat")
+    FAISS_ANN_MIN_VECTORS = int(os.getenv("FAISS_ANN_MIN_VECTORS", "10000"))
+    FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+    FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+    # Open search indexes read-only via mmap so uvicorn workers share one copy.
+    FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+    # Vector codes searched per store: float32, fp16, int8 or binary (sign bits).
+    # Compressed codes are rescored against the float32 vectors.npy over a
+    # shortlist of VECTOR_RESCORE_FACTOR * k (0 disables it for fp16/int8).
+    # Compare them with scripts/vector_codec_report.py; after switching, run
+    # scripts/migrate_vector_stores.py to write the codes.
+    VECTOR_STORE_CODECS = {
+        "regulations": os.getenv("VECTOR_CODEC_REGULATIONS", "float32").lower(),
+        "others": os.getenv("VECTOR_CODEC_OTHERS", "float32").lower(),
+    }
+    VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+
+    RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "4"))
+    # Seconds between checks for newly committed index generations.
+    RETRIEVER_RELOAD_INTERVAL = float(os.getenv("RETRIEVER_RELOAD_INTERVAL", "5"))
+    RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "256"))
+    # Load the embedder and indexes in the background at startup; /ready reports completion.
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
     
 settings = Settings()
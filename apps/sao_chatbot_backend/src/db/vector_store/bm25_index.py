@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.db.vector_store.tokenizer import DEFAULT_FINGERPRINT, get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+BM25_DIRNAME = "bm25"
+
+_VOCAB_FILE = "vocab.json"
+_META_FILE = "meta.json"
+_ARRAY_FILES = ("offsets", "doc_ids", "term_freqs", "doc_lengths")
+
+
+def _sorted_isin(values: np.ndarray, sorted_set: np.ndarray) -> np.ndarray:
+    """np.isin for a sorted lookup set, via binary search."""
+    if not len(sorted_set):
+        return np.zeros(len(values), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_set, values), len(sorted_set) - 1)
+    return sorted_set[pos] == values
+
+
+class BM25Index:
+    """
+    BM25 inverted index kept as flat CSR arrays so it can be persisted next to
+    a FAISS store, memory-mapped at startup and patched in place on add/delete.
+
+    Postings of term ``t`` live in ``doc_ids[offsets[t]:offsets[t + 1]]`` (sorted
+    by document position) with matching ``term_freqs``. Scoring follows
+    ``rank_bm25.BM25Okapi`` so rankings do not change after the migration.
+
+    ``tokenizer`` is the fingerprint of the segmentation the postings were
+    built with; query tokens only match them under the same one.
+    """
+
+    def __init__(
+        self,
+        vocab: List[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+        tokenizer: str = DEFAULT_FINGERPRINT,
+    ):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.tokenizer = tokenizer
+        self._refresh()
+
+    # ---------- Construction ----------
+    @classmethod
+    def empty(cls) -> "BM25Index":
+        return cls(
+            [],
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.int32),
+            tokenizer=get_tokenizer().fingerprint,
+        )
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "BM25Index":
+        index = cls.empty()
+        index.add_documents(texts)
+        return index
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional["BM25Index"]:
+        """Opens a persisted index, returning None if it is missing or unreadable."""
+        vocab_path = os.path.join(path, _VOCAB_FILE)
+        if not os.path.exists(vocab_path):
+            return None
+        try:
+            with open(vocab_path, "r", encoding="utf-8") as f:
+                vocab = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                for name in _ARRAY_FILES
+            }
+            meta_path = os.path.join(path, _META_FILE)
+            tokenizer = DEFAULT_FINGERPRINT
+            if os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    tokenizer = json.load(f).get("tokenizer", DEFAULT_FINGERPRINT)
+            return cls(vocab, tokenizer=tokenizer, **arrays)
+        except Exception as e:
+            logger.error(f"Failed to load BM25 index at '{path}': {e}")
+            return None
+
+    def save(self, path: str) -> None:
+        """Writes every file to a temp name first, then swaps it into place."""
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAY_FILES:
+            final_path = os.path.join(path, f"{name}.npy")
+            tmp_path = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp_path, final_path)
+
+        vocab_path = os.path.join(path, _VOCAB_FILE)
+        tmp_path = vocab_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        os.replace(tmp_path, vocab_path)
+
+        meta_path = os.path.join(path, _META_FILE)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tokenizer": self.tokenizer}, f)
+        os.replace(tmp_path, meta_path)
+
+    def is_current(self, corpus_size: int) -> bool:
+        """True if the index covers `corpus_size` chunks, tokenised like queries are now."""
+        return self.corpus_size == corpus_size and self.tokenizer == get_tokenizer().fingerprint
+
+    # ---------- Incremental maintenance ----------
+    def add_documents(self, texts: Iterable[str]) -> None:
+        """
+        Tokenises only the new documents (in worker processes for large
+        batches) and merges their postings in.
+        """
+        start = self.corpus_size
+        old_terms = self._posting_terms()
+        new_terms: List[int] = []
+        new_docs: List[int] = []
+        new_tfs: List[int] = []
+        new_lengths: List[int] = []
+
+        tokenizer = get_tokenizer()
+        if self.corpus_size and self.tokenizer != tokenizer.fingerprint:
+            logger.warning(
+                f"Adding documents tokenised with '{tokenizer.fingerprint}' to a BM25 index "
+                f"built with '{self.tokenizer}'; rebuild it for consistent matches."
+            )
+        elif not self.corpus_size:
+            self.tokenizer = tokenizer.fingerprint
+
+        for offset, tokens in enumerate(tokenizer.tokenize_corpus(list(texts))):
+            new_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = self.term_to_id.get(term)
+                if term_id is None:
+                    term_id = len(self.vocab)
+                    self.vocab.append(term)
+                    self.term_to_id[term] = term_id
+                new_terms.append(term_id)
+                new_docs.append(start + offset)
+                new_tfs.append(tf)
+
+        if not new_lengths:
+            return
+
+        terms = np.concatenate([old_terms, np.asarray(new_terms, dtype=np.int64)])
+        docs = np.concatenate([self.doc_ids, np.asarray(new_docs, dtype=np.int32)])
+        tfs = np.concatenate([self.term_freqs, np.asarray(new_tfs, dtype=np.int32)])
+        lengths = np.concatenate([self.doc_lengths, np.asarray(new_lengths, dtype=np.int32)])
+        self._set_postings(terms, docs, tfs, lengths)
+
+    def remove_documents(self, positions: List[int]) -> None:
+        """
+        Drops documents by position and shifts later positions down, mirroring
+        how ``IndexFlat.remove_ids`` and the metadata list are compacted.
+        """
+        if not positions:
+            return
+        removed = np.unique(np.asarray(positions, dtype=np.int64))
+        keep_docs = np.ones(self.corpus_size, dtype=bool)
+        keep_docs[removed] = False
+
+        keep = keep_docs[self.doc_ids]
+        docs = np.asarray(self.doc_ids[keep], dtype=np.int64)
+        docs -= np.searchsorted(removed, docs)
+        self._set_postings(
+            self._posting_terms()[keep],
+            docs.astype(np.int32),
+            np.asarray(self.term_freqs[keep]),
+            np.asarray(self.doc_lengths[keep_docs]),
+        )
+
+    def _posting_terms(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.vocab), dtype=np.int64), np.diff(self.offsets))
+
+    def _set_postings(self, terms, docs, tfs, lengths) -> None:
+        # Drop terms that no longer occur anywhere so idf matches a fresh build.
+        live = np.bincount(terms, minlength=len(self.vocab)) > 0
+        remap = np.cumsum(live) - 1
+        terms = remap[terms]
+        self.vocab = [t for t, alive in zip(self.vocab, live) if alive]
+
+        order = np.lexsort((docs, terms))
+        self.doc_ids = docs[order].astype(np.int32)
+        self.term_freqs = tfs[order].astype(np.int32)
+        self.doc_lengths = lengths.astype(np.int32)
+        self.offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocab)), out=self.offsets[1:])
+        self._refresh()
+
+    # ---------- Scoring ----------
+    def _refresh(self) -> None:
+        """Recomputes the derived statistics used at query time."""
+        self.term_to_id: Dict[str, int] = {t: i for i, t in enumerate(self.vocab)}
+        self.corpus_size = int(len(self.doc_lengths))
+
+        if self.corpus_size == 0 or not self.vocab:
+            self.idf = np.zeros(len(self.vocab), dtype=np.float64)
+            self.length_norm = np.ones(self.corpus_size, dtype=np.float64)
+            return
+
+        df = np.diff(self.offsets).astype(np.float64)
+        idf = np.log(self.corpus_size - df + 0.5) - np.log(df + 0.5)
+        average_idf = float(idf.mean())
+        idf[idf < 0] = self.epsilon * average_idf
+        self.idf = idf
+
+        avgdl = float(np.sum(self.doc_lengths, dtype=np.int64)) / self.corpus_size
+        self.length_norm = self.k1 * (1 - self.b + self.b * np.asarray(self.doc_lengths) / avgdl)
+        self._upper_bounds: Optional[np.ndarray] = None
+
+    def _term_postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (doc positions, BM25 contribution) for every posting of a term."""
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        docs = np.asarray(self.doc_ids[start:end])
+        tf = self.term_freqs[start:end].astype(np.float64)
+        return docs, self.idf[term_id] * (tf * (self.k1 + 1) / (tf + self.length_norm[docs]))
+
+    @property
+    def upper_bounds(self) -> np.ndarray:
+        """Highest contribution any single posting of each term can make (MaxScore bound)."""
+        if self._upper_bounds is None:
+            bounds = np.zeros(len(self.vocab), dtype=np.float64)
+            if len(self.doc_ids):
+                docs = np.asarray(self.doc_ids)
+                tf = np.asarray(self.term_freqs, dtype=np.float64)
+                contrib = np.repeat(self.idf, np.diff(self.offsets)) * (
+                    tf * (self.k1 + 1) / (tf + self.length_norm[docs])
+                )
+                non_empty = np.diff(self.offsets) > 0
+                bounds[non_empty] = np.maximum.reduceat(contrib, self.offsets[:-1][non_empty])
+            self._upper_bounds = bounds
+        return self._upper_bounds
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """Drop-in replacement for ``BM25Okapi.get_scores``."""
+        scores = np.zeros(self.corpus_size, dtype=np.float64)
+        for token in query_tokens:
+            term_id = self.term_to_id.get(token)
+            if term_id is None:
+                continue
+            docs, contrib = self._term_postings(term_id)
+            scores[docs] += contrib
+        return scores
+
+    def top_k(
+        self,
+        query_tokens: List[str],
+        k: int,
+        prune: bool = True,
+        candidates: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores only documents that share a term with the query and returns the
+        k best as (doc positions, scores), highest first. `candidates` restricts
+        scoring to a subset of documents, given either as sorted unique
+        positions or as a boolean mask over all positions.
+
+        Terms are processed in descending order of their MaxScore bound. Once the
+        bounds of the terms still to come cannot lift an unseen document above the
+        current k-th score, remaining postings only update documents already
+        collected. Scores match ``get_scores`` for every returned document.
+        """
+        term_counts = Counter(
+            self.term_to_id[t] for t in query_tokens if t in self.term_to_id
+        )
+        if not term_counts or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        term_ids = list(term_counts)
+        weights = np.array([term_counts[t] for t in term_ids], dtype=np.float64)
+        bounds = self.upper_bounds[term_ids] * weights
+        order = np.argsort(-bounds)
+        remaining = np.cumsum(bounds[order][::-1])[::-1]
+        # Negative idfs (tiny corpora) break the monotonic-score assumption.
+        prune = prune and bool(np.all(self.idf[term_ids] >= 0))
+
+        cand_docs = np.zeros(0, dtype=np.int64)
+        cand_scores = np.zeros(0, dtype=np.float64)
+        threshold = -np.inf
+
+        for rank, pos in enumerate(order):
+            docs, contrib = self._term_postings(term_ids[pos])
+            contrib = contrib * weights[pos]
+            if candidates is not None:
+                if candidates.dtype == bool:
+                    allowed = candidates[docs]
+                else:
+                    allowed = _sorted_isin(docs, candidates)
+                docs, contrib = docs[allowed], contrib[allowed]
+
+            if prune and len(cand_docs) >= k and remaining[rank] < threshold:
+                known = np.isin(docs, cand_docs, assume_unique=True)
+                docs, contrib = docs[known], contrib[known]
+                if not len(docs):
+                    continue
+
+            merged, inverse = np.unique(np.concatenate([cand_docs, docs]), return_inverse=True)
+            cand_scores = np.bincount(
+                inverse, weights=np.concatenate([cand_scores, contrib]), minlength=len(merged)
+            )
+            cand_docs = merged
+            if len(cand_docs) >= k:
+                threshold = np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k]
+
+        if len(cand_docs) > k:
+            top = np.argpartition(-cand_scores, k - 1)[:k]
+        else:
+            top = np.arange(len(cand_docs))
+        top = top[np.argsort(-cand_scores[top], kind="stable")]
+        return cand_docs[top], cand_scores[top]
+
+    def __len__(self) -> int:
+        return self.corpus_size
+
+    def __bool__(self) -> bool:
+        return self.corpus_size > 0
+
+    def __repr__(self) -> str:
+        return f"BM25Index(docs={self.corpus_size}, terms={len(self.vocab)}, postings={len(self.doc_ids)})"
@@ -0,0 +1,316 @@
+import json
+import logging
+import os
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHUNKS_DIRNAME = "chunks"
+
+_SCHEMA_FILE = "schema.json"
+_FORMAT_VERSION = 2
+
+# Low-cardinality fields stored as int32 codes into a per-column category list.
+CATEGORICAL_FIELDS = (
+    "law_name",
+    "doc_type",
+    "document_id",
+    "original_document_id",
+    "announce_date",
+    "effective_date",
+    "expire_date",
+    "version",
+)
+# Per-chunk strings stored in one UTF-8 blob per column, indexed by offsets, with a
+# presence mask; a non-str value in these fields goes to the extra column instead.
+TEXT_FIELDS = ("id", "text")
+# Any other keys (e.g. the nested "metadata" dict) are kept as one JSON object per chunk.
+_EXTRA_COLUMN = "extra"
+_MISSING = -1
+
+
+def _category_key(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def _save_array(path: str, name: str, array: np.ndarray) -> None:
+    final_path = os.path.join(path, f"{name}.npy")
+    tmp_path = os.path.join(path, f"{name}.tmp.npy")
+    np.save(tmp_path, np.ascontiguousarray(array))
+    os.replace(tmp_path, final_path)
+
+
+def _save_bytes(path: str, name: str, data: bytes) -> None:
+    final_path = os.path.join(path, f"{name}.bin")
+    tmp_path = final_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, final_path)
+
+
+def _load_bytes(path: str, name: str, mmap: bool) -> np.ndarray:
+    blob_path = os.path.join(path, f"{name}.bin")
+    if os.path.getsize(blob_path) == 0:
+        return np.zeros(0, dtype=np.uint8)
+    if mmap:
+        return np.memmap(blob_path, dtype=np.uint8, mode="r")
+    return np.fromfile(blob_path, dtype=np.uint8)
+
+
+class _TextColumn:
+    """Offset-indexed UTF-8 blob: value i is blob[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def build(cls, values: List[str]) -> "_TextColumn":
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __getitem__(self, pos: int) -> str:
+        start, end = self.offsets[pos], self.offsets[pos + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+
+class ChunkRecord(Mapping):
+    """
+    Read-only dict view of one chunk. Fields are decoded on access, so reading
+    law_name or id never touches the chunk text. copy() returns a plain dict.
+    """
+
+    __slots__ = ("_store", "_pos")
+
+    def __init__(self, store: "ChunkStore", pos: int):
+        self._store = store
+        self._pos = pos
+
+    def __getitem__(self, key: str) -> Any:
+        return self._store.field(self._pos, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.keys(self._pos))
+
+    def __len__(self) -> int:
+        return len(self._store.keys(self._pos))
+
+    def copy(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self._store.keys(self._pos)}
+
+    def __repr__(self) -> str:
+        return f"ChunkRecord({self._pos}, law_name={self.get('law_name')!r}, id={self.get('id')!r})"
+
+
+class ChunkStore(Sequence):
+    """
+    Columnar, memory-mapped chunk metadata for one vector store, aligned with
+    its FAISS positions. Behaves as a read-only sequence of dicts (ChunkRecord).
+
+    Layout under <store>/chunks/:
+      schema.json            field order, categories, row count, store generation
+      <field>.codes.npy      int32 codes for categorical fields (-1 = missing)
+      <field>.offsets.npy    int64 offsets into <field>.bin for text fields
+      <field>.present.npy    bool mask of the rows whose text field holds a str
+      extra.*                remaining keys as one JSON object per chunk
+    """
+
+    def __init__(
+        self,
+        n_rows: int,
+        fields: List[str],
+        categories: Dict[str, List[Any]],
+        codes: Dict[str, np.ndarray],
+        texts: Dict[str, _TextColumn],
+        present: Dict[str, np.ndarray],
+        source_stamp: Optional[str] = None,
+    ):
+        self.n_rows = n_rows
+        self.fields = fields
+        self.categories = categories
+        self.codes = codes
+        self.texts = texts
+        self.present = present
+        self.source_stamp = source_stamp
+
+    # ---------- Construction / persistence ----------
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ChunkStore":
+        records = list(records)
+        fields: List[str] = []
+        for record in records:
+            for key in record:
+                if key not in fields:
+                    fields.append(key)
+
+        categories: Dict[str, List[Any]] = {}
+        codes: Dict[str, np.ndarray] = {}
+        for name in (f for f in fields if f in CATEGORICAL_FIELDS):
+            lookup: Dict[str, int] = {}
+            values: List[Any] = []
+            column = np.full(len(records), _MISSING, dtype=np.int32)
+            for pos, record in enumerate(records):
+                if name not in record:
+                    continue
+                key = _category_key(record[name])
+                if key not in lookup:
+                    lookup[key] = len(values)
+                    values.append(record[name])
+                column[pos] = lookup[key]
+            categories[name], codes[name] = values, column
+
+        texts: Dict[str, _TextColumn] = {}
+        present: Dict[str, np.ndarray] = {}
+        for name in (f for f in fields if f in TEXT_FIELDS):
+            mask = np.array([isinstance(record.get(name), str) for record in records], dtype=bool)
+            texts[name] = _TextColumn.build(
+                [record[name] if is_str else "" for record, is_str in zip(records, mask)]
+            )
+            present[name] = mask
+
+        extra_keys = [f for f in fields if f not in CATEGORICAL_FIELDS]
+        extras = [
+            {
+                k: record[k] for k in extra_keys
+                if k in record and not (k in TEXT_FIELDS and isinstance(record[k], str))
+            }
+            for record in records
+        ]
+        if any(extras):
+            texts[_EXTRA_COLUMN] = _TextColumn.build(
+                [json.dumps(extra, ensure_ascii=False) for extra in extras]
+            )
+
+        return cls(len(records), fields, categories, codes, texts, present)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional["ChunkStore"]:
+        """Opens a persisted store, returning None if it is missing or unreadable."""
+        schema_path = os.path.join(path, _SCHEMA_FILE)
+        if not os.path.exists(schema_path):
+            return None
+        try:
+            with open(schema_path, "r", encoding="utf-8") as f:
+                schema = json.load(f)
+            if schema.get("format_version") != _FORMAT_VERSION:
+                return None
+
+            mmap_mode = "r" if mmap else None
+            codes = {
+                name: np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode=mmap_mode)
+                for name in schema["categories"]
+            }
+            texts = {
+                name: _TextColumn(
+                    np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mmap_mode),
+                    _load_bytes(path, name, mmap),
+                )
+                for name in schema["text_columns"]
+            }
+            present = {
+                name: np.load(os.path.join(path, f"{name}.present.npy"), mmap_mode=mmap_mode)
+                for name in schema["text_columns"] if name != _EXTRA_COLUMN
+            }
+            return cls(
+                schema["n_rows"],
+                schema["fields"],
+                schema["categories"],
+                codes,
+                texts,
+                present,
+                schema.get("source_stamp"),
+            )
+        except Exception as e:
+            logger.error(f"Failed to load chunk store at '{path}': {e}")
+            return None
+
+    def save(self, path: str, source_stamp: Optional[str] = None) -> None:
+        """
+        Writes every column to a temp name first, then swaps it into place; the
+        schema goes last. source_stamp is the store generation it was
+        committed with.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name, column in self.codes.items():
+            _save_array(path, f"{name}.codes", column)
+        for name, column in self.texts.items():
+            _save_array(path, f"{name}.offsets", column.offsets)
+            _save_bytes(path, name, column.blob.tobytes())
+        for name, mask in self.present.items():
+            _save_array(path, f"{name}.present", mask)
+
+        self.source_stamp = source_stamp
+        schema_path = os.path.join(path, _SCHEMA_FILE)
+        tmp_path = schema_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format_version": _FORMAT_VERSION,
+                "n_rows": self.n_rows,
+                "fields": self.fields,
+                "categories": self.categories,
+                "text_columns": list(self.texts),
+                "source_stamp": source_stamp,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, schema_path)
+
+    # ---------- Column access ----------
+    def categorical(self, name: str) -> Tuple[np.ndarray, List[Any]]:
+        """(codes, categories) of a categorical column; code -1 means missing."""
+        return self.codes[name], self.categories[name]
+
+    def _extra(self, pos: int) -> Dict[str, Any]:
+        column = self.texts.get(_EXTRA_COLUMN)
+        return json.loads(column[pos]) if column is not None else {}
+
+    def keys(self, pos: int) -> List[str]:
+        extra = self._extra(pos)
+        return [
+            name for name in self.fields
+            if (name in self.codes and self.codes[name][pos] != _MISSING)
+            or (name in self.present and self.present[name][pos])
+            or name in extra
+        ]
+
+    def field(self, pos: int, name: str) -> Any:
+        if name in self.codes:
+            code = int(self.codes[name][pos])
+            if code == _MISSING:
+                raise KeyError(name)
+            return self.categories[name][code]
+        if name in self.present and self.present[name][pos]:
+            return self.texts[name][pos]
+        extra = self._extra(pos)
+        if name in extra:
+            return extra[name]
+        raise KeyError(name)
+
+    # ---------- Sequence API ----------
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [self[i] for i in range(*pos.indices(self.n_rows))]
+        pos = int(pos)
+        if pos < 0:
+            pos += self.n_rows
+        if not 0 <= pos < self.n_rows:
+            raise IndexError(pos)
+        return ChunkRecord(self, pos)
+
+    def __repr__(self) -> str:
+        return f"ChunkStore(rows={self.n_rows}, fields={self.fields})"
+
+
+def file_stamp(path: str) -> Optional[List[int]]:
+    """(mtime_ns, size) of a file, to notice that it changed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CODES_DIRNAME = "codes"
+
+# Bytes per 1024-d vector: 4096, 2048, 1024 and 128.
+VECTOR_CODECS = ("float32", "fp16", "int8", "binary")
+
+_SQ_CODECS = {
+    "fp16": ("SQfp16", faiss.ScalarQuantizer.QT_fp16),
+    "int8": ("SQ8", faiss.ScalarQuantizer.QT_8bit),
+}
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Packs the sign bit of every dimension, d/8 bytes per vector."""
+    return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+
+def build_code_index(vectors: np.ndarray, codec: str, factory: Optional[str] = None):
+    """
+    Builds a compact index over `vectors` for a non-float32 codec.
+
+    "binary" is an exact Hamming scan (IndexBinaryFlat) over sign bits.
+    "fp16"/"int8" are scalar-quantised inner-product indexes; when `factory`
+    is an ANN layout ending in ",Flat" (e.g. "HNSW32,Flat") its storage is
+    swapped for the quantiser, otherwise the codes are scanned exhaustively.
+    """
+    n_vectors, dim = vectors.shape
+    if codec == "binary":
+        index = faiss.IndexBinaryFlat(dim)
+        index.add(binarize(vectors))
+        return index
+    if codec not in _SQ_CODECS:
+        raise ValueError(f"Unknown vector codec '{codec}', expected one of {VECTOR_CODECS}.")
+
+    sq_name, qtype = _SQ_CODECS[codec]
+    if factory and factory.strip().endswith(",Flat"):
+        layout = factory.strip()[: -len("Flat")]
+        nlist = max(1, int(4 * np.sqrt(n_vectors)))
+        index = faiss.index_factory(dim, layout.format(nlist=nlist) + sq_name, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def _code_paths(store_path: str, codec: str) -> Tuple[str, str]:
+    codes_dir = os.path.join(store_path, CODES_DIRNAME)
+    return os.path.join(codes_dir, f"{codec}.faiss"), os.path.join(codes_dir, f"{codec}.json")
+
+
+def save_code_index(index, store_path: str, codec: str, source_stamp: str) -> None:
+    """
+    Writes the code index with the store generation it was built for, each
+    to a temp file swapped into place.
+    """
+    index_path, meta_path = _code_paths(store_path, codec)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    if isinstance(index, faiss.IndexBinary):
+        faiss.write_index_binary(index, tmp_path)
+    else:
+        faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"codec": codec, "source_stamp": source_stamp}, f)
+    os.replace(tmp_path, meta_path)
+
+
+def load_code_index(store_path: str, codec: str, source_stamp: str, io_flags: int = 0):
+    """
+    Opens a persisted code index, returning None if it is missing, unreadable
+    or was built for another store generation than `source_stamp`.
+    """
+    index_path, meta_path = _code_paths(store_path, codec)
+    if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f).get("source_stamp") != source_stamp:
+                return None
+        if codec == "binary":
+            return faiss.read_index_binary(index_path)
+        if io_flags:
+            try:
+                return faiss.read_index(index_path, io_flags)
+            except RuntimeError as e:
+                logger.warning(f"Memory-mapped read of '{index_path}' failed, loading into memory: {e}")
+        return faiss.read_index(index_path)
+    except Exception as e:
+        logger.error(f"Failed to load {codec} code index at '{index_path}': {e}")
+        return None
+
+
+class RescoringIndex:
+    """
+    Two-stage search over compressed codes.
+
+    The first stage (Hamming distance over binary codes, or inner product over
+    scalar-quantised ones) returns a shortlist of rescore_factor * k ids,
+    which are re-ranked by exact inner product against `vectors`, normally
+    the memory-mapped float32 vectors.npy, so only shortlisted rows are read.
+    Exposes the subset of the faiss.Index search API the retriever uses.
+    """
+
+    def __init__(self, first_stage, vectors: np.ndarray, rescore_factor: int = 4):
+        self.first_stage = first_stage
+        self.vectors = vectors
+        self.rescore_factor = max(1, rescore_factor)
+        self.binary = isinstance(first_stage, faiss.IndexBinary)
+
+    @property
+    def ntotal(self) -> int:
+        return self.first_stage.ntotal
+
+    @property
+    def d(self) -> int:
+        return self.first_stage.d
+
+    def search(self, x: np.ndarray, k: int, params=None) -> Tuple[np.ndarray, np.ndarray]:
+        shortlist = min(self.ntotal, k * self.rescore_factor)
+        codes = binarize(x) if self.binary else x
+        _, candidates = self.first_stage.search(codes, shortlist, params=params)
+
+        D = np.full((len(x), k), -np.inf, dtype=np.float32)
+        I = np.full((len(x), k), -1, dtype=np.int64)
+        for row, ids in enumerate(candidates):
+            ids = np.sort(ids[ids >= 0])  # ascending ids keep mmap reads sequential
+            if not len(ids):
+                continue
+            scores = np.asarray(self.vectors[ids], dtype=np.float32) @ x[row]
+            top = np.argsort(-scores, kind="stable")[:k]
+            D[row, : len(top)] = scores[top]
+            I[row, : len(top)] = ids[top]
+        return D, I
+
+    def __repr__(self) -> str:
+        return f"RescoringIndex({type(self.first_stage).__name__}, ntotal={self.ntotal}, factor={self.rescore_factor})"
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.db.vector_store.bm25_index import _sorted_isin
+
+logger = logging.getLogger(__name__)
+
+SPARSE_DIRNAME = "sparse"
+
+_META_FILE = "meta.json"
+_ARRAY_FILES = ("offsets", "doc_ids", "weights")
+
+LexicalWeights = Dict[int, float]
+
+
+class SparseLexicalIndex:
+    """
+    Inverted index over BGE-M3 lexical weights (token id -> weight per chunk),
+    the learned sparse output of the same forward pass as the dense vector.
+
+    Kept as CSR arrays like BM25Index: postings of token ``t`` live in
+    ``doc_ids[offsets[t]:offsets[t + 1]]`` (sorted by document position) with
+    matching ``weights``. A chunk's score is the dot product of its weights
+    with the query's, as in BGE-M3's lexical matching score.
+    """
+
+    def __init__(self, offsets: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray, corpus_size: int):
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.corpus_size = corpus_size
+
+    # ---------- Construction ----------
+    @classmethod
+    def empty(cls) -> "SparseLexicalIndex":
+        return cls(
+            np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32),
+            np.zeros(0, dtype=np.float32),
+            0,
+        )
+
+    @classmethod
+    def from_weights(cls, documents: Iterable[LexicalWeights]) -> "SparseLexicalIndex":
+        index = cls.empty()
+        index.add_documents(documents)
+        return index
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> Optional["SparseLexicalIndex"]:
+        """Opens a persisted index, returning None if it is missing or unreadable."""
+        meta_path = os.path.join(path, _META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                for name in _ARRAY_FILES
+            }
+            return cls(corpus_size=meta["corpus_size"], **arrays)
+        except Exception as e:
+            logger.error(f"Failed to load sparse index at '{path}': {e}")
+            return None
+
+    def save(self, path: str) -> None:
+        """Writes every file to a temp name first, then swaps it into place."""
+        os.makedirs(path, exist_ok=True)
+        for name in _ARRAY_FILES:
+            final_path = os.path.join(path, f"{name}.npy")
+            tmp_path = os.path.join(path, f"{name}.tmp.npy")
+            np.save(tmp_path, np.ascontiguousarray(getattr(self, name)))
+            os.replace(tmp_path, final_path)
+
+        meta_path = os.path.join(path, _META_FILE)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"corpus_size": self.corpus_size}, f)
+        os.replace(tmp_path, meta_path)
+
+    # ---------- Incremental maintenance ----------
+    def add_documents(self, documents: Iterable[LexicalWeights]) -> None:
+        """Appends documents (one weight dict each, possibly empty) and merges their postings in."""
+        start = self.corpus_size
+        new_terms: List[int] = []
+        new_docs: List[int] = []
+        new_weights: List[float] = []
+        n_new = 0
+        for offset, weights in enumerate(documents):
+            n_new += 1
+            for token_id, weight in weights.items():
+                if weight > 0:
+                    new_terms.append(int(token_id))
+                    new_docs.append(start + offset)
+                    new_weights.append(weight)
+        if not n_new:
+            return
+
+        self._set_postings(
+            np.concatenate([self._posting_terms(), np.asarray(new_terms, dtype=np.int64)]),
+            np.concatenate([self.doc_ids, np.asarray(new_docs, dtype=np.int32)]),
+            np.concatenate([self.weights, np.asarray(new_weights, dtype=np.float32)]),
+            start + n_new,
+        )
+
+    def remove_documents(self, positions: List[int]) -> None:
+        """Drops documents by position and shifts later positions down, like BM25Index."""
+        if not positions:
+            return
+        removed = np.unique(np.asarray(positions, dtype=np.int64))
+        keep_docs = np.ones(self.corpus_size, dtype=bool)
+        keep_docs[removed] = False
+
+        keep = keep_docs[self.doc_ids]
+        docs = np.asarray(self.doc_ids[keep], dtype=np.int64)
+        docs -= np.searchsorted(removed, docs)
+        self._set_postings(
+            self._posting_terms()[keep],
+            docs.astype(np.int32),
+            np.asarray(self.weights[keep]),
+            int(np.count_nonzero(keep_docs)),
+        )
+
+    def _posting_terms(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int64), np.diff(self.offsets))
+
+    def _set_postings(self, terms, docs, weights, corpus_size: int) -> None:
+        order = np.lexsort((docs, terms))
+        n_terms = int(terms.max()) + 1 if len(terms) else 0
+        self.doc_ids = docs[order].astype(np.int32)
+        self.weights = weights[order].astype(np.float32)
+        self.offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=self.offsets[1:])
+        self.corpus_size = corpus_size
+
+    # ---------- Scoring ----------
+    def top_k(
+        self,
+        query_weights: LexicalWeights,
+        k: int,
+        candidates: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the k best documents as (doc positions, scores), highest first.
+        `candidates` restricts scoring to sorted unique positions or a boolean
+        mask over all positions, as in BM25Index.top_k.
+        """
+        n_terms = len(self.offsets) - 1
+        postings = [
+            (self.offsets[t], self.offsets[t + 1], w)
+            for t, w in query_weights.items()
+            if 0 <= t < n_terms and w > 0 and self.offsets[t + 1] > self.offsets[t]
+        ]
+        if not postings or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        docs = np.concatenate([np.asarray(self.doc_ids[start:end]) for start, end, _ in postings])
+        contrib = np.concatenate([
+            np.asarray(self.weights[start:end], dtype=np.float64) * w for start, end, w in postings
+        ])
+        if candidates is not None:
+            allowed = candidates[docs] if candidates.dtype == bool else _sorted_isin(docs, candidates)
+            docs, contrib = docs[allowed], contrib[allowed]
+            if not len(docs):
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        unique_docs, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contrib, minlength=len(unique_docs))
+        if len(unique_docs) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(unique_docs))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return unique_docs[top].astype(np.int64), scores[top]
+
+    def __len__(self) -> int:
+        return self.corpus_size
+
+    def __bool__(self) -> bool:
+        return self.corpus_size > 0
+
+    def __repr__(self) -> str:
+        return f"SparseLexicalIndex(docs={self.corpus_size}, postings={len(self.doc_ids)})"
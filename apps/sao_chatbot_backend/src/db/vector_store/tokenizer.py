@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Iterable, List, Optional, Sequence
+
+from pythainlp import word_tokenize
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+ENGINE = "newmm"
+# Fingerprint of plain newmm with pythainlp's dictionary, which every BM25
+# index written before custom dictionaries existed was built with.
+DEFAULT_FINGERPRINT = ENGINE
+
+# Each worker spends a few seconds importing pythainlp and building the trie,
+# so below this many texts tokenising in-process is faster.
+_PARALLEL_MIN_TEXTS = 5000
+_PARALLEL_BATCH_SIZE = 250
+
+# Quoted defined terms (“หน่วยรับตรวจ” หมายความว่า ...) and dotted
+# abbreviations (สตง., พ.ร.บ.) in chunk text.
+_QUOTED_TERM = re.compile(r"[“\"]([฀-๿]{2,40})[”\"]")
+_ABBREVIATION = re.compile(r"(?<![฀-๿.])((?:[฀-๿]{1,4}\.){1,4}[฀-๿]{0,4}\.?)")
+
+
+def tokenizer_fingerprint(custom_words: Sequence[str]) -> str:
+    """Identifies a segmentation setup, so indexes built with another one are rebuilt."""
+    if not custom_words:
+        return DEFAULT_FINGERPRINT
+    digest = hashlib.sha1("\n".join(sorted(custom_words)).encode("utf-8")).hexdigest()[:12]
+    return f"{ENGINE}+{digest}"
+
+
+def collect_corpus_terms(texts: Iterable[str]) -> List[str]:
+    """Collects defined terms and abbreviations from corpus text as dictionary candidates."""
+    terms = set()
+    for text in texts:
+        text = str(text or "")
+        terms.update(_QUOTED_TERM.findall(text))
+        terms.update(t for t in _ABBREVIATION.findall(text) if len(t) > 2)
+    return sorted(terms)
+
+
+def read_custom_words(path: Optional[str]) -> List[str]:
+    """One word per line; blank lines and lines starting with # are ignored."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+class ThaiTokenizer:
+    """
+    pythainlp newmm word segmentation over the default dictionary extended
+    with corpus vocabulary (legal terms such as หน่วยรับตรวจ, สตง.).
+
+    Corpus-scale input is split across worker processes by tokenize_corpus.
+    """
+
+    def __init__(self, custom_words: Iterable[str] = ()):
+        self.custom_words = sorted({w.strip().lower() for w in custom_words if w.strip()})
+        self.fingerprint = tokenizer_fingerprint(self.custom_words)
+        self.trie = None
+        if self.custom_words:
+            from pythainlp.corpus import thai_words
+            from pythainlp.util import dict_trie
+
+            self.trie = dict_trie(set(thai_words()) | set(self.custom_words))
+
+    def tokenize(self, text: str) -> List[str]:
+        if self.trie is None:
+            return word_tokenize(text, engine=ENGINE)
+        return word_tokenize(text, custom_dict=self.trie, engine=ENGINE)
+
+    def tokenize_document(self, text: str) -> List[str]:
+        """Tokenises a chunk's text exactly the way the BM25 corpus expects it."""
+        text = str(text or "").lower()
+        if not text.strip():
+            return ["empty"]
+        try:
+            return self.tokenize(text)
+        except Exception as e:
+            logger.error(f"Failed to tokenise document '{text[:40]}': {e}")
+            return ["error"]
+
+    def tokenize_corpus(self, texts: Sequence[str], workers: Optional[int] = None) -> List[List[str]]:
+        """
+        tokenize_document over many texts, in settings.TOKENIZER_WORKERS
+        processes (0 means one per CPU) once there are enough of them.
+        """
+        texts = list(texts)
+        workers = workers if workers is not None else settings.TOKENIZER_WORKERS
+        workers = min(workers or _available_cpus(), len(texts) // _PARALLEL_BATCH_SIZE)
+        if workers <= 1 or len(texts) < _PARALLEL_MIN_TEXTS:
+            return [self.tokenize_document(t) for t in texts]
+
+        batches = [texts[i : i + _PARALLEL_BATCH_SIZE] for i in range(0, len(texts), _PARALLEL_BATCH_SIZE)]
+        # spawn, not fork: this also runs inside the threaded API process.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.custom_words,),
+        ) as pool:
+            results: List[List[str]] = []
+            for batch_tokens in pool.map(_tokenize_batch, batches):
+                results.extend(batch_tokens)
+        return results
+
+
+def _available_cpus() -> int:
+    # CPUs this process may run on, which is fewer than os.cpu_count() in a limited container.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+_worker_tokenizer: Optional[ThaiTokenizer] = None
+
+
+def _init_worker(custom_words: List[str]) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = ThaiTokenizer(custom_words)
+
+
+def _tokenize_batch(texts: List[str]) -> List[List[str]]:
+    return [_worker_tokenizer.tokenize_document(t) for t in texts]
+
+
+_tokenizer: Optional[ThaiTokenizer] = None
+_tokenizer_stamp = None
+_tokenizer_lock = threading.Lock()
+
+
+def _dict_stamp(path: Optional[str]):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except (OSError, TypeError):
+        return None
+
+
+def _load_tokenizer() -> None:
+    global _tokenizer, _tokenizer_stamp
+    path = settings.TOKENIZER_DICT_PATH
+    _tokenizer_stamp = _dict_stamp(path)
+    _tokenizer = ThaiTokenizer(read_custom_words(path))
+    if _tokenizer.custom_words:
+        logger.info(f"Tokenizer dictionary extended with {len(_tokenizer.custom_words)} words from {path}.")
+
+
+def get_tokenizer() -> ThaiTokenizer:
+    """Process-wide tokenizer over settings.TOKENIZER_DICT_PATH, loaded on first use."""
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _load_tokenizer()
+    return _tokenizer
+
+
+def reload_tokenizer_if_changed() -> ThaiTokenizer:
+    """
+    Reloads the tokenizer when the dictionary file changed on disk, so a
+    process reloading indexes built with a new dictionary tokenises queries
+    the same way instead of rebuilding them with its old one.
+    """
+    with _tokenizer_lock:
+        if _tokenizer is None or _dict_stamp(settings.TOKENIZER_DICT_PATH) != _tokenizer_stamp:
+            _load_tokenizer()
+    return _tokenizer
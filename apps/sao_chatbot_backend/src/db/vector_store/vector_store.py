@@ -1,10 +1,31 @@
 import json
+import logging
 import os
 import threading
+import time
 import faiss
 import numpy as np
 from typing import List, Dict, Any, Optional
 
+from src.db.vector_store.tokenizer import reload_tokenizer_if_changed
+from src.config import settings
+from src.db.vector_store.bm25_index import BM25_DIRNAME, BM25Index
+from src.db.vector_store.chunk_store import CHUNKS_DIRNAME, ChunkStore
+from src.db.vector_store.compressed_index import (
+    RescoringIndex,
+    build_code_index,
+    load_code_index,
+    save_code_index,
+)
+from src.db.vector_store.sparse_index import SPARSE_DIRNAME, LexicalWeights, SparseLexicalIndex
+
+INDEX_FILENAME = "index.faiss"
+VECTORS_FILENAME = "vectors.npy"
+GENERATION_FILENAME = "GENERATION"
+MIGRATE_SCRIPT = "scripts/migrate_vector_stores.py"
+
+logger = logging.getLogger(__name__)
+
 _path_locks: Dict[str, threading.Lock] = {}
 _lock_registry_access = threading.Lock()
 
@@ -15,6 +36,129 @@ def get_lock_for_path(path: str) -> threading.Lock:
             _path_locks[path] = threading.Lock()
         return _path_locks[path]
 
+def _uses_flat_index(n_vectors: int, factory: str) -> bool:
+    return factory.strip().lower() == "flat" or n_vectors < settings.FAISS_ANN_MIN_VECTORS
+
+def build_index(vectors: np.ndarray, factory: Optional[str] = None) -> faiss.Index:
+    """
+    Builds an inner-product index over normalised embeddings.
+
+    `factory` is a FAISS index_factory string such as "HNSW32,Flat",
+    "IVF{nlist},Flat" or "IVF{nlist},PQ64" ({nlist} is sized from the corpus).
+    Stores smaller than FAISS_ANN_MIN_VECTORS always get an exact flat index.
+    """
+    factory = factory or settings.FAISS_INDEX_FACTORY
+    n_vectors, dim = vectors.shape
+
+    if _uses_flat_index(n_vectors, factory):
+        index = faiss.IndexFlatIP(dim)
+    else:
+        nlist = max(1, int(4 * np.sqrt(n_vectors)))
+        index = faiss.index_factory(dim, factory.format(nlist=nlist), faiss.METRIC_INNER_PRODUCT)
+        if not index.is_trained:
+            index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+def vector_codec_for(path: str) -> str:
+    """The codec searched for the store at `path` (settings.VECTOR_STORE_CODECS), default float32."""
+    return settings.VECTOR_STORE_CODECS.get(os.path.basename(os.path.normpath(path)), "float32")
+
+def build_store_code_index(vectors: np.ndarray, codec: str):
+    """Builds the compressed codes for a store, with an ANN layout once it is large enough."""
+    factory = settings.FAISS_INDEX_FACTORY
+    return build_code_index(
+        np.ascontiguousarray(vectors, dtype=np.float32),
+        codec,
+        None if _uses_flat_index(len(vectors), factory) else factory,
+    )
+
+def make_search_params(
+    index,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    sel: Optional[faiss.IDSelector] = None,
+):
+    """
+    Returns per-query FAISS search parameters: efSearch for HNSW, nprobe for
+    IVF, and an optional IDSelector restricting the search to given ids.
+    Returns None for an unrestricted flat search. The caller must keep `sel`
+    referenced until the search finishes. For a RescoringIndex the parameters
+    apply to its first stage.
+    """
+    selector = {"sel": sel} if sel is not None else {}
+    if isinstance(index, RescoringIndex):
+        index = index.first_stage
+    if isinstance(index, faiss.IndexBinary):
+        return faiss.SearchParameters(**selector) if sel is not None else None
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or settings.FAISS_EF_SEARCH, **selector)
+    try:
+        faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return faiss.SearchParameters(**selector) if sel is not None else None
+    return faiss.SearchParametersIVF(nprobe=nprobe or settings.FAISS_NPROBE, **selector)
+
+def read_generation(path: str) -> Optional[str]:
+    """
+    Returns the store's generation marker, rewritten at the end of every
+    committed transaction; None for stores committed before markers existed.
+    """
+    try:
+        with open(os.path.join(path, GENERATION_FILENAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _write_generation(path: str, generation: str) -> None:
+    gen_path = os.path.join(path, GENERATION_FILENAME)
+    tmp_path = gen_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generation)
+    os.replace(tmp_path, gen_path)
+
+def _mmap_io_flags() -> int:
+    """
+    FAISS read flags that map the index file instead of copying it, so every
+    worker on a node shares one page-cached copy. IO_FLAG_MMAP_IFC (faiss >=
+    1.10) covers flat, HNSW and IVF storage; older builds only support
+    IO_FLAG_MMAP, which maps IVF inverted lists. Returns 0 if neither exists.
+    """
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or getattr(faiss, "IO_FLAG_MMAP", 0)
+    return flag | getattr(faiss, "IO_FLAG_READ_ONLY", 0) if flag else 0
+
+def read_search_index(index_path: str) -> faiss.Index:
+    """
+    Opens an index for searching only. With FAISS_MMAP enabled the vectors stay
+    in the page cache rather than private memory; the result must not be
+    modified. Falls back to a regular read if the index cannot be mapped.
+    """
+    flags = _mmap_io_flags() if settings.FAISS_MMAP else 0
+    if flags:
+        try:
+            return faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            print(f"[{index_path}] Memory-mapped read failed, loading into memory: {e}")
+    return faiss.read_index(index_path)
+
+def _write_index(index: faiss.Index, path: str) -> None:
+    """
+    Writes to a temp file and swaps it in: readers may have the old file
+    mapped, and rewriting it in place would change pages under them.
+    """
+    index_path = os.path.join(path, INDEX_FILENAME)
+    tmp_path = index_path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+
+def _reconstruct_vectors(index) -> Optional[np.ndarray]:
+    """Recovers raw vectors from stores written before vectors.npy existed."""
+    try:
+        return index.reconstruct_n(0, index.ntotal).astype(np.float32)
+    except RuntimeError:
+        return None
+
 class VectorStoreTransaction:
     """
     A transactional wrapper for a SINGLE FAISS index at a specific path.
@@ -23,6 +167,10 @@ class VectorStoreTransaction:
         self.path = path
         self.index = None
         self.metadata = []
+        self.vectors: Optional[np.ndarray] = None
+        self.bm25: Optional[BM25Index] = None
+        self.sparse: Optional[SparseLexicalIndex] = None
+        self._needs_rebuild = False
         self.lock = get_lock_for_path(path)
 
     def __enter__(self):
@@ -33,13 +181,23 @@ class VectorStoreTransaction:
         
         try:
             os.makedirs(self.path, exist_ok=True)
-            index_path = os.path.join(self.path, "index.faiss")
+            index_path = os.path.join(self.path, INDEX_FILENAME)
             metadata_path = os.path.join(self.path, "metadata.json")
             
             if os.path.exists(index_path) and os.path.exists(metadata_path):
                 self.index = faiss.read_index(index_path)
                 with open(metadata_path, 'r', encoding='utf-8') as f:
                     self.metadata = json.load(f)
+                self.bm25 = BM25Index.load(os.path.join(self.path, BM25_DIRNAME), mmap=False)
+                self.sparse = SparseLexicalIndex.load(os.path.join(self.path, SPARSE_DIRNAME), mmap=False)
+
+                vectors_path = os.path.join(self.path, VECTORS_FILENAME)
+                if os.path.exists(vectors_path):
+                    # Never modified in place (add/delete build new arrays), so
+                    # mapping it avoids reading the whole matrix up front.
+                    self.vectors = np.load(vectors_path, mmap_mode="r")
+                else:
+                    self.vectors = _reconstruct_vectors(self.index)
             return self
         except Exception as e:
             self.lock.release()
@@ -48,7 +206,17 @@ class VectorStoreTransaction:
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
             if exc_type is None and self.index is not None:
-                faiss.write_index(self.index, os.path.join(self.path, "index.faiss"))
+                # Derived files are stamped with the generation they belong to,
+                # which survives copies and restores, unlike file mtimes.
+                generation = str(time.time_ns())
+                self._rebuild_if_needed()
+                _write_index(self.index, self.path)
+                if self.vectors is not None:
+                    vectors_path = os.path.join(self.path, VECTORS_FILENAME)
+                    tmp_vectors_path = vectors_path + ".tmp.npy"
+                    np.save(tmp_vectors_path, self.vectors)
+                    os.replace(tmp_vectors_path, vectors_path)
+                    self._save_codes(generation)
                 
                 meta_path = os.path.join(self.path, "metadata.json")
                 tmp_path = meta_path + ".tmp"
@@ -56,31 +224,133 @@ class VectorStoreTransaction:
                     json.dump(self.metadata, f, ensure_ascii=False, indent=2)
                 
                 os.replace(tmp_path, meta_path)
+                ChunkStore.from_records(self.metadata).save(
+                    os.path.join(self.path, CHUNKS_DIRNAME), source_stamp=generation
+                )
+
+                self._ensure_bm25()
+                self.bm25.save(os.path.join(self.path, BM25_DIRNAME))
+                self._save_sparse()
+                _write_generation(self.path, generation)
                 print(f"[{self.path}] Transaction committed: {self.index.ntotal} vectors.")
             elif exc_type is not None:
                 print(f"[{self.path}] Transaction rolled back: {exc_val}")
         finally:
             self.lock.release()
 
-    def add(self, embeddings: np.ndarray, chunks: List[dict]):
-        if self.index is None:
-            dim = embeddings.shape[1]
-            self.index = faiss.IndexFlatL2(dim)
-        
+    def _rebuild_if_needed(self):
+        """
+        Rebuilds the FAISS index from the raw vectors when a delete touched a
+        non-flat index, the store crossed the flat/ANN size threshold, or the
+        index still uses the legacy L2 metric.
+        """
+        if self.vectors is None:
+            if self._needs_rebuild:
+                # Saving the index as is would leave its ids out of line with the metadata.
+                raise RuntimeError(f"[{self.path}] Index needs a rebuild but raw vectors are unavailable.")
+            return
+        wants_flat = _uses_flat_index(len(self.vectors), settings.FAISS_INDEX_FACTORY)
+        is_flat = isinstance(self.index, faiss.IndexFlat)
+        if (
+            self._needs_rebuild
+            or wants_flat != is_flat
+            or self.index.metric_type != faiss.METRIC_INNER_PRODUCT
+        ):
+            self.rebuild_index()
+
+    def rebuild_index(self, factory: Optional[str] = None):
+        """Rebuilds (and retrains) the index from the stored vectors."""
+        if self.vectors is None:
+            raise RuntimeError(f"[{self.path}] Raw vectors unavailable, cannot rebuild index.")
+        self.index = build_index(self.vectors, factory)
+        self._needs_rebuild = False
+        print(f"[{self.path}] Rebuilt {type(self.index).__name__} over {self.index.ntotal} vectors.")
+
+    def _save_codes(self, generation: str):
+        """Rebuilds the store's compressed codes when it is not searched as float32."""
+        codec = vector_codec_for(self.path)
+        if codec == "float32" or not len(self.vectors):
+            return
+        save_code_index(build_store_code_index(self.vectors, codec), self.path, codec, generation)
+
+    def _ensure_bm25(self):
+        """
+        Builds the BM25 index from metadata if the store predates it, it is
+        stale or it was tokenised with a different dictionary.
+        """
+        reload_tokenizer_if_changed()
+        if self.bm25 is None or not self.bm25.is_current(len(self.metadata)):
+            if self.metadata:
+                print(f"[{self.path}] Building BM25 index for {len(self.metadata)} chunks.")
+            self.bm25 = BM25Index.from_texts(m.get("text", "") for m in self.metadata)
+
+    def _save_sparse(self):
+        """
+        Persists the sparse lexical index. Chunks added without lexical
+        weights leave it covering only the chunks before them; it is kept,
+        and search uses BM25 until scripts/build_sparse_index.py completes it.
+        """
+        if self.sparse is None:
+            return
+        if self.sparse.corpus_size != len(self.metadata):
+            logger.warning(
+                f"[{self.path}] Sparse index covers {self.sparse.corpus_size} of {len(self.metadata)} "
+                "chunks; keyword search uses BM25 until scripts/build_sparse_index.py completes it."
+            )
+        self.sparse.save(os.path.join(self.path, SPARSE_DIRNAME))
+
+    def add(self, embeddings: np.ndarray, chunks: List[dict], lexical_weights: Optional[List[LexicalWeights]] = None):
         if embeddings.dtype != np.float32:
             embeddings = embeddings.astype(np.float32)
-            
-        self.index.add(embeddings)
+
+        if lexical_weights is not None and self.sparse is None:
+            if self.metadata:
+                print(f"[{self.path}] No sparse index for existing chunks; run scripts/build_sparse_index.py.")
+            else:
+                self.sparse = SparseLexicalIndex.empty()
+        # Only extended while it covers every chunk, so it always covers a
+        # prefix of the store; otherwise it is left incomplete (see _save_sparse).
+        if (
+            self.sparse is not None
+            and lexical_weights is not None
+            and self.sparse.corpus_size == len(self.metadata)
+        ):
+            self.sparse.add_documents(lexical_weights)
+
+        self._ensure_bm25()
+        if self.index is None:
+            self.vectors = embeddings
+            self.index = build_index(embeddings)
+        else:
+            if self.vectors is not None:
+                self.vectors = np.concatenate([self.vectors, embeddings])
+            self.index.add(embeddings)
         self.metadata.extend(chunks)
+        self.bm25.add_documents(c.get("text", "") for c in chunks)
 
     def delete_by_filter(self, key: str, value: Any):
         if not self.index: return
         
         ids_to_remove = [i for i, m in enumerate(self.metadata) if m.get(key) == value]
         if ids_to_remove:
-            self.index.remove_ids(np.array(ids_to_remove).astype('int64'))
+            if not isinstance(self.index, faiss.IndexFlat) and self.vectors is None:
+                raise RuntimeError(
+                    f"[{self.path}] Cannot delete from the {type(self.index).__name__} index "
+                    "without raw vectors to rebuild it from."
+                )
+            self._ensure_bm25()
+            if isinstance(self.index, faiss.IndexFlat):
+                self.index.remove_ids(np.array(ids_to_remove).astype('int64'))
+            else:
+                # IVF keeps stale ids and HNSW cannot remove at all; rebuild on commit.
+                self._needs_rebuild = True
+            if self.vectors is not None:
+                self.vectors = np.delete(self.vectors, ids_to_remove, axis=0)
             for i in sorted(ids_to_remove, reverse=True):
                 del self.metadata[i]
+            self.bm25.remove_documents(ids_to_remove)
+            if self.sparse is not None:
+                self.sparse.remove_documents([i for i in ids_to_remove if i < self.sparse.corpus_size])
             print(f"[{self.path}] Deleted {len(ids_to_remove)} vectors where {key}={value}")
 
     def update_metadata_field(self, filter_key: str, filter_value: Any, update_key: str, new_value: Any):
@@ -106,12 +376,18 @@ class LegalVectorSystem:
             return self.reg_path
         return self.other_path
 
-    def add_document(self, embeddings: np.ndarray, chunks: List[dict], doc_type: str):
+    def add_document(
+        self,
+        embeddings: np.ndarray,
+        chunks: List[dict],
+        doc_type: str,
+        lexical_weights: Optional[List[LexicalWeights]] = None,
+    ):
         """Helper to add to the correct store automatically."""
         target_path = self.get_store(doc_type)
 
         with VectorStoreTransaction(target_path) as vs:
-            vs.add(embeddings, chunks)
+            vs.add(embeddings, chunks, lexical_weights=lexical_weights)
 
 def load_faiss_index(load_path: str):
     """
@@ -119,10 +395,99 @@ def load_faiss_index(load_path: str):
     """
     lock = get_lock_for_path(load_path)
     with lock:
-        if not os.path.exists(os.path.join(load_path, "index.faiss")):
+        if not os.path.exists(os.path.join(load_path, INDEX_FILENAME)):
             return None, []
             
-        index = faiss.read_index(os.path.join(load_path, "index.faiss"))
+        index = read_search_index(os.path.join(load_path, INDEX_FILENAME))
         with open(os.path.join(load_path, "metadata.json"), 'r', encoding='utf-8') as f:
             metadata = json.load(f)
-        return index, metadata
\ No newline at end of file
+        return index, metadata
+
+def _load_chunk_store(load_path: str, generation: Optional[str]) -> ChunkStore:
+    """
+    Opens the memory-mapped chunk store. When it is missing or was not
+    committed with the store's current generation it is built in memory
+    instead: only a writer transaction saves derived files, so readers in
+    several workers never race each other or a commit. MIGRATE_SCRIPT
+    persists it.
+    """
+    chunks = ChunkStore.load(os.path.join(load_path, CHUNKS_DIRNAME))
+    if chunks is None or generation is None or chunks.source_stamp != generation:
+        logger.warning(
+            f"[{load_path}] Chunk store missing or stale, parsing metadata.json into memory "
+            f"in every worker; run {MIGRATE_SCRIPT} to persist it."
+        )
+        with open(os.path.join(load_path, "metadata.json"), 'r', encoding='utf-8') as f:
+            chunks = ChunkStore.from_records(json.load(f))
+    return chunks
+
+def _load_vector_index(load_path: str, generation: Optional[str]):
+    """
+    Opens the index searched for the store: the float32 FAISS index, or the
+    compressed codes for its codec wrapped for rescoring against the
+    memory-mapped vectors.npy. Codes missing or not committed with the
+    current generation, e.g. right after switching VECTOR_CODEC_*, are
+    trained in memory until MIGRATE_SCRIPT persists them.
+    """
+    index_path = os.path.join(load_path, INDEX_FILENAME)
+    codec = vector_codec_for(load_path)
+    if codec == "float32":
+        return read_search_index(index_path)
+
+    vectors_path = os.path.join(load_path, VECTORS_FILENAME)
+    if not os.path.exists(vectors_path):
+        print(f"[{load_path}] No {VECTORS_FILENAME} for {codec} codes, searching the float32 index.")
+        return read_search_index(index_path)
+
+    vectors = np.load(vectors_path, mmap_mode="r")
+    codes = None
+    if generation is not None:
+        codes = load_code_index(load_path, codec, generation, _mmap_io_flags() if settings.FAISS_MMAP else 0)
+    if codes is None:
+        logger.warning(
+            f"[{load_path}] {codec} codes missing or stale, training them in memory from "
+            f"{VECTORS_FILENAME} in every worker (private, not memory-mapped); "
+            f"run {MIGRATE_SCRIPT} to persist them."
+        )
+        codes = build_store_code_index(vectors, codec)
+
+    if codec == "binary" or settings.VECTOR_RESCORE_FACTOR > 0:
+        return RescoringIndex(codes, vectors, settings.VECTOR_RESCORE_FACTOR)
+    return codes
+
+def load_search_store(load_path: str, keyword_backend: str = "bm25"):
+    """
+    Reads the vector index (memory-mapped, read-only; compressed codes per
+    settings.VECTOR_STORE_CODECS), the memory-mapped chunk store and the
+    keyword index under the store lock. The keyword index is the sparse
+    lexical index when keyword_backend is "sparse" and it is current,
+    otherwise BM25. Derived files that are missing or stale are built in
+    memory, with a warning, until MIGRATE_SCRIPT or the next writer
+    transaction saves them.
+    """
+    lock = get_lock_for_path(load_path)
+    with lock:
+        if not os.path.exists(os.path.join(load_path, INDEX_FILENAME)):
+            return None, [], None
+
+        generation = read_generation(load_path)
+        index = _load_vector_index(load_path, generation)
+        metadata = _load_chunk_store(load_path, generation)
+
+        if keyword_backend == "sparse":
+            sparse = SparseLexicalIndex.load(os.path.join(load_path, SPARSE_DIRNAME))
+            if sparse is not None and sparse.corpus_size == len(metadata):
+                return index, metadata, sparse
+            print(f"[{load_path}] Sparse index missing or stale, using BM25 for keyword search.")
+
+        reload_tokenizer_if_changed()
+        bm25_path = os.path.join(load_path, BM25_DIRNAME)
+        bm25 = BM25Index.load(bm25_path)
+        if bm25 is None or not bm25.is_current(len(metadata)):
+            reason = "missing" if bm25 is None else "stale or built with another tokenizer dictionary"
+            logger.warning(
+                f"[{load_path}] BM25 index {reason}, retokenising {len(metadata)} chunks in memory "
+                f"in every worker; run {MIGRATE_SCRIPT} to persist it."
+            )
+            bm25 = BM25Index.from_texts(m.get("text", "") for m in metadata)
+        return index, metadata, bm25
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from src.app.utils.batcher import MicroBatcher
+
+
+def test_concurrent_calls_share_a_batch():
+    calls = []
+
+    def fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(fn, max_batch_size=8, max_wait_ms=50)
+    futures = [batcher.submit(i % 3) for i in range(6)]
+    assert [f.result(timeout=5) for f in futures] == [0, 2, 4, 0, 2, 4]
+    assert sum(len(c) for c in calls) == 3  # duplicates computed once
+
+
+def test_fn_error_fails_every_caller():
+    def fn(items):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(fn, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.submit("a").result(timeout=5)
+
+
+def test_row_count_mismatch_fails_callers_and_keeps_worker_alive():
+    short = threading.Event()
+    short.set()
+
+    def fn(items):
+        rows = [item.upper() for item in items]
+        return rows[:-1] if short.is_set() else rows
+
+    batcher = MicroBatcher(fn, max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit(item) for item in ("a", "b")]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+    short.clear()
+    assert batcher.submit("c").result(timeout=5) == "C"
+
+
+def test_cancelled_caller_does_not_stop_the_worker():
+    started = threading.Event()
+    release = threading.Event()
+
+    def fn(items):
+        started.set()
+        release.wait(5)
+        return list(items)
+
+    batcher = MicroBatcher(fn, max_batch_size=1, max_wait_ms=0)
+    first = batcher.submit("first")
+    assert started.wait(5)
+    queued = batcher.submit("queued")
+    assert queued.cancel()
+    release.set()
+
+    assert first.result(timeout=5) == "first"
+    assert batcher.submit("next").result(timeout=5) == "next"
+    time.sleep(0.01)
+    assert batcher.stats()["items"] == 2
@@ -0,0 +1,125 @@
+import random
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from src.db.vector_store.bm25_index import BM25Index
+from src.db.vector_store.tokenizer import get_tokenizer
+
+WORDS = [
+    "ระเบียบ", "กระทรวง", "การคลัง", "ว่าด้วย", "พัสดุ", "ภาครัฐ", "หน่วยงาน", "ตรวจสอบ",
+    "เงิน", "แผ่นดิน", "งบประมาณ", "สัญญา", "รายงาน", "บัญชี", "ค่าใช้จ่าย", "ประกาศ",
+    "คำสั่ง", "อำนาจ", "หน้าที่", "มาตรา", "audit", "budget", "tender", "invoice",
+]
+
+
+def _corpus(n_docs, seed=0):
+    rng = random.Random(seed)
+    # Skewed word frequencies so idfs span common and rare terms.
+    weights = [1.0 / (rank + 1) for rank in range(len(WORDS))]
+    return [" ".join(rng.choices(WORDS, weights, k=rng.randint(3, 15))) for _ in range(n_docs)]
+
+
+QUERIES = [
+    "ระเบียบ กระทรวง การคลัง ว่าด้วย พัสดุ",
+    "audit budget invoice",
+    "เงิน แผ่นดิน เงิน แผ่นดิน รายงาน",
+    "มาตรา tender",
+    "ไม่มี ใน คลัง คำ",
+]
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return _corpus(150)
+
+
+@pytest.fixture(scope="module")
+def index(corpus):
+    return BM25Index.from_texts(corpus)
+
+
+def _query_tokens(query):
+    return get_tokenizer().tokenize(query.lower())
+
+
+def _expected_top_k(scores, k, allowed=None):
+    matched = scores != 0
+    if allowed is not None:
+        matched &= allowed
+    return np.sort(scores[matched])[::-1][:k]
+
+
+def test_get_scores_matches_rank_bm25(corpus, index):
+    reference = BM25Okapi(get_tokenizer().tokenize_corpus(corpus))
+    for query in QUERIES:
+        tokens = _query_tokens(query)
+        np.testing.assert_allclose(index.get_scores(tokens), reference.get_scores(tokens))
+
+
+@pytest.mark.parametrize("prune", [True, False])
+@pytest.mark.parametrize("k", [1, 5, 40, 1000])
+def test_top_k_matches_get_scores(index, prune, k):
+    for query in QUERIES:
+        tokens = _query_tokens(query)
+        scores = index.get_scores(tokens)
+        docs, top_scores = index.top_k(tokens, k, prune=prune)
+
+        np.testing.assert_allclose(top_scores, _expected_top_k(scores, k))
+        np.testing.assert_allclose(top_scores, scores[docs])
+        assert len(np.unique(docs)) == len(docs)
+
+
+@pytest.mark.parametrize("prune", [True, False])
+@pytest.mark.parametrize("as_mask", [True, False])
+def test_top_k_with_candidates(index, prune, as_mask):
+    rng = np.random.default_rng(1)
+    allowed = rng.random(len(index)) < 0.3
+    candidates = allowed if as_mask else np.flatnonzero(allowed)
+    for query in QUERIES:
+        tokens = _query_tokens(query)
+        scores = index.get_scores(tokens)
+        docs, top_scores = index.top_k(tokens, 10, prune=prune, candidates=candidates)
+
+        assert allowed[docs].all()
+        np.testing.assert_allclose(top_scores, _expected_top_k(scores, 10, allowed))
+        np.testing.assert_allclose(top_scores, scores[docs])
+
+
+def test_top_k_with_no_matching_terms(index):
+    docs, scores = index.top_k(["คำที่ไม่มีในดัชนี"], 5)
+    assert len(docs) == 0 and len(scores) == 0
+
+
+def test_remove_documents_matches_rebuild(corpus):
+    index = BM25Index.from_texts(corpus)
+    removed = [0, 7, 8, 9, 64, len(corpus) - 1]
+    index.remove_documents(removed)
+
+    kept = [text for pos, text in enumerate(corpus) if pos not in set(removed)]
+    rebuilt = BM25Index.from_texts(kept)
+    assert len(index) == len(kept)
+    assert sorted(index.vocab) == sorted(rebuilt.vocab)
+    for query in QUERIES:
+        tokens = _query_tokens(query)
+        np.testing.assert_allclose(index.get_scores(tokens), rebuilt.get_scores(tokens))
+        np.testing.assert_allclose(index.top_k(tokens, 10)[1], rebuilt.top_k(tokens, 10)[1])
+
+
+def test_add_documents_matches_rebuild(corpus):
+    index = BM25Index.from_texts(corpus[:100])
+    index.add_documents(corpus[100:])
+    rebuilt = BM25Index.from_texts(corpus)
+    for query in QUERIES:
+        tokens = _query_tokens(query)
+        np.testing.assert_allclose(index.get_scores(tokens), rebuilt.get_scores(tokens))
+
+
+def test_save_and_load_round_trip(tmp_path, index):
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded is not None and loaded.is_current(len(index))
+    for query in QUERIES:
+        tokens = _query_tokens(query)
+        np.testing.assert_allclose(loaded.get_scores(tokens), index.get_scores(tokens))
@@ -0,0 +1,50 @@
+import threading
+
+from src.app.utils.cache import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert [key for key, _ in cache.items()] == ["a", "c"]
+
+
+def test_stats_count_hits_and_misses():
+    cache = LRUCache(max_size=4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    assert "a" in cache  # membership does not count
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_get_or_compute_computes_once():
+    cache = LRUCache(max_size=4)
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or "v") == "v"
+    assert calls == [1]
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = LRUCache(max_size=0)
+    cache.put("a", 1)
+    assert len(cache) == 0 and cache.get("a") is None
+
+
+def test_concurrent_puts_respect_max_size():
+    cache = LRUCache(max_size=16)
+    threads = [
+        threading.Thread(target=lambda n=n: [cache.put((n, i), i) for i in range(200)])
+        for n in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 16
@@ -0,0 +1,39 @@
+import numpy as np
+
+from src.db.vector_store.chunk_store import ChunkStore
+
+RECORDS = [
+    {"id": "a-1", "text": "ข้อ 1 ความทั่วไป", "law_name": "ระเบียบ ก", "metadata": {"page": 1}},
+    {"id": None, "law_name": "ระเบียบ ก", "version": 2},
+    {"id": 5, "text": "", "law_name": "ระเบียบ ข"},
+    {"text": "ไม่มีรหัส"},
+]
+
+
+def test_records_round_trip_through_save_and_load(tmp_path):
+    store = ChunkStore.from_records(RECORDS)
+    store.save(str(tmp_path), source_stamp="gen-1")
+    loaded = ChunkStore.load(str(tmp_path))
+
+    assert loaded.source_stamp == "gen-1"
+    for chunks in (store, loaded):
+        assert len(chunks) == len(RECORDS)
+        assert [chunk.copy() for chunk in chunks] == RECORDS
+        assert [list(chunk) for chunk in chunks] == [list(record) for record in RECORDS]
+
+
+def test_missing_fields_behave_like_a_dict():
+    chunk = ChunkStore.from_records(RECORDS)[3]
+    assert "id" not in chunk and "law_name" not in chunk
+    assert chunk.get("id", "fallback") == "fallback"
+    assert chunk["text"] == "ไม่มีรหัส"
+
+
+def test_categorical_column():
+    codes, categories = ChunkStore.from_records(RECORDS).categorical("law_name")
+    assert [categories[c] if c >= 0 else None for c in codes] == ["ระเบียบ ก", "ระเบียบ ก", "ระเบียบ ข", None]
+    assert codes.dtype == np.int32
+
+
+def test_load_of_missing_store_returns_none(tmp_path):
+    assert ChunkStore.load(str(tmp_path / "nothing")) is None
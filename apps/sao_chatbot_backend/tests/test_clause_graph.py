@@ -0,0 +1,33 @@
+import numpy as np
+
+from src.app.chatbot.retriever.clause_graph import ClauseGraph, parse_clause_key
+
+
+def test_parse_clause_key():
+    assert parse_clause_key("ข้อ ๒๖ (๑)") == ("26", "1")
+    assert parse_clause_key("ข้อ 5") == ("5", None)
+    assert parse_clause_key("บทนำ") is None
+
+
+def test_compile_links_clauses_both_ways():
+    reg_metadata = [
+        {"law_name": "ระเบียบ ก พ.ศ. 2560", "id": "ข้อ 1", "text": "ความทั่วไป"},
+        {"law_name": "ระเบียบ ก พ.ศ. 2560", "id": "ข้อ 2", "text": "(1) วงเงิน"},
+        {"law_name": "ระเบียบ ข", "id": "ข้อ 2", "text": "อื่น"},
+    ]
+    other_metadata = [
+        {"law_name": "หนังสือเวียน 1"},
+        {"law_name": "หนังสือเวียน 2"},
+        {"law_name": "หนังสือเวียน 1"},
+    ]
+    master_map = {"ระเบียบ ก": {"ข้อ 2 (1)": ["หนังสือเวียน 1"], "ข้อ 1": ["หนังสือเวียน 2"]}}
+    source_map = {"หนังสือเวียน 2": ["ระเบียบ ก: ข้อ 1"]}
+
+    graph = ClauseGraph.compile(master_map, source_map, reg_metadata, other_metadata)
+
+    np.testing.assert_array_equal(graph.related_other_ids(0), [1])
+    np.testing.assert_array_equal(graph.related_other_ids(1), [0, 2])
+    assert len(graph.related_other_ids(2)) == 0
+    np.testing.assert_array_equal(graph.parent_regulation_ids(1), [0])
+    assert len(graph.parent_regulation_ids(0)) == 0
+    assert len(ClauseGraph.empty().related_other_ids(None)) == 0
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.app.chatbot.retriever.filters import ValidityIndex, _is_valid_on_date
+from src.db.vector_store.chunk_store import ChunkStore
+
+METADATA = [
+    {"effective_date": "2560-01-01", "expire_date": "2565-12-31"},
+    {"effective_date": "2566-01-01"},
+    {"expire_date": "2562-06-30"},
+    {},
+    {"effective_date": None, "expire_date": "null"},
+    {"effective_date": "not a date"},
+]
+
+TARGETS = [datetime(2559, 1, 1), datetime(2562, 6, 30), datetime(2565, 12, 31), datetime(2568, 5, 1)]
+
+
+def _expected(target):
+    expected = []
+    for doc in METADATA:
+        try:
+            expected.append(_is_valid_on_date(doc, target))
+        except ValueError:
+            expected.append(False)
+    return np.array(expected)
+
+
+@pytest.mark.parametrize("from_store", [False, True])
+def test_mask_matches_per_document_check(from_store):
+    metadata = ChunkStore.from_records(METADATA) if from_store else METADATA
+    index = ValidityIndex.from_metadata(metadata)
+    for target in TARGETS:
+        mask = index.mask(target)
+        expected = _expected(target)
+        if mask is None:
+            assert expected.all()
+        else:
+            np.testing.assert_array_equal(mask, expected)
+
+
+def test_mask_is_none_when_everything_is_valid():
+    index = ValidityIndex.from_metadata([{}, {"effective_date": "2500-01-01"}])
+    assert index.mask(datetime(2568, 1, 1)) is None
@@ -0,0 +1,12 @@
+import pytest
+
+from src.app.chatbot.retriever.keyword_extractor import extract_local_keywords
+
+
+@pytest.mark.parametrize("query", ["", "   ", "\n\t", None])
+def test_empty_query_has_no_keywords(query):
+    assert extract_local_keywords(query) == []
+
+
+def test_clause_reference_is_kept():
+    assert extract_local_keywords("ข้อ ๕ ของระเบียบ")[0] == "ข้อ 5"
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from src.db.vector_store.sparse_index import SparseLexicalIndex
+
+
+def _documents(n_docs, seed=0):
+    rng = np.random.default_rng(seed)
+    docs = []
+    for _ in range(n_docs):
+        tokens = rng.choice(50, size=rng.integers(0, 8), replace=False)
+        docs.append({int(t): float(rng.random()) for t in tokens})
+    return docs
+
+
+def _dense_scores(documents, query):
+    return np.array([sum(w * doc.get(t, 0.0) for t, w in query.items()) for doc in documents])
+
+
+QUERIES = [{1: 0.5, 2: 0.2, 30: 0.9}, {7: 1.0}, {49: 0.3, 0: 0.3, 12: 0.1}, {999: 1.0}]
+
+
+@pytest.mark.parametrize("as_mask", [None, True, False])
+def test_top_k_matches_dense_scores(as_mask):
+    documents = _documents(80)
+    index = SparseLexicalIndex.from_weights(documents)
+    allowed = np.random.default_rng(1).random(len(documents)) < 0.5
+    candidates = None if as_mask is None else allowed if as_mask else np.flatnonzero(allowed)
+    for query in QUERIES:
+        scores = _dense_scores(documents, query)
+        if candidates is not None:
+            scores = np.where(allowed, scores, 0.0)
+        docs, top_scores = index.top_k(query, 10, candidates=candidates)
+
+        expected = np.sort(scores[scores > 0])[::-1][:10]
+        np.testing.assert_allclose(top_scores, expected, rtol=1e-6)
+        np.testing.assert_allclose(top_scores, scores[docs], rtol=1e-6)
+
+
+def test_remove_and_add_match_rebuild(tmp_path):
+    documents = _documents(60)
+    index = SparseLexicalIndex.from_weights(documents[:40])
+    index.add_documents(documents[40:])
+    removed = {3, 4, 39, 40, 59}
+    index.remove_documents(sorted(removed))
+    kept = [doc for pos, doc in enumerate(documents) if pos not in removed]
+
+    index.save(str(tmp_path))
+    loaded = SparseLexicalIndex.load(str(tmp_path))
+    assert loaded.corpus_size == len(kept)
+    for query in QUERIES:
+        scores = _dense_scores(kept, query)
+        docs, top_scores = loaded.top_k(query, 5)
+        np.testing.assert_allclose(top_scores, scores[docs], rtol=1e-6)
+        np.testing.assert_allclose(top_scores, np.sort(scores[scores > 0])[::-1][:5], rtol=1e-6)
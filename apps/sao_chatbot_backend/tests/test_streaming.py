@@ -0,0 +1,51 @@
+from src.app.chatbot.utils.streaming import AnswerStreamParser
+
+MARKER = "[REFERENCES]"
+
+
+def _feed_all(parser, chunks):
+    shown = "".join(parser.feed(chunk) for chunk in chunks)
+    return shown + parser.close()
+
+
+def test_marker_split_across_chunks_is_never_shown():
+    parser = AnswerStreamParser(MARKER)
+    chunks = ["คำตอบ ", "ตามระเบียบ\n[REF", "ERE", "NCES]\n- ระเบียบ ก\n", "- ระเบียบ ข"]
+    shown = _feed_all(parser, chunks)
+
+    assert shown == "คำตอบ ตามระเบียบ\n"
+    assert parser.answer == "คำตอบ ตามระเบียบ"
+    assert parser.references == ["ระเบียบ ก", "ระเบียบ ข"]
+
+
+def test_every_prefix_is_safe_to_show():
+    text = "answer text\n" + MARKER + "\n* ref"
+    for split in range(len(text) + 1):
+        parser = AnswerStreamParser(MARKER)
+        first = parser.feed(text[:split])
+        assert "answer text\n".startswith(first)
+        shown = first + parser.feed(text[split:]) + parser.close()
+        assert shown == "answer text\n"
+        assert parser.references == ["ref"]
+
+
+def test_partial_marker_that_is_not_the_marker_is_released():
+    parser = AnswerStreamParser(MARKER)
+    assert parser.feed("list [RE") == "list "
+    assert parser.feed("D] item") == "[RED] item"
+    assert parser.close() == ""
+    assert parser.answer == "list [RED] item"
+    assert parser.references == []
+
+
+def test_stream_without_marker_flushes_tail_on_close():
+    parser = AnswerStreamParser(MARKER)
+    assert parser.feed("ends with [") == "ends with "
+    assert parser.close() == "["
+    assert parser.answer == "ends with ["
+
+
+def test_references_are_stripped_and_deduplicated():
+    parser = AnswerStreamParser(MARKER)
+    _feed_all(parser, ["a" + MARKER + "\n- x\n• y\n\n* x\n  y  \n"])
+    assert parser.references == ["x", "y"]